@@ -5,64 +5,1126 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, JavascriptException
+from lxml import html as lxml_html
+from dataclasses import dataclass, field, fields, astuple
 import time
 import os
 import shutil
-import pyautogui
-import glob
+import threading
+import queue
+import re
+import random
+import sqlite3
+import json
+import csv
+import string
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import deque
+import base64
+import ctypes
+import ctypes.util
+import struct
+import select
+import functools
+import math
+import hashlib
+import uuid
+from datetime import datetime
+from Aesthetics_Pro_Search import TextIndexer, EXTRACT_WORKERS, INDEX_PATH, JOURNAL_PATH, MAIN_FOLDER
+from Aesthetics_Pro_Archive import ClientArchive, OUTPUT_LAYOUT, compression_method, document_exists, open_document
+
+# PyAutoGUI is only needed by the "pyautogui" capture backend, which drives the native dialogs
+try:
+    import pyautogui
+except Exception:  # Not installed, or no display to attach to
+    pyautogui = None
 
 
 # Configure PyAutoGUI
-pyautogui.FAILSAFE = True  # Move mouse to top left to abort
-pyautogui.PAUSE = 0.5
+if pyautogui:
+    pyautogui.FAILSAFE = True  # Move mouse to top left to abort
+    pyautogui.PAUSE = 0.5
+
+# psutil is optional: browser memory is read from /proc when it is missing
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# requests is only needed by FETCH_MODE=http, which downloads documents without the browser
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+# How record PDFs are captured:
+#   "cdp"       - render the open record form with Chrome DevTools Page.printToPDF (no dialogs, works headless)
+#   "pyautogui" - click through Chrome's print dialog and the OS save dialog (needs a visible desktop)
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "cdp").lower()
+
+# How documents are fetched:
+#   "browser" - open each document's form in the browser and capture it there
+#   "http"    - download the documents directly with the browser's session cookies, many at a time,
+#               and only fall back to the browser for documents the HTTP fetch could not get
+FETCH_MODE = os.getenv("FETCH_MODE", "browser").lower()
+HTTP_CONCURRENCY = max(1, int(os.getenv("HTTP_CONCURRENCY", "8")))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+# Document endpoint, formatted with the site origin and the arguments of the document's launchE...() onclick
+DOCUMENT_URL_TEMPLATE = os.getenv(
+    "DOCUMENT_URL_TEMPLATE",
+    "{origin}/clients/electronic_records/emailDownloadERC.cfm?formid={args[0]}&download=1"
+)
+
+# Site entry points (override to point the scraper at a stand-in site)
+LOGIN_URL = os.getenv("LOGIN_URL", "https://www.aestheticspro.com/Login/")
+CLIENT_LIST_URL = os.getenv("CLIENT_LIST_URL", "https://www.myaestheticspro.com/6722np22veg5/clients/index.cfm")
+
+# Browser session profile:
+#   "standard" - a normal maximized Chrome window that loads every page asset
+#   "lean"     - headless, no GPU/extensions, small fixed viewport, and images, fonts, media and
+#                third-party scripts blocked through DevTools (not usable with CAPTURE_BACKEND=pyautogui)
+SESSION_PROFILE = os.getenv("SESSION_PROFILE", "standard").lower()
+LEAN_VIEWPORT = os.getenv("LEAN_VIEWPORT", "1280,900")
+# URL patterns the lean profile blocks; BLOCKED_URL_PATTERNS adds comma-separated patterns of your own
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+    "*hotjar.com*", "*intercom.io*", "*zdassets.com*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"
+] + [pattern.strip() for pattern in os.getenv("BLOCKED_URL_PATTERNS", "").split(",") if pattern.strip()]
+
+# Browser sessions: HEADLESS=1 runs Chrome without a window, WORKER_COUNT > 1 shards clients across parallel sessions
+HEADLESS = os.getenv("HEADLESS", "0") == "1" or SESSION_PROFILE == "lean"
+WORKER_COUNT = max(1, int(os.getenv("WORKER_COUNT", "1")))
+
+# DRY_RUN=1 only harvests the client manifests and reports client counts per letter
+DRY_RUN = os.getenv("DRY_RUN", "0") == "1"
+
+# Delta sync: DELTA_SYNC=1 revisits every client but only expands records that are new (or dated within
+# DELTA_RECHECK_DAYS) and only captures documents that are new or whose document ID changed
+DELTA_SYNC = os.getenv("DELTA_SYNC", "0") == "1"
+DELTA_RECHECK_DAYS = float(os.getenv("DELTA_RECHECK_DAYS", "14"))
+DELTA_FRESH_HOURS = float(os.getenv("DELTA_FRESH_HOURS", "12"))  # Clients synced this recently are skipped
 
 # Create main folder at the start
-MAIN_FOLDER = "Aesthetics Pro"
 if not os.path.exists(MAIN_FOLDER):
     os.makedirs(MAIN_FOLDER)
     print(f"✓ Created main folder: {MAIN_FOLDER}")
 
-def wait_for_spinner_to_disappear(timeout=30):
-    """Wait for any loading spinners to disappear"""
+# Readiness engine: every wait polls a concrete page condition and returns the moment it holds.
+# Each wait is recorded in a per-condition latency histogram so we can see what waiting really costs.
+READINESS_POLL = 0.1
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 60)
+readiness_stats = {}
+readiness_lock = threading.Lock()
+
+# Installed lazily in front of every readiness check, so it survives page loads.
+# Counts DOM mutations (MutationObserver) and DataTables draw events, and exposes a visibility helper.
+READINESS_JS = """
+if (!window.__apReady) {
+    window.__apReady = {mutations: 0, lastMutation: Date.now(), draws: 0, hooked: false};
+    new MutationObserver(function (records) {
+        window.__apReady.mutations += records.length;
+        window.__apReady.lastMutation = Date.now();
+    }).observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+    window.__apVisible = function (el) {
+        if (!el) { return false; }
+        var style = window.getComputedStyle(el);
+        return style.display !== 'none' && style.visibility !== 'hidden' &&
+            !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    };
+}
+if (!window.__apReady.hooked && window.jQuery) {
+    jQuery(document).on('draw.dt', function () { window.__apReady.draws += 1; });
+    window.__apReady.hooked = true;
+}
+"""
+
+def record_wait(condition, elapsed, satisfied):
+    """Add one wait to the latency histogram of its condition"""
+    with readiness_lock:
+        stats = readiness_stats.setdefault(condition, {
+            'count': 0,
+            'timeouts': 0,
+            'total': 0.0,
+            'max': 0.0,
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1)
+        })
+        stats['count'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
+        if not satisfied:
+            stats['timeouts'] += 1
+        for bucket_index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                stats['buckets'][bucket_index] += 1
+                break
+        else:
+            stats['buckets'][-1] += 1
+
+def wait_until(condition, check, timeout=30, poll=READINESS_POLL):
+    """Poll check() until it returns something truthy. Returns that value, or None on timeout"""
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        try:
+            result = check()
+        except (NoSuchElementException, StaleElementReferenceException, JavascriptException):
+            result = None
+        if result:
+            record_wait(condition, time.monotonic() - start, True)
+            return result
+        if time.monotonic() >= deadline:
+            record_wait(condition, time.monotonic() - start, False)
+            return None
+        time.sleep(poll)
+
+def page_check(driver, script, *args):
+    """Run a readiness script in the page, installing the observer hooks first if needed"""
+    return driver.execute_script(READINESS_JS + script, *args)
+
+def get_draw_count(driver):
+    """Number of DataTables draws seen on the current page so far"""
+    try:
+        return page_check(driver, "return window.__apReady.draws;")
+    except Exception:
+        return 0
+
+def wait_for_dom_quiet(driver, quiet=0.3, timeout=10):
+    """Wait until no DOM mutations have happened for `quiet` seconds"""
+    return wait_until(
+        "dom_quiet",
+        lambda: page_check(driver, "return Date.now() - window.__apReady.lastMutation >= arguments[0];", int(quiet * 1000)),
+        timeout
+    )
+
+def wait_for_table_draw(driver, previous_draws, timeout=30):
+    """Wait until the client list DataTable has redrawn since previous_draws was read"""
+    return wait_until(
+        "table_draw",
+        lambda: page_check(driver, """
+            if (!window.__apReady.hooked) { return Date.now() - window.__apReady.lastMutation >= 500; }
+            return window.__apReady.draws > arguments[0];
+        """, previous_draws),
+        timeout
+    )
+
+def wait_for_visible(driver, condition, element_id, timeout=10):
+    """Wait until the element with the given id is visible"""
+    return wait_until(
+        condition,
+        lambda: page_check(driver, "return window.__apVisible(document.getElementById(arguments[0]));", element_id),
+        timeout
+    )
+
+def wait_for_hidden(driver, condition, element_id, timeout=10):
+    """Wait until the element with the given id is hidden or gone"""
+    return wait_until(
+        condition,
+        lambda: page_check(driver, "return !window.__apVisible(document.getElementById(arguments[0]));", element_id),
+        timeout
+    )
+
+def wait_for_record_form(driver, timeout=40):
+    """Wait until the record form in the slide-in is ready to print (er_icons actions and printslide present)"""
+    return wait_until(
+        "record_form_ready",
+        lambda: page_check(driver, """
+            return document.querySelector("div.er_icons div[onclick*='emailDownloadERC']") !== null &&
+                document.querySelector("div.er_icons div[onclick*='refreshFormERC']") !== null &&
+                document.getElementById('printslide') !== null;
+        """),
+        timeout
+    )
+
+def print_readiness_report():
+    """Print the per-condition wait latency histograms"""
+    with readiness_lock:
+        snapshot = {name: dict(stats, buckets=list(stats['buckets'])) for name, stats in readiness_stats.items()}
+
+    print(f"\n{'='*60}")
+    print("Wait latency by condition:")
+    print(f"{'='*60}")
+    labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+    for name in sorted(snapshot):
+        stats = snapshot[name]
+        mean = stats['total'] / stats['count'] if stats['count'] else 0
+        print(f"  {name}: {stats['count']} waits, mean {mean:.2f}s, max {stats['max']:.2f}s, "
+              f"total {stats['total']:.1f}s, timeouts {stats['timeouts']}")
+        histogram = ", ".join(f"{label}: {count}" for label, count in zip(labels, stats['buckets']) if count)
+        print(f"    {histogram}")
+
+# Phase spans: every traced step records its duration, outcome and the number of WebDriver commands
+# it issued. Spans are appended to a JSONL trace and rolled up into percentiles at the end of a run.
+TRACE_FOLDER = os.path.join(MAIN_FOLDER, "traces")
+span_durations = {}  # phase -> list of durations
+span_outcomes = {}  # phase -> {outcome: count}
+span_commands = {}  # phase -> total WebDriver commands
+span_first_start = {}  # phase -> monotonic time its first span started
+span_lock = threading.Lock()
+span_context = threading.local()
+trace_file = None  # Opened by start_trace()
+trace_started = time.monotonic()
+
+def instrument_driver(driver):
+    """Count the WebDriver commands a driver sends (every command goes through driver.execute)"""
+    original_execute = driver.execute
+    driver.command_count = 0
+    
+    def counting_execute(driver_command, params=None):
+        driver.command_count += 1
+        return original_execute(driver_command, params)
+    
+    driver.execute = counting_execute
+    return driver
+
+def start_trace():
+    """Open a new JSONL trace file for this run"""
+    global trace_file, trace_started
+    if not os.path.exists(TRACE_FOLDER):
+        os.makedirs(TRACE_FOLDER)
+    path = os.path.join(TRACE_FOLDER, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    trace_file = open(path, 'a', encoding='utf-8', buffering=1)
+    trace_started = time.monotonic()
+    print(f"Writing phase trace to: {path}")
+
+def stop_trace():
+    global trace_file
+    if trace_file:
+        trace_file.close()
+        trace_file = None
+
+def record_span(phase, started, duration, outcome, commands, parent):
+    """Add a finished span to the rollup and the trace file"""
+    run_status.last_activity = time.time()
+    with span_lock:
+        span_durations.setdefault(phase, []).append(duration)
+        outcomes = span_outcomes.setdefault(phase, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        span_commands[phase] = span_commands.get(phase, 0) + commands
+        span_first_start.setdefault(phase, started)
+        if trace_file:
+            trace_file.write(json.dumps({
+                'phase': phase,
+                'parent': parent,
+                'thread': threading.current_thread().name,
+                'start': round(started - trace_started, 4),
+                'duration': round(duration, 4),
+                'outcome': outcome,
+                'commands': commands
+            }) + "\n")
+
+class trace_span:
+    """Context manager timing one phase. Set span.outcome inside the block to report a soft failure"""
+    
+    def __init__(self, driver, phase):
+        self.driver = driver
+        self.phase = phase
+        self.outcome = "ok"
+    
+    def __enter__(self):
+        self.stack = getattr(span_context, 'stack', None)
+        if self.stack is None:
+            self.stack = span_context.stack = []
+        self.parent = self.stack[-1] if self.stack else None
+        self.stack.append(self.phase)
+        self.commands_before = getattr(self.driver, 'command_count', 0)
+        self.started = time.monotonic()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.monotonic() - self.started
+        self.stack.pop()
+        outcome = f"error:{exc_type.__name__}" if exc_type else self.outcome
+        commands = getattr(self.driver, 'command_count', 0) - self.commands_before
+        record_span(self.phase, self.started, duration, outcome, commands, self.parent)
+        return False
+
+def traced(phase, false_is_failure=True):
+    """Decorator for a step taking driver first: trace it as a span, counting a False return as a failure"""
+    def decorate(step):
+        @functools.wraps(step)
+        def wrapper(driver, *args, **kwargs):
+            with trace_span(driver, phase) as span:
+                result = step(driver, *args, **kwargs)
+                if false_is_failure and result is False:
+                    span.outcome = "failed"
+                return result
+        return wrapper
+    return decorate
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    # Rounded first so float noise (0.07 * 100 == 7.000000000000001) does not push the rank up by one
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = min(len(sorted_values) - 1, max(0, rank - 1))
+    return sorted_values[index]
+
+def print_span_report():
+    """Print p50/p95/p99 per phase and the client/document throughput of the run"""
+    with span_lock:
+        durations = {phase: sorted(values) for phase, values in span_durations.items()}
+        outcomes = {phase: dict(counts) for phase, counts in span_outcomes.items()}
+        commands = dict(span_commands)
+        # Throughput is measured from the first client, not from the start-up prompts
+        first_client = span_first_start.get("client", trace_started)
+    elapsed_hours = max(time.monotonic() - first_client, 1e-9) / 3600
+    
+    print(f"\n{'='*60}")
+    print("Time by phase:")
+    print(f"{'='*60}")
+    for phase in sorted(durations, key=lambda name: -sum(durations[name])):
+        values = durations[phase]
+        failures = sum(count for outcome, count in outcomes[phase].items() if outcome != "ok")
+        print(f"  {phase}: {len(values)} spans, total {sum(values):.1f}s, "
+              f"p50 {percentile(values, 0.50):.2f}s, p95 {percentile(values, 0.95):.2f}s, p99 {percentile(values, 0.99):.2f}s, "
+              f"{commands[phase] / len(values):.1f} commands/span, {failures} not ok")
+    
+    clients = outcomes.get("client", {}).get("ok", 0)
+    documents = outcomes.get("capture_pdf", {}).get("ok", 0)
+    print(f"  Throughput: {clients / elapsed_hours:.1f} clients/hour, {documents / elapsed_hours:.1f} documents/hour")
+
+# Page loads: full document loads are timed from the browser's Navigation Timing entry, per session
+# profile, so the standard and lean profiles can be compared
+page_loads = {}  # profile -> list of (load ms, resource count, transferred bytes)
+page_loads_lock = threading.Lock()
+
+PAGE_LOAD_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+if (!nav || nav.loadEventEnd === 0) { return null; }
+var resources = performance.getEntriesByType('resource');
+var bytes = nav.transferSize || 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {origin: performance.timeOrigin, load: nav.loadEventEnd, resources: resources.length, bytes: bytes};
+"""
+
+def record_page_load(driver, profile=None):
+    """Record the load time of the current document once it has finished loading"""
+    try:
+        timing = wait_until("page_load_timed", lambda: driver.execute_script(PAGE_LOAD_JS), 15)
+    except Exception:
+        timing = None
+    if not timing or getattr(driver, 'last_page_origin', None) == timing['origin']:
+        return None
+    driver.last_page_origin = timing['origin']
+    with page_loads_lock:
+        page_loads.setdefault(profile or SESSION_PROFILE, []).append((timing['load'], timing['resources'], timing['bytes']))
+    return timing
+
+def print_page_load_report():
+    """Print mean page load time, resource count and bytes per session profile"""
+    with page_loads_lock:
+        snapshot = {profile: list(loads) for profile, loads in page_loads.items()}
+    if not snapshot:
+        return
+    print(f"\n{'='*60}")
+    print("Page loads by session profile:")
+    print(f"{'='*60}")
+    for profile, loads in sorted(snapshot.items()):
+        count = len(loads)
+        print(f"  {profile}: {count} loads, mean {sum(load[0] for load in loads) / count:.0f}ms, "
+              f"{sum(load[1] for load in loads) / count:.1f} resources, {sum(load[2] for load in loads) / count / 1024:.1f} KB per page")
+
+# Live status: progress, rolling throughput, failures by phase, worker states and an ETA, served as
+# JSON (/status.json) and plain text (/) on 127.0.0.1:STATUS_PORT while the run is going. Off unless STATUS_PORT is set.
+STATUS_PORT = int(os.getenv("STATUS_PORT", "0"))
+STATUS_WINDOW_MINUTES = float(os.getenv("STATUS_WINDOW_MINUTES", "15"))  # Window of the rolling throughput
+STALL_MINUTES = float(os.getenv("STALL_MINUTES", "5"))  # No finished phase for this long marks the run stalled
+
+class RunStatus:
+    """Counters the workers update as they go, read by the status server"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_activity = self.started
+        self.letter = None
+        self.planned = 0
+        self.skipped = 0
+        self.clients_done = 0
+        self.clients_failed = 0
+        self.documents_done = 0
+        self.client_times = deque()
+        self.document_times = deque()
+        self.workers = {}  # worker id -> {state, letter, page, client_number, client, since}
+    
+    def plan(self, letter, client_count, skipped=0):
+        """Add the clients of a letter that this run is going to process"""
+        with self.lock:
+            self.letter = letter
+            self.planned += client_count
+            self.skipped += skipped
+    
+    def client_skipped(self):
+        """A planned client turned out to be finished already"""
+        with self.lock:
+            self.planned -= 1
+            self.skipped += 1
+    
+    def set_worker(self, worker_id, state, entry=None):
+        with self.lock:
+            worker = self.workers.setdefault(worker_id, {})
+            worker.update(state=state, since=time.time())
+            if entry:
+                worker.update(letter=entry['letter'], page=entry['page'], client_number=entry['client_number'], client=entry['name'])
+    
+    def client_finished(self, worker_id, succeeded):
+        now = time.time()
+        with self.lock:
+            if succeeded:
+                self.clients_done += 1
+                self.client_times.append(now)
+            else:
+                self.clients_failed += 1
+            self.workers.setdefault(worker_id, {}).update(state="between clients", since=now)
+    
+    def document_saved(self):
+        with self.lock:
+            self.documents_done += 1
+            self.document_times.append(time.time())
+    
+    def rate_per_hour(self, times, now):
+        """Rolling rate over the last STATUS_WINDOW_MINUTES (or the whole run while it is younger)"""
+        window = STATUS_WINDOW_MINUTES * 60
+        while times and times[0] < now - window:
+            times.popleft()
+        span = min(window, now - self.started)
+        return (len(times) / span * 3600) if span > 0 else 0.0
+    
+    def snapshot(self):
+        """Everything the status page shows, as a JSON-ready dict"""
+        now = time.time()
+        with span_lock:
+            failures = {
+                phase: {outcome: count for outcome, count in outcomes.items() if outcome != "ok"}
+                for phase, outcomes in span_outcomes.items()
+            }
+        with self.lock:
+            elapsed = now - self.started
+            clients_per_hour = self.rate_per_hour(self.client_times, now)
+            documents_per_hour = self.rate_per_hour(self.document_times, now)
+            remaining = max(0, self.planned - self.clients_done - self.clients_failed)
+            eta_seconds = remaining / clients_per_hour * 3600 if clients_per_hour > 0 else None
+            idle_seconds = now - self.last_activity
+            return {
+                'running_seconds': round(elapsed),
+                'letter': self.letter,
+                'clients': {
+                    'planned': self.planned, 'done': self.clients_done, 'failed': self.clients_failed,
+                    'skipped': self.skipped, 'remaining': remaining
+                },
+                'documents_done': self.documents_done,
+                'clients_per_hour': round(clients_per_hour, 1),
+                'documents_per_hour': round(documents_per_hour, 1),
+                'overall_clients_per_hour': round(self.clients_done / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+                'eta_seconds': round(eta_seconds) if eta_seconds is not None else None,
+                'eta': datetime.fromtimestamp(now + eta_seconds).isoformat(timespec='minutes') if eta_seconds is not None else None,
+                'seconds_since_activity': round(idle_seconds),
+                'stalled': idle_seconds > STALL_MINUTES * 60,
+                'failures_by_phase': {phase: outcomes for phase, outcomes in failures.items() if outcomes},
+                'paused_steps': {
+                    step: round(breaker.seconds_open()) for step, breaker in circuit_breakers.items() if breaker.seconds_open() > 0
+                },
+                'workers': {
+                    str(worker_id): dict(worker, seconds_in_state=round(now - worker['since']))
+                    for worker_id, worker in sorted(self.workers.items())
+                }
+            }
+
+run_status = RunStatus()
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    hours, remainder = divmod(int(seconds), 3600)
+    return f"{hours}h{remainder // 60:02d}m"
+
+def format_status(status):
+    """Plain-text version of a status snapshot"""
+    clients = status['clients']
+    lines = [
+        f"AESTHETICS PRO RUN  running {format_duration(status['running_seconds'])}"
+        + ("  ** STALLED **" if status['stalled'] else ""),
+        f"Letter: {status['letter'] or '-'}",
+        f"Clients: {clients['done']} done, {clients['failed']} failed, {clients['skipped']} skipped, "
+        f"{clients['remaining']} of {clients['planned']} remaining",
+        f"Documents: {status['documents_done']} saved",
+        f"Throughput: {status['clients_per_hour']:.0f} clients/h, {status['documents_per_hour']:.0f} docs/h "
+        f"(last {STATUS_WINDOW_MINUTES:.0f} min), {status['overall_clients_per_hour']:.0f} clients/h overall",
+        f"ETA: {format_duration(status['eta_seconds'])}" + (f" ({status['eta']})" if status['eta'] else ""),
+        f"Last activity: {status['seconds_since_activity']}s ago",
+        "Paused by circuit breakers: " + (", ".join(f"{step} ({seconds}s left)" for step, seconds in status['paused_steps'].items()) or "none"),
+        "",
+        "Workers:"
+    ]
+    for worker_id, worker in status['workers'].items():
+        client = f"  {worker.get('letter', '')} page {worker.get('page', '-')} #{worker.get('client_number', '-')} {worker.get('client', '')}"
+        lines.append(f"  {worker_id}: {worker['state']} for {worker['seconds_in_state']}s{client if worker['state'] == 'processing' else ''}")
+    lines.append("")
+    lines.append("Failures by phase:")
+    for phase, outcomes in sorted(status['failures_by_phase'].items()):
+        lines.append(f"  {phase}: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+    if not status['failures_by_phase']:
+        lines.append("  none")
+    return "\n".join(lines) + "\n"
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        status, path = 200, self.path.split("?")[0]
+        if path == "/status.json":
+            body, content_type = json.dumps(run_status.snapshot(), indent=1).encode(), "application/json"
+        elif path in ("/", "/status"):
+            body, content_type = format_status(run_status.snapshot()).encode(), "text/plain; charset=utf-8"
+        else:
+            status, body, content_type = 404, b"Not found", "text/plain"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_status_server(port=STATUS_PORT):
+    """Serve the run status on localhost in the background. Returns the server, or None"""
+    if not port:
+        return None
     try:
-        wait = WebDriverWait(driver, timeout)
-        wait.until(EC.invisibility_of_element_located((By.ID, "spinnerapplayout")))
+        server = ThreadingHTTPServer(("127.0.0.1", port), StatusHandler)
+    except OSError as e:
+        print(f"Could not start the status page on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="status-server", daemon=True).start()
+    print(f"Run status: http://127.0.0.1:{port}/ (JSON at /status.json)")
+    return server
+
+# Retry policies: the steps that talk to the site are retried with bounded exponential backoff and full jitter.
+# A circuit breaker per step pauses that step for every worker when it keeps failing everywhere (the site is
+# slow or down), instead of burning through clients. A client that still fails is dead-lettered in the journal,
+# and a second pass retries the dead letters once the main sweep is done.
+# RETRY_POLICIES overrides the defaults per step as attempts:base seconds:max seconds, e.g. "capture=5:2:60,navigate=4"
+RETRY_POLICY_OVERRIDES = os.getenv("RETRY_POLICIES", "")
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "8"))  # Failed attempts of a step in a row (all workers) that open its breaker
+BREAKER_PAUSE_SECONDS = float(os.getenv("BREAKER_PAUSE_SECONDS", "60"))  # Doubles each time the breaker reopens, up to 16x
+DEAD_LETTER_PASS = os.getenv("DEAD_LETTER_PASS", "1") == "1"
+
+@dataclass
+class RetryPolicy:
+    """How often a step is tried and how long to back off in between"""
+    attempts: int
+    base_delay: float
+    max_delay: float
+    
+    def backoff(self, retry):
+        """Full jitter: a random delay up to base_delay * 2^(retry - 1), capped at max_delay"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+RETRY_POLICIES = {
+    "navigate": RetryPolicy(3, 1, 10),
+    "open_client": RetryPolicy(2, 2, 15),
+    "expand_record": RetryPolicy(3, 0.5, 5),
+    "open_document": RetryPolicy(3, 0.5, 5),
+    "capture": RetryPolicy(3, 1, 10),
+    "close": RetryPolicy(2, 0.25, 2)
+}
+
+def apply_retry_overrides(overrides=RETRY_POLICY_OVERRIDES):
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        step, _, values = item.partition("=")
+        step = step.strip()
+        if step not in RETRY_POLICIES:
+            raise Exception(f"Unknown step '{step}' in RETRY_POLICIES. Use: {', '.join(RETRY_POLICIES)}")
+        numbers = [float(value) for value in values.split(":") if value.strip()]
+        policy = RETRY_POLICIES[step]
+        if len(numbers) > 0:
+            policy.attempts = max(1, int(numbers[0]))
+        if len(numbers) > 1:
+            policy.base_delay = numbers[1]
+        if len(numbers) > 2:
+            policy.max_delay = numbers[2]
+
+class CircuitBreaker:
+    """Opens after BREAKER_THRESHOLD failed attempts of one step in a row; while it is open, that step waits.
+    After the pause a single failure reopens it for twice as long, a single success closes it"""
+    
+    def __init__(self, step):
+        self.step = step
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+    
+    def seconds_open(self):
+        return max(0.0, self.open_until - time.time())
+    
+    def wait_until_closed(self):
+        announced = False
+        while True:
+            remaining = self.seconds_open()
+            if remaining <= 0:
+                return
+            if not announced:
+                print(f"      {self.step} is paused by its circuit breaker, waiting {remaining:.0f}s...")
+                announced = True
+            time.sleep(min(remaining, 5))
+    
+    def record(self, succeeded):
+        with self.lock:
+            if succeeded:
+                if self.trips:
+                    print(f"  Circuit breaker for {self.step} closed again")
+                self.failures = 0
+                self.trips = 0
+                return
+            self.failures += 1
+            if self.failures < BREAKER_THRESHOLD:
+                return
+            pause = BREAKER_PAUSE_SECONDS * 2 ** min(self.trips, 4)
+            self.open_until = time.time() + pause
+            self.trips += 1
+            self.failures = BREAKER_THRESHOLD - 1  # Half-open afterwards: the next failure reopens it
+        print(f"\n  Circuit breaker: {self.step} keeps failing, pausing it for {pause:.0f}s")
+
+circuit_breakers = {step: CircuitBreaker(step) for step in RETRY_POLICIES}
+
+# Per thread: steps that ran out of retries for the current client, and whether the dead-letter pass is running
+retry_state = threading.local()
+
+def with_retries(step, action, recover=None, description=""):
+    """Run action() under the step's retry policy and circuit breaker. A false result or an exception is a failed
+    attempt and recover() runs before the next one. Returns the last result, or raises the last exception"""
+    policy = RETRY_POLICIES[step]
+    breaker = circuit_breakers[step]
+    # The dead-letter pass tries each step once: whatever still fails is left for the next run
+    attempts = 1 if getattr(retry_state, 'fast', False) else policy.attempts
+    for attempt in range(1, attempts + 1):
+        breaker.wait_until_closed()
+        result, error = None, None
+        try:
+            result = action()
+        except Exception as e:
+            error = e
+        breaker.record(error is None and bool(result))
+        if error is None and result:
+            return result
+        if attempt < attempts:
+            delay = policy.backoff(attempt)
+            reason = f": {error}" if error else ""
+            print(f"      {step} failed{' for ' + description if description else ''}{reason}, "
+                  f"retrying in {delay:.1f}s ({attempt + 1}/{attempts})")
+            time.sleep(delay)
+            if recover:
+                try:
+                    recover()
+                except Exception as e:
+                    print(f"      Could not recover before retrying {step}: {e}")
+    
+    exhausted = getattr(retry_state, 'exhausted', None)
+    if exhausted is None:
+        exhausted = retry_state.exhausted = []
+    exhausted.append((step, description or str(error or "failed")))
+    if error:
+        raise error
+    return result
+
+def take_exhausted_steps():
+    """The (step, description) pairs that ran out of retries in this thread since the last call"""
+    exhausted = getattr(retry_state, 'exhausted', None) or []
+    retry_state.exhausted = []
+    return exhausted
+
+# Run journal: finished clients and documents are recorded on disk as they complete,
+# so a rerun (after a crash or Ctrl-C) skips them with one indexed lookup each.
+journal = None  # Opened by main(); shared by all workers
+
+class RunJournal:
+    """SQLite journal of finished clients and documents"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS clients (
+                client_key TEXT PRIMARY KEY,
+                client_id TEXT,
+                name TEXT,
+                letter TEXT,
+                client_number INTEGER,
+                completed_at REAL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS clients_by_letter ON clients (letter, client_number);
+            CREATE TABLE IF NOT EXISTS documents (
+                client_id TEXT,
+                record_title TEXT,
+                file_name TEXT,
+                path TEXT,
+                completed_at REAL,
+                PRIMARY KEY (client_id, record_title, file_name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS records (
+                client_id TEXT,
+                record_title TEXT,
+                synced_at REAL,
+                PRIMARY KEY (client_id, record_title)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS changes (
+                client_id TEXT,
+                record_title TEXT,
+                file_name TEXT,
+                change TEXT,
+                path TEXT,
+                completed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS changes_by_time ON changes (completed_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER,
+                pages INTEGER,
+                path TEXT,
+                stored_at REAL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                client_key TEXT PRIMARY KEY,
+                letter TEXT,
+                client_number INTEGER,
+                entry TEXT,
+                step TEXT,
+                reason TEXT,
+                failures INTEGER,
+                failed_at REAL
+            ) WITHOUT ROWID;
+        """)
+        # Older journals lack the document ID and content hash columns
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(documents)")]
+        for column in ("ref", "sha256"):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE documents ADD COLUMN {column} TEXT")
+        self.started = time.time()
+
+    def is_client_done(self, client_key, since=None):
+        """True when the client was finished, at or after the since timestamp if one is given"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM clients WHERE client_key = ? AND completed_at >= ?", (client_key, since or 0)
+            ).fetchone()
+        return row is not None
+
+    def saved_document(self, client_id, record_title, file_name):
+        """Return (path, document ID) of a finished document, or None"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT path, ref FROM documents WHERE client_id = ? AND record_title = ? AND file_name = ?",
+                (client_id, record_title, file_name)
+            ).fetchone()
+
+    def mark_document_done(self, client_id, record_title, file_name, path, ref=None, digest=None, blob_path=None):
+        """Record a saved document and its content hash, and log whether it was new or changed since the last save"""
+        now = time.time()
+        sha256 = digest.sha256 if digest else None
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT ref FROM documents WHERE client_id = ? AND record_title = ? AND file_name = ?",
+                (client_id, record_title, file_name)
+            ).fetchone()
+            if previous is None:
+                change = "new"
+            elif ref and previous[0] and ref != previous[0]:
+                change = "changed"
+            else:
+                change = "resaved"
+            self.connection.execute(
+                "INSERT OR REPLACE INTO documents (client_id, record_title, file_name, path, completed_at, ref, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (client_id, record_title, file_name, path, now, ref, sha256)
+            )
+            if digest:
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    (sha256, digest.size, digest.pages, blob_path, now)
+                )
+            self.connection.execute(
+                "INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?)",
+                (client_id, record_title, file_name, change, path, now)
+            )
+
+    def saved_documents(self):
+        """Every finished document as (client_id, record_title, file_name, path, sha256) rows"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT client_id, record_title, file_name, path, sha256 FROM documents"
+            ).fetchall()
+
+    def forget_documents(self, documents):
+        """Drop (client_id, record_title, file_name) documents, and the done marks of their records and clients"""
+        with self.lock:
+            self.connection.execute("BEGIN")
+            for client_id, record_title, file_name in documents:
+                self.connection.execute(
+                    "DELETE FROM documents WHERE client_id = ? AND record_title = ? AND file_name = ?",
+                    (client_id, record_title, file_name)
+                )
+                self.connection.execute(
+                    "DELETE FROM records WHERE client_id = ? AND record_title = ?", (client_id, record_title)
+                )
+                self.connection.execute("DELETE FROM clients WHERE client_id = ?", (client_id,))
+            self.connection.execute("COMMIT")
+
+    def shared_blobs(self):
+        """Content hashes saved for more than one client, as (sha256, client count) rows"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT sha256, COUNT(DISTINCT client_id) FROM documents WHERE sha256 IS NOT NULL "
+                "GROUP BY sha256 HAVING COUNT(DISTINCT client_id) > 1"
+            ).fetchall()
+
+    def synced_records(self, client_id):
+        """Titles of the client's records whose documents were all saved in an earlier sync"""
+        with self.lock:
+            rows = self.connection.execute("SELECT record_title FROM records WHERE client_id = ?", (client_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_records_synced(self, client_id, record_titles):
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+                [(client_id, record_title, now) for record_title in record_titles]
+            )
+
+    def changes_since(self, since):
+        """Documents saved at or after since as (client_id, record_title, file_name, change, path) rows"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT client_id, record_title, file_name, change, path FROM changes "
+                "WHERE completed_at >= ? ORDER BY client_id, record_title, file_name",
+                (since,)
+            ).fetchall()
+
+    def mark_client_done(self, client_key, client_id, name, letter, client_number):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?)",
+                (client_key, client_id, name, letter, client_number, time.time())
+            )
+            self.connection.execute("DELETE FROM dead_letters WHERE client_key = ?", (client_key,))
+
+    def add_dead_letter(self, client_key, entry, step, reason):
+        """Queue a failed client (its manifest entry) for the retry pass, counting how often it failed"""
+        with self.lock:
+            self.connection.execute("""
+                INSERT INTO dead_letters VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (client_key) DO UPDATE SET
+                    step = excluded.step, reason = excluded.reason, failures = failures + 1, failed_at = excluded.failed_at
+            """, (client_key, entry['letter'], entry['client_number'], json.dumps(entry), step, reason, time.time()))
+
+    def dead_letters(self, since=0):
+        """Dead-lettered clients that failed at or after since, as (entry, step, reason, failures)"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT entry, step, reason, failures FROM dead_letters WHERE failed_at >= ? ORDER BY letter, client_number",
+                (since,)
+            ).fetchall()
+        return [(json.loads(entry), step, reason, failures) for entry, step, reason, failures in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def client_key(name, onclick):
+    """Stable journal key for a client list entry: the ID in its clientdetails() call, else its name"""
+    match = re.search(r"clientdetails\(\s*['\"]?(\w+)", onclick or "")
+    return f"id:{match.group(1)}" if match else f"name:{name}"
+
+def client_done_since():
+    """Oldest finish time that still counts a client as done: any time normally, recently when delta syncing"""
+    return time.time() - DELTA_FRESH_HOURS * 3600 if DELTA_SYNC else None
+
+def is_client_finished(name, onclick):
+    return bool(journal) and journal.is_client_done(client_key(name, onclick), client_done_since())
+
+def write_delta_report():
+    """Write the documents this run added or changed to a CSV next to the journal and print a per-client summary"""
+    rows = journal.changes_since(journal.started)
+    print(f"\n{'='*60}")
+    print("DELTA SYNC REPORT")
+    print(f"{'='*60}")
+    if not rows:
+        print("  No new or changed documents")
+        return None
+    
+    report_path = os.path.join(MAIN_FOLDER, f"delta_report_{int(journal.started)}.csv")
+    with open(report_path, 'w', newline='', encoding='utf-8') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(['client_id', 'record_title', 'file_name', 'change', 'path'])
+        writer.writerows(rows)
+    
+    per_client = {}
+    for client_id, record_title, file_name, change, path in rows:
+        per_client.setdefault(client_id, []).append(f"{record_title} / {file_name} ({change})")
+    for client_id, documents in per_client.items():
+        print(f"  Client {client_id}: {len(documents)} documents")
+        for document in documents:
+            print(f"    {document}")
+    print(f"\n  {len(rows)} documents for {len(per_client)} clients, report saved to: {report_path}")
+    return report_path
+
+def wait_for_spinner_to_disappear(driver, timeout=30):
+    """Wait for any loading spinners to disappear"""
+    if wait_for_hidden(driver, "spinner_hidden", "spinnerapplayout", timeout):
         print("Spinner disappeared")
-    except TimeoutException:
+    else:
         print("Spinner timeout - continuing anyway")
 
-def wait_for_loading_to_complete(timeout=30):
+def wait_for_loading_to_complete(driver, timeout=30):
     """Wait for the 'Loading...' message to disappear and actual content to load"""
-    try:
-        wait = WebDriverWait(driver, timeout)
-        
-        # Wait for the loading message to disappear
-        wait.until(EC.invisibility_of_element_located(
-            (By.XPATH, "//td[contains(@class, 'dataTables_empty') and contains(text(), 'Loading...')]")
-        ))
+    loaded = wait_until(
+        "list_loaded",
+        lambda: page_check(driver, """
+            var cells = document.querySelectorAll('td.dataTables_empty');
+            for (var i = 0; i < cells.length; i++) {
+                if (cells[i].textContent.indexOf('Loading...') !== -1 && window.__apVisible(cells[i])) { return false; }
+            }
+            return true;
+        """),
+        timeout
+    )
+    if loaded:
         print("Loading completed!")
-        
-        # Give a small buffer for any final rendering
-        time.sleep(1)
-        
-    except TimeoutException:
+        # Return once the final rendering has settled instead of a fixed buffer
+        wait_for_dom_quiet(driver, quiet=0.25, timeout=5)
+    else:
         print("Loading timeout - continuing anyway")
 
-def close_modal_if_present():
+# Modal guard: a script Chrome runs in every page before the site's own scripts. CSS keeps toasts hidden and a
+# MutationObserver dismisses the client note popup and colorbox overlays the moment they appear, recording
+# each interruption, so no step has to wait for a popup that may never come. MODAL_GUARD=0 turns it off.
+MODAL_GUARD = os.getenv("MODAL_GUARD", "1") == "1"
+
+MODAL_GUARD_JS = """
+(function () {
+    if (window.__apGuard) { return; }
+    var guard = window.__apGuard = {events: []};
+    var shown = function (element) {
+        return !!element && getComputedStyle(element).display !== 'none' && element.getClientRects().length > 0;
+    };
+    var style = document.createElement('style');
+    style.textContent = 'div.toast, div.toast-body { display: none !important; }';
+    var addStyle = function () { (document.head || document.documentElement).appendChild(style); };
+    if (document.documentElement) { addStyle(); } else { document.addEventListener('DOMContentLoaded', addStyle); }
+
+    var sweep = function () {
+        var note = document.getElementById('clientnotepop');
+        if (shown(note)) {
+            var close = document.getElementById('cboxClose');
+            if (shown(close)) { close.click(); }
+            if (shown(note)) { note.style.display = 'none'; }
+            guard.events.push('client_note');
+        }
+        var colorbox = document.getElementById('colorbox');
+        if (shown(colorbox) || shown(document.getElementById('cboxOverlay'))) {
+            var colorboxClose = document.getElementById('cboxClose');
+            if (shown(colorboxClose)) { colorboxClose.click(); }
+            ['colorbox', 'cboxOverlay'].forEach(function (id) {
+                var element = document.getElementById(id);
+                if (shown(element)) { element.style.display = 'none'; }
+            });
+            guard.events.push('colorbox');
+        }
+        var toasts = document.querySelectorAll('div.toast');
+        for (var i = 0; i < toasts.length; i++) {
+            toasts[i].remove();
+            guard.events.push('toast');
+        }
+    };
+    new MutationObserver(sweep).observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ['style', 'class']});
+    sweep();
+})();
+"""
+
+# Closes record slides, x buttons, toasts and open modals in one round trip
+DISMISS_OVERLAYS_JS = """
+var shown = function (element) { return getComputedStyle(element).display !== 'none' && element.getClientRects().length > 0; };
+var closed = {slides: 0, buttons: 0, toasts: 0, modals: 0, blocking: 0};
+document.querySelectorAll('div.closeCustomSlide.nav-customclose').forEach(function (button) {
+    if (shown(button)) { button.click(); closed.slides += 1; }
+});
+document.querySelectorAll('a.close').forEach(function (button) {
+    if (button.className === 'close' && button.textContent.trim() === '\u00d7' && shown(button)) { button.click(); closed.buttons += 1; }
+});
+document.querySelectorAll('div.toast, div.toast-body').forEach(function (toast) {
+    if (toast.isConnected) { toast.remove(); closed.toasts += 1; }
+});
+document.querySelectorAll('.modal.show, #clientnotepop').forEach(function (modal) {
+    if (!shown(modal)) { return; }
+    var button = modal.querySelector(".close, .btn-close, [data-dismiss='modal'], [data-bs-dismiss='modal']");
+    if (button) { button.click(); closed.modals += 1; } else { closed.blocking += 1; }
+});
+return closed;
+"""
+
+def install_modal_guard(driver):
+    """Run the modal guard in every page this tab loads from now on, and in the current one"""
+    driver.modal_guard = False
+    if not MODAL_GUARD:
+        return
+    try:
+        execute_cdp(driver, "Page.addScriptToEvaluateOnNewDocument", {"source": MODAL_GUARD_JS})
+        driver.execute_script(MODAL_GUARD_JS)
+        driver.modal_guard = True
+    except Exception as e:
+        print(f"Could not install the modal guard, popups are handled with waits instead: {e}")
+
+def take_interruptions(driver):
+    """Interruptions the modal guard dismissed since the last call, e.g. ['client_note', 'toast']"""
+    try:
+        return driver.execute_script(
+            "var guard = window.__apGuard; if (!guard) { return []; } var events = guard.events; guard.events = []; return events;"
+        ) or []
+    except Exception:
+        return []
+
+def dismiss_overlays(driver):
+    """Close whatever slides, modals and toasts are open. Returns how many of each were closed"""
+    closed = driver.execute_script(DISMISS_OVERLAYS_JS)
+    # A modal without a close button only listens for a real ESC key press
+    if closed['blocking']:
+        driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
+    if closed['slides'] or closed['buttons'] or closed['modals'] or closed['blocking']:
+        wait_for_dom_quiet(driver)  # Give time for animations to complete
+    return closed
+
+@traced("close_modal_if_present", false_is_failure=False)
+def close_modal_if_present(driver):
     """Close the modal popup if it appears"""
+    # The guard already dismissed it if it came up; there is nothing to wait for
+    if getattr(driver, "modal_guard", False):
+        if "client_note" in take_interruptions(driver):
+            print("     Client note was dismissed by the modal guard")
+            return True
+        return False
+    
     try:
         print("    Waiting for modal to appear...")
         
         # Wait for the modal to appear after page load
-        modal = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.ID, "clientnotepop"))
-        )
+        if not wait_until("client_note_present", lambda: driver.find_elements(By.ID, "clientnotepop"), 15):
+            raise TimeoutException("clientnotepop never appeared")
         
         # Wait for modal to be visible
-        WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "clientnotepop"))
-        )
+        if not wait_for_visible(driver, "client_note_visible", "clientnotepop", 10):
+            raise TimeoutException("clientnotepop never became visible")
         
         print("     Modal appeared and is visible")
         
@@ -90,7 +1152,7 @@ def close_modal_if_present():
             print("     Modal force closed")
         
         # Wait for modal to disappear
-        time.sleep(2)
+        wait_for_hidden(driver, "client_note_closed", "clientnotepop", 5)
         return True
             
     except TimeoutException:
@@ -100,21 +1162,26 @@ def close_modal_if_present():
         print(f"     Error with modal: {e}")
         return False
 
-def extract_client_info():
+@traced("extract_client_info")
+def extract_client_info(driver):
     """Extract client name and ID from the client profile section"""
     try:
         print("    Extracting client information...")
         
-        # Find the client profile div
-        client_profile_div = driver.find_element(By.ID, "clientProfileInfoDiv")
+        # Snapshot the client profile div in one round trip and parse it locally
+        profile_html = driver.execute_script(
+            "var info = document.getElementById('clientProfileInfoDiv'); return info ? info.outerHTML : null;"
+        )
+        if not profile_html:
+            raise NoSuchElementException("clientProfileInfoDiv not found")
+        client_profile_div = lxml_html.fragment_fromstring(profile_html)
         
         # Extract client name from h5 tag
-        client_name_element = client_profile_div.find_element(By.TAG_NAME, "h5")
-        client_name = client_name_element.text.strip()
+        client_name = node_text(client_profile_div.xpath(".//h5")[0])
         
         # Extract client ID from the paragraph containing "ID:"
-        id_paragraph = client_profile_div.find_element(By.XPATH, ".//p[contains(text(), 'ID:')]")
-        client_id = id_paragraph.text.replace("ID:", "").strip()
+        id_paragraph = client_profile_div.xpath(".//p[contains(text(), 'ID:')]")[0]
+        client_id = node_text(id_paragraph).replace("ID:", "").strip()
         
         print(f"     Client Name: {client_name}")
         print(f"     Client ID: {client_id}")
@@ -138,65 +1205,41 @@ def extract_client_info():
         }
 
 
-def go_to_client_page(letter, page_number):
-    """
-    Click the letter and navigate to the correct pagination page.
-    Page 1 = no action. Page 2+ = click page number or next button (fallback).
-    """
-    print(f"    Navigating to page {page_number} for letter {letter}...")
-
-    if not click_letter(letter):
-        print(f"     Failed to click letter {letter}")
-        return False
-
-    if page_number == 1:
-        print(f"    ✓ Already on page 1")
-        return True
-
-    try:
-        # First try to click the page number directly
-        page_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, f"//div[@id='clientlistTableBody_paginate']//a[text()='{page_number}']")
-            )
-        )
-        page_button.click()
-        print(f"     Clicked on page number {page_number}")
-        wait_for_spinner_to_disappear()
-        time.sleep(2)
-        return True
-
-    except Exception as e:
-        print(f"     Page number {page_number} button not found, using 'Next' fallback...")
-
-        # Fallback: click "Next" multiple times
-        for i in range(1, page_number):
-            try:
-                next_button = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.ID, "clientlistTableBody_next"))
-                )
-                next_button.click()
-                print(f"     Clicked 'Next' ({i}/{page_number - 1})")
-                wait_for_spinner_to_disappear()
-                time.sleep(2)
-            except Exception as ex:
-                print(f"     Failed to click 'Next' on step {i}: {ex}")
-                return False
+# What the Electronic Records tab shows: 'records' once a parent record is in the tree, 'settled' once the
+# spinner is gone and the page has changed since the tab was clicked and then gone quiet, null while it is
+# still loading. Only li.parentrec and the spinner are markup known from the live site, so an empty tab is
+# recognised by settling without records, confirmed by a bounded re-check in process_electronic_records
+RECORDS_TREE_STATE_JS = """
+if (document.querySelector('li.parentrec') !== null) { return 'records'; }
+if (window.__apVisible(document.getElementById('spinnerapplayout'))) { return null; }
+if (window.__apReady.mutations > arguments[0] && Date.now() - window.__apReady.lastMutation >= arguments[1]) { return 'settled'; }
+return null;
+"""
+RECORDS_QUIET_MS = 500
+EMPTY_RECORDS_RECHECK_SECONDS = float(os.getenv("EMPTY_RECORDS_RECHECK_SECONDS", "2"))
 
-        return True
+def records_tree_state(driver, mutations_before):
+    return page_check(driver, RECORDS_TREE_STATE_JS, mutations_before, RECORDS_QUIET_MS)
 
+def has_parent_records(driver):
+    return page_check(driver, "return document.querySelector('li.parentrec') !== null;")
 
-def click_electronic_records():
-    """Click on Electronic Records tab"""
+@traced("click_electronic_records")
+def click_electronic_records(driver):
+    """Click on Electronic Records tab. Returns False when the tab did not switch and settle"""
     try:
         print("    Clicking Electronic Records tab...")
+        mutations_before = page_check(driver, "return window.__apReady.mutations;")
         
         # Use direct JavaScript execution since it works reliably
         driver.execute_script("changeClientTab(2);")
         print("     Electronic Records tab clicked")
         
-        # Wait for page to load
-        time.sleep(3)
+        # Wait for the records tree, or for the tab to switch and settle without one (a client with no records)
+        wait_for_spinner_to_disappear(driver)
+        if not wait_until("electronic_records_loaded", lambda: records_tree_state(driver, mutations_before), 15):
+            print("     Electronic Records did not finish loading")
+            return False
         return True
         
     except Exception as e:
@@ -208,7 +1251,10 @@ def create_client_folder(client_info):
     try:
         client_folder_path = os.path.join(MAIN_FOLDER, client_info['folder_name'])
         
-        if not os.path.exists(client_folder_path):
+        # With OUTPUT_LAYOUT=zip the documents go to "<folder>.zip" and the folder itself is never created
+        if OUTPUT_LAYOUT == "zip":
+            print(f"     Client archive: {client_folder_path}.zip")
+        elif not os.path.exists(client_folder_path):
             os.makedirs(client_folder_path)
             print(f"     Created client folder: {client_folder_path}")
         else:
@@ -242,6 +1288,155 @@ def handle_print_dialog():
         print(f"       Error handling print dialog: {e}")
         return False
 
+# Path separators become dashes, other characters Windows refuses in filenames are dropped
+FILENAME_TRANSLATION = str.maketrans({"/": "-", "\\": "-", ":": None, "*": None, "?": None, '"': None, "<": None, ">": None, "|": None})
+RECORD_TITLE_PATTERN = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(.*))?$", re.S)
+
+def safe_filename_part(text):
+    """Strip the characters that cannot appear in a filename"""
+    return text.translate(FILENAME_TRANSLATION)
+
+def parse_record_title(record_title):
+    """Split a record title like "06/08/2023 HRT LABS" into ("2023-06-08", "HRT LABS")"""
+    match = RECORD_TITLE_PATTERN.match(record_title.strip())
+    if match:
+        month, day, year, record_name = match.groups()
+        return f"{year}-{month.zfill(2)}-{day.zfill(2)}", record_name or ""
+    
+    # Fallback if the title does not start with a MM/DD/YYYY date
+    parts = record_title.split(' ', 1)
+    return parts[0].replace('/', '-') or "unknown-date", parts[1] if len(parts) > 1 else ""
+
+def build_record_pdf_path(file_name, client_folder_path, record_title, client_name):
+    """Build the final filename and full path for a treatment record PDF"""
+    formatted_date, record_name = parse_record_title(record_title)
+    print(f"      Parsed date: {formatted_date}, record name: {record_name}")
+    
+    # Clean the file name and other components
+    safe_file_name = safe_filename_part(file_name)
+    safe_record_name = safe_filename_part(record_name)
+    safe_client_name = safe_filename_part(client_name)
+    
+    # Create the new filename format: YYYY-MM-DD_RecordName FileName_Treatment_Records_ClientName.pdf
+    new_filename = f"{formatted_date}_{safe_record_name} {safe_file_name}_Treatment_Records_{safe_client_name}.pdf"
+    
+    # Full path includes client subfolder
+    full_path = os.path.join(os.path.abspath(client_folder_path), new_filename)
+    
+    print(f"      New filename format: {new_filename}")
+    
+    return new_filename, full_path
+
+# Download detection: watch the folders a save can land in and take the file the current save produced,
+# instead of scanning every PDF in the output tree. Uses inotify on Linux and polls elsewhere.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct("iIII")
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+def load_inotify():
+    """Return libc if it provides inotify, otherwise None"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+libc_inotify = load_inotify()
+
+class DownloadWatcher:
+    """Tracks PDFs completed in a set of folders from the moment it is created.
+    Partial downloads (.crdownload) are ignored until Chrome renames them to their final name"""
+    
+    def __init__(self, folders):
+        self.folders = [os.path.abspath(folder) for folder in dict.fromkeys(folders) if os.path.isdir(folder)]
+        self.completed = []  # Paths of PDFs finished since the watcher was created, in order
+        self.fd = None
+        self.watches = {}
+        self.started = time.monotonic()
+        if libc_inotify:
+            fd = libc_inotify.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self.fd = fd
+                for folder in self.folders:
+                    wd = libc_inotify.inotify_add_watch(fd, folder.encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+                    if wd >= 0:
+                        self.watches[wd] = folder
+        if self.fd is None:
+            # Polling fallback: remember what was already there
+            self.existing = {folder: set(os.listdir(folder)) for folder in self.folders}
+    
+    def is_complete_pdf(self, name):
+        return name.lower().endswith(".pdf") and not name.lower().endswith(PARTIAL_DOWNLOAD_SUFFIXES)
+    
+    def collect(self, timeout):
+        """Gather completed PDFs, blocking up to timeout seconds for new events"""
+        if self.fd is not None:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                wd, _, _, name_length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + name_length].rstrip(b"\0").decode(errors="replace")
+                offset += name_length
+                if wd in self.watches and self.is_complete_pdf(name):
+                    path = os.path.join(self.watches[wd], name)
+                    if path not in self.completed:
+                        self.completed.append(path)
+        else:
+            time.sleep(timeout)
+            for folder in self.folders:
+                names = set(os.listdir(folder))
+                for name in sorted(names - self.existing[folder]):
+                    if self.is_complete_pdf(name):
+                        self.completed.append(os.path.join(folder, name))
+                self.existing[folder] = names
+    
+    def pick(self, expected_path):
+        """Choose the file produced by this save: the expected path, the expected name in another folder,
+        or a PDF that is not one of our own renamed treatment records"""
+        expected_path = os.path.abspath(expected_path)
+        expected_name = os.path.basename(expected_path)
+        if expected_path in self.completed:
+            return expected_path
+        for path in self.completed:
+            if os.path.basename(path) == expected_name:
+                return path
+        for path in self.completed:
+            if "_Treatment_Records_" not in os.path.basename(path):
+                return path
+        return None
+    
+    def wait(self, expected_path, timeout=15):
+        """Wait for the save to complete. Returns the path it landed at, or None"""
+        deadline = time.monotonic() + timeout
+        path = None
+        while True:
+            path = self.pick(expected_path)
+            if path and os.path.exists(path) and os.path.getsize(path) > 0:
+                break
+            path = None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.collect(min(remaining, 0.25))
+        
+        elapsed = time.monotonic() - self.started
+        record_wait("download_completed", elapsed, path is not None)
+        if path:
+            print(f"       Download completed in {elapsed:.2f}s ({os.path.getsize(path)} bytes): {os.path.basename(path)}")
+        return path
+    
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
 def handle_save_dialog(file_name, client_folder_path, record_title, client_name):
     """Handle the OS save dialog using PyAutoGUI with client subfolder structure"""
     try:
@@ -250,46 +1445,14 @@ def handle_save_dialog(file_name, client_folder_path, record_title, client_name)
         # Wait for save dialog to appear
         time.sleep(1)
         
-        # Parse the date from record_title (e.g., "06/08/2023 HRT LABS" or "11/23/2022 HRT")
-        try:
-            # Split the record title to get date and rest
-            parts = record_title.split(' ', 1)
-            date_part = parts[0]  # "06/08/2023"
-            record_name = parts[1] if len(parts) > 1 else ""  # "HRT LABS"
-            
-            # Convert date from MM/DD/YYYY to YYYY-MM-DD
-            date_components = date_part.split('/')
-            if len(date_components) == 3:
-                month = date_components[0].zfill(2)
-                day = date_components[1].zfill(2)
-                year = date_components[2]
-                formatted_date = f"{year}-{month}-{day}"
-            else:
-                # Fallback if date parsing fails
-                formatted_date = date_part.replace('/', '-')
-                
-            print(f"      Parsed date: {date_part} -> {formatted_date}")
-            print(f"      Record name: {record_name}")
-            
-        except Exception as e:
-            print(f"      Error parsing date: {e}")
-            formatted_date = "unknown-date"
-            record_name = record_title
-        
-        # Clean the file name and other components
-        safe_file_name = file_name.replace("/", "-").replace("\\", "-").replace(":", "").replace("*", "").replace("?", "").replace('"', "").replace("<", "").replace(">", "").replace("|", "")
-        safe_record_name = record_name.replace("/", "-").replace("\\", "-").replace(":", "").replace("*", "").replace("?", "").replace('"', "").replace("<", "").replace(">", "").replace("|", "")
-        safe_client_name = client_name.replace("/", "-").replace("\\", "-").replace(":", "").replace("*", "").replace("?", "").replace('"', "").replace("<", "").replace(">", "").replace("|", "")
-        
-        # Create the new filename format: YYYY-MM-DD_RecordName FileName_Treatment_Records_ClientName.pdf
-        new_filename = f"{formatted_date}_{safe_record_name} {safe_file_name}_Treatment_Records_{safe_client_name}.pdf"
-        
-        # Full path includes client subfolder
-        full_path = os.path.join(os.path.abspath(client_folder_path), new_filename)
-        
-        print(f"      New filename format: {new_filename}")
+        new_filename, full_path = build_record_pdf_path(file_name, client_folder_path, record_title, client_name)
         print(f"      Typing full path: {full_path}")
         
+        # Start watching before the save so exactly this download is picked up
+        if not os.path.exists(client_folder_path):
+            os.makedirs(client_folder_path)
+        watcher = DownloadWatcher([client_folder_path, MAIN_FOLDER])
+        
         # Clear any existing filename and path
         pyautogui.hotkey('ctrl', 'a')
         time.sleep(0.2)
@@ -304,121 +1467,491 @@ def handle_save_dialog(file_name, client_folder_path, record_title, client_name)
         pyautogui.press('enter')
         print("       Pressed Enter to save file")
         
-        # Wait for file to be saved
-        time.sleep(3)
+        # Wait for the download this save produced
+        try:
+            landed_path = watcher.wait(full_path, 10)
+        finally:
+            watcher.close()
         
-        # Check if file was saved with the new name
-        if os.path.exists(full_path):
-            print(f"       File saved successfully: {new_filename}")
-            return True
+        if not landed_path:
+            print(f"       No PDF appeared after save!")
+            return False
+        
+        # Sometimes the file is saved with a different name or in the wrong folder;
+        # the post-processing stage moves/renames it to the expected name
+        if landed_path != os.path.abspath(full_path):
+            print(f"      File saved as: {os.path.basename(landed_path)}")
         else:
-            # Sometimes the file might be saved with a different name or in wrong location
-            try:
-                # Check in main folder
-                pdfs_main = glob.glob(os.path.join(os.path.abspath(MAIN_FOLDER), '*.pdf'))
-                # Check in client folder
-                pdfs_client = glob.glob(os.path.join(os.path.abspath(client_folder_path), '*.pdf'))
-                
-                all_pdfs = pdfs_main + pdfs_client
-                
-                if all_pdfs:
-                    newest_pdf = max(all_pdfs, key=os.path.getmtime)
-                    # If it's not our expected file, move/rename it
-                    if newest_pdf != full_path:
-                        print(f"      File saved as: {os.path.basename(newest_pdf)}")
-                        print(f"      Moving/renaming to: {new_filename}")
-                        # Ensure client folder exists
-                        if not os.path.exists(client_folder_path):
-                            os.makedirs(client_folder_path)
-                        shutil.move(newest_pdf, full_path)
-                        print(f"       File moved/renamed successfully")
-                    return True
-                else:
-                    print(f"       No PDFs found after save!")
-                    return False
-            except Exception as e:
-                print(f"       Error checking/moving file: {e}")
-                return False
+            print(f"       File saved: {new_filename}")
+        return PdfLanded(full_path, landed_path=landed_path)
     
     except Exception as e:
         print(f"       Error handling save dialog: {e}")
         return False
 
 
-def click_print_button():
-    """Click the print button inside the modal/slide"""
+# Replaces window.print in the page (and its same-origin frames) so that runPrint() only flags
+# the request instead of opening Chrome's print dialog; the form is then rendered with printToPDF.
+PRINT_HOOK_JS = """
+window.__apPrintRequests = 0;
+var hookPrint = function (win) {
+    try { win.print = function () { window.top.__apPrintRequests += 1; }; } catch (e) {}
+};
+hookPrint(window);
+for (var i = 0; i < window.frames.length; i++) { hookPrint(window.frames[i]); }
+"""
+
+def execute_cdp(driver, command, params=None):
+    """Run a Chrome DevTools Protocol command on the current tab (works for Chrome and Remote sessions alike)"""
+    return driver.execute("executeCdpCommand", {"cmd": command, "params": params or {}})['value']
+
+def block_page_assets(driver, blocked):
+    """Turn the lean profile's asset blocking on or off. Record forms are opened with it off,
+    so the images and fonts in a captured PDF are kept"""
+    if getattr(driver, 'session_profile', None) != "lean":
+        return
     try:
-        print("      Clicking print button in modal...")
-        
-        # Initial wait for modal to appear
-        time.sleep(7)
-        
-        # Remove any toast notifications that might interfere
-        try:
-            toasts = driver.find_elements(By.CSS_SELECTOR, "div.toast-body, div.toast, div.d-flex:has(div.toast-body)")
-            removed_count = 0
-            for toast in toasts:
-                if toast.is_displayed():
-                    try:
-                        # Try to remove it from DOM
-                        driver.execute_script("arguments[0].remove();", toast)
-                        removed_count += 1
-                    except:
-                        try:
-                            # If removal fails, try to hide it
-                            driver.execute_script("arguments[0].style.display = 'none';", toast)
-                            removed_count += 1
-                        except:
-                            pass
-            
-            if removed_count > 0:
-                print(f"       Removed {removed_count} toast notification(s)")
-                time.sleep(1)
-        except Exception as e:
-            print(f"      Toast removal attempted")
-        
-        # Check if the form is fully loaded by looking for the action buttons
-        print("      Checking if form is fully loaded...")
-        form_loaded = False
-        max_wait = 40  # Maximum 20 seconds to wait for form
-        wait_time = 0
+        execute_cdp(driver, "Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS if blocked else []})
+    except Exception as e:
+        print(f"      Could not change asset blocking: {e}")
+
+def prepare_print_capture(driver):
+    """Get the page ready for the capture backend before the print button is clicked"""
+    if CAPTURE_BACKEND != "cdp":
+        return
+    try:
+        driver.execute_script(PRINT_HOOK_JS)
+    except Exception as e:
+        print(f"      Could not install print hook: {e}")
+
+# Content-addressed PDF store: every saved PDF is hashed and checked while it is written, kept once under
+# .store/<sha256> and hard-linked into the client folders. VERIFY_STORE=1 re-checks saved documents at startup.
+PDF_STORE = os.getenv("PDF_STORE", "1") == "1"
+VERIFY_STORE = os.getenv("VERIFY_STORE", "0") == "1"
+STORE_FOLDER = os.path.join(MAIN_FOLDER, ".store")
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+PDF_TAIL_SIZE = 1024  # %%EOF must appear within the last 1024 bytes
+
+class PdfDigest:
+    """SHA-256 and cheap integrity checks of a PDF, computed chunk by chunk as it is written"""
+    
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.tail = b""
+        self.pages = 0
+        self.object_streams = False
+    
+    def update(self, chunk):
+        """Feed the next chunk. Raises straight away when the data does not start like a PDF"""
+        if len(self.head) < 5:
+            self.head += chunk[:5 - len(self.head)]
+            if len(self.head) == 5 and self.head != b"%PDF-":
+                raise Exception("not a PDF")
+        self.sha.update(chunk)
+        self.size += len(chunk)
         
-        while wait_time < max_wait and not form_loaded:
+        # Matches inside the carried-over tail were counted with the previous chunk
+        window = self.tail + chunk
+        self.pages += len(PDF_PAGE_PATTERN.findall(window)) - len(PDF_PAGE_PATTERN.findall(self.tail))
+        self.object_streams = self.object_streams or b"/ObjStm" in window
+        self.tail = window[-PDF_TAIL_SIZE:]
+    
+    @property
+    def sha256(self):
+        return self.sha.hexdigest()
+    
+    def check(self):
+        """Return what is wrong with the PDF, or None"""
+        if self.size == 0:
+            return "file is empty"
+        if self.head != b"%PDF-":
+            return "not a PDF"
+        if b"%%EOF" not in self.tail:
+            return "truncated (no %%EOF)"
+        # Page objects packed into object streams cannot be counted without a PDF parser
+        if self.pages == 0 and not self.object_streams:
+            return "no pages"
+        return None
+
+def file_chunks(path, chunk_size=256 * 1024):
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(chunk_size), b""):
+            yield chunk
+
+def digest_file(path):
+    """Hash and check a saved PDF (a file, or a member of a client archive)"""
+    digest = PdfDigest()
+    with open_document(path) as document_file:
+        for chunk in iter(lambda: document_file.read(256 * 1024), b""):
+            digest.update(chunk)
+    return digest
+
+def store_blob_path(sha256):
+    return os.path.join(STORE_FOLDER, sha256[:2], sha256 + ".pdf")
+
+def blob_matches(blob_path, digest):
+    """Whether the stored blob still holds exactly the content digest describes (size first, then SHA-256)"""
+    try:
+        if os.path.getsize(blob_path) != digest.size:
+            return False
+        return digest_file(blob_path).sha256 == digest.sha256
+    except Exception:
+        return False
+
+def link_into_place(source, final_path):
+    """Hard-link a stored PDF to final_path (copying where links are not supported), replacing what is there"""
+    temp_path = final_path + ".part"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, final_path)
+
+def store_pdf(chunks, final_path, metadata=None):
+    """Write PDF chunks to disk while hashing and checking them, then file the result under final_path.
+    With PDF_STORE the content is kept once in the store and linked to final_path; with OUTPUT_LAYOUT=zip it is
+    appended to the client's archive instead. Returns (saved document path, digest, store path)"""
+    folder = os.path.dirname(final_path)
+    if OUTPUT_LAYOUT == "zip":
+        incoming_folder = MAIN_FOLDER
+    else:
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        incoming_folder = STORE_FOLDER if PDF_STORE else folder
+    if not os.path.exists(incoming_folder):
+        os.makedirs(incoming_folder, exist_ok=True)
+    temp_path = os.path.join(incoming_folder, f".incoming-{uuid.uuid4().hex}.part")
+    
+    digest = PdfDigest()
+    try:
+        with open(temp_path, 'wb') as pdf_file:
+            for chunk in chunks:
+                digest.update(chunk)
+                pdf_file.write(chunk)
+        error = digest.check()
+        if error:
+            raise Exception(error)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    
+    if OUTPUT_LAYOUT == "zip":
+        try:
+            saved_path = ClientArchive(folder + ".zip").add(
+                temp_path, os.path.basename(final_path),
+                dict(metadata or {}, sha256=digest.sha256, pages=digest.pages)
+            )
+        finally:
+            os.remove(temp_path)
+        return saved_path, digest, None
+    
+    if not PDF_STORE:
+        os.replace(temp_path, final_path)
+        return final_path, digest, None
+    
+    blob_path = store_blob_path(digest.sha256)
+    if os.path.exists(blob_path) and blob_matches(blob_path, digest):
+        # Identical document already stored: link the existing copy
+        os.remove(temp_path)
+    else:
+        if os.path.exists(blob_path):
+            print(f"       Stored copy {os.path.basename(blob_path)} does not match its hash, replacing it")
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(temp_path, blob_path)
+    link_into_place(blob_path, final_path)
+    return final_path, digest, blob_path
+
+def verify_saved_documents():
+    """Re-check every document in the journal. Bad or missing ones are dropped from the journal (with their
+    clients' done marks) so this run fetches them again; everything else stays skipped"""
+    documents = journal.saved_documents()
+    print(f"\nVerifying {len(documents)} saved documents...")
+    bad_documents = []
+    for client_id, record_title, file_name, path, sha256 in documents:
+        if not document_exists(path):
+            problem = "missing"
+        else:
             try:
-                # Look for the specific form action buttons that indicate the form is loaded
-                er_icons_div = driver.find_elements(By.CSS_SELECTOR, "div.er_icons")
-                email_download_buttons = driver.find_elements(By.XPATH, "//div[@class='er_icons']//div[contains(@onclick, 'emailDownloadERC')]")
-                refresh_form_buttons = driver.find_elements(By.XPATH, "//div[@class='er_icons']//div[contains(@onclick, 'refreshFormERC')]")
-                
-                # Also check for the print button itself
-                print_slide = driver.find_elements(By.ID, "printslide")
-                
-                if er_icons_div and email_download_buttons and refresh_form_buttons and print_slide:
-                    form_loaded = True
-                    print(f"       Form is fully loaded (Email/Download and Refresh Form buttons are present)")
-                else:
-                    components_found = []
-                    if er_icons_div:
-                        components_found.append("er_icons div")
-                    if email_download_buttons:
-                        components_found.append("Email/Download button")
-                    if refresh_form_buttons:
-                        components_found.append("Refresh Form button")
-                    if print_slide:
-                        components_found.append("print slide")
-                    
-                    print(f"      Waiting for form to load... ({wait_time}s) - Found: {', '.join(components_found) if components_found else 'none'}")
-                    time.sleep(3)
-                    wait_time += 2
-                    
+                digest = digest_file(path)
+                problem = digest.check()
+                if not problem and sha256 and digest.sha256 != sha256:
+                    problem = "content changed since it was saved"
             except Exception as e:
-                print(f"      Error checking form load status: {e}")
-                time.sleep(2)
-                wait_time += 2
+                problem = str(e)
+        if problem:
+            print(f"  Client {client_id}: {record_title} / {file_name}: {problem}")
+            bad_documents.append((client_id, record_title, file_name))
+    
+    journal.forget_documents(bad_documents)
+    print(f"  {len(documents) - len(bad_documents)} good, {len(bad_documents)} bad or missing (queued to be fetched again)")
+    
+    # The same content under several clients usually means a save picked up the wrong file
+    for sha256, client_count in journal.shared_blobs():
+        print(f"  Same content saved for {client_count} different clients: {store_blob_path(sha256)}")
+    return bad_documents
+
+
+# Post-processing stage: everything after a PDF is captured (write/rename, verify, journal) runs on
+# background threads so the browser can open the next document straight away
+POSTPROCESS_WORKERS = max(1, int(os.getenv("POSTPROCESS_WORKERS", "2")))
+POSTPROCESS_QUEUE_SIZE = max(1, int(os.getenv("POSTPROCESS_QUEUE_SIZE", "16")))
+
+@dataclass
+class PdfLanded:
+    """A captured PDF: either bytes still to be written, or a file that landed somewhere on disk"""
+    final_path: str
+    pdf_bytes: bytes = None
+    landed_path: str = None
+    client_id: str = None
+    record_title: str = None
+    file_name: str = None
+    ref: str = None
+
+def finalize_landed_pdf(event):
+    """Write or move a captured PDF into the store and its final path, checking it on the way, and journal it"""
+    metadata = {'client_id': event.client_id, 'record_title': event.record_title, 'file_name': event.file_name, 'ref': event.ref}
+    if event.pdf_bytes is not None:
+        saved_path, digest, blob_path = store_pdf([event.pdf_bytes], event.final_path, metadata)
+    else:
+        source_path = event.landed_path or event.final_path
+        if not os.path.exists(source_path):
+            raise Exception("file missing")
+        moved = os.path.abspath(source_path) != os.path.abspath(event.final_path)
+        if moved:
+            print(f"      Moving {os.path.basename(source_path)} -> {os.path.basename(event.final_path)}")
+        saved_path, digest, blob_path = store_pdf(file_chunks(source_path), event.final_path, metadata)
+        if moved:
+            os.remove(source_path)
+    
+    record_saved_document(event.client_id, event.record_title, event.file_name, saved_path, event.ref, digest, blob_path)
+
+def record_saved_document(client_id, record_title, file_name, path, ref, digest, blob_path):
+    """Journal a saved PDF and hand it to the text index"""
+    run_status.document_saved()
+    if journal and client_id:
+        journal.mark_document_done(client_id, record_title, file_name, path, ref, digest, blob_path)
+    if text_indexer:
+        try:
+            record_date, record_type = parse_record_title(record_title) if record_title else ("", "")
+            text_indexer.add(path, digest.sha256 if digest else None, client_id=client_id,
+                             record_date=record_date, record_type=record_type, file_name=file_name)
+        except Exception as e:
+            print(f"       Could not queue {os.path.basename(path)} for the text index: {e}")
+
+class PostProcessor:
+    """Bounded queue plus worker threads that finalize captured PDFs.
+    submit() blocks while the queue is full, so a slow disk slows capture down instead of growing memory"""
+    
+    def __init__(self, worker_count=POSTPROCESS_WORKERS, queue_size=POSTPROCESS_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.pending = {}  # client_id -> documents still in the queue
+        self.failed_clients = set()
+        self.client_callbacks = {}  # client_id -> callbacks, one per finished attempt, called with True/False once its documents are finalized
+        self.finalized = 0
+        self.failures = []
+        self.blocked_time = 0.0
+        self.drained = False
+        self.threads = [
+            threading.Thread(target=self.run, name=f"postprocess-{i + 1}", daemon=True)
+            for i in range(worker_count)
+        ]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, event):
+        """Queue a captured PDF, waiting for room when the stage is behind"""
+        with self.lock:
+            self.pending[event.client_id] = self.pending.get(event.client_id, 0) + 1
+        started = time.monotonic()
+        self.queue.put(event)
+        waited = time.monotonic() - started
+        if waited > 0.05:
+            with self.lock:
+                self.blocked_time += waited
+    
+    def finish_client(self, client_id, callback):
+        """Call callback(all_saved) once every document queued for the client has been finalized.
+        A client reprocessed while its earlier saves are still queued gets both callbacks, not just the last one"""
+        with self.lock:
+            if self.pending.get(client_id, 0) > 0:
+                self.client_callbacks.setdefault(client_id, []).append(callback)
+                return
+            all_saved = client_id not in self.failed_clients
+            self.failed_clients.discard(client_id)
+        callback(all_saved)
+    
+    def run(self):
+        """Worker loop: finalize events until the shutdown sentinel arrives"""
+        while True:
+            event = self.queue.get()
+            try:
+                if event is None:
+                    return
+                try:
+                    finalize_landed_pdf(event)
+                    error = None
+                    print(f"       [post] Saved {os.path.basename(event.final_path)}")
+                except Exception as e:
+                    error = str(e)
+                    print(f"       [post] Failed to finalize {os.path.basename(event.final_path)}: {e}")
+                
+                callbacks = []
+                with self.lock:
+                    if error is None:
+                        self.finalized += 1
+                    else:
+                        self.failures.append((event.final_path, error))
+                        self.failed_clients.add(event.client_id)
+                    self.pending[event.client_id] -= 1
+                    if self.pending[event.client_id] == 0:
+                        del self.pending[event.client_id]
+                        callbacks = self.client_callbacks.pop(event.client_id, [])
+                        if callbacks:
+                            all_saved = event.client_id not in self.failed_clients
+                            self.failed_clients.discard(event.client_id)
+                for callback in callbacks:
+                    try:
+                        callback(all_saved)
+                    except Exception as e:
+                        print(f"       [post] Error completing client {event.client_id}: {e}")
+            finally:
+                self.queue.task_done()
+    
+    def wait_idle(self):
+        """Wait until every queued file is finalized and its client callbacks have run. The workers keep running,
+        so files submitted afterwards (e.g. by the dead-letter pass) are finalized too"""
+        if self.queue.unfinished_tasks:
+            print(f"\nWaiting for {self.queue.unfinished_tasks} captured PDFs to be finalized...")
+        self.queue.join()
+    
+    def drain(self):
+        """Finish every queued file and stop the workers. Safe to call more than once"""
+        if self.drained:
+            return
+        self.drained = True
+        self.wait_idle()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        print(f"Post-processing: {self.finalized} PDFs finalized, {len(self.failures)} failed, "
+              f"capture waited {self.blocked_time:.1f}s on a full queue")
+        for path, error in self.failures:
+            print(f"  Failed: {os.path.basename(path)} ({error})")
+
+postprocessor = None  # Started by main(); shared by all workers
+text_indexer = None  # Started by main() unless EXTRACT_WORKERS=0; see Aesthetics_Pro_Search.py
+
+def submit_landed_pdf(event):
+    """Hand a captured PDF to the post-processing stage, or finalize it inline when the stage is not running"""
+    if postprocessor:
+        postprocessor.submit(event)
+        return True
+    try:
+        finalize_landed_pdf(event)
+        return True
+    except Exception as e:
+        print(f"       Failed to finalize {os.path.basename(event.final_path)}: {e}")
+        return False
+
+def capture_pdf_devtools(driver, file_name, client_folder_path, record_title, client_name):
+    """Render the open record form with DevTools Page.printToPDF and write it to its final filename"""
+    main_window = driver.current_window_handle
+    switched_window = False
+    try:
+        print("      Capturing PDF with DevTools printToPDF...")
+        new_filename, full_path = build_record_pdf_path(file_name, client_folder_path, record_title, client_name)
+        
+        # runPrint() either calls window.print (hooked) or opens a print window
+        handles_before = set(driver.window_handles)
+        requested = wait_until(
+            "print_requested",
+            lambda: len(driver.window_handles) > len(handles_before) or page_check(driver, "return window.__apPrintRequests > 0;"),
+            5
+        )
+        if not requested:
+            print("      No print request seen, rendering the current page")
         
-        if not form_loaded:
+        new_handles = [handle for handle in driver.window_handles if handle not in handles_before]
+        if new_handles:
+            driver.switch_to.window(new_handles[-1])
+            switched_window = True
+            wait_until("print_window_loaded", lambda: driver.execute_script("return document.readyState;") == "complete", 15)
+            print("       Switched to print window")
+        
+        result = execute_cdp(driver, "Page.printToPDF", {
+            "printBackground": True,
+            "preferCSSPageSize": True
+        })
+        pdf_bytes = base64.b64decode(result['data'])
+        print(f"       Rendered {new_filename} ({len(pdf_bytes)} bytes)")
+        
+        # Writing and verifying happens in the post-processing stage
+        return PdfLanded(full_path, pdf_bytes=pdf_bytes)
+        
+    except Exception as e:
+        print(f"       Error capturing PDF with DevTools: {e}")
+        return False
+    finally:
+        if switched_window:
+            try:
+                driver.close()
+            except Exception:
+                pass
+            driver.switch_to.window(main_window)
+
+def capture_pdf_dialogs(driver, file_name, client_folder_path, record_title, client_name):
+    """Save the record through Chrome's print dialog and the OS save dialog with PyAutoGUI"""
+    if not handle_print_dialog():
+        print(f"         Failed to handle print dialog for {file_name}")
+        return False
+    print(f"         Print dialog handled successfully")
+    return handle_save_dialog(file_name, client_folder_path, record_title, client_name)
+
+CAPTURE_BACKENDS = {
+    "cdp": capture_pdf_devtools,
+    "pyautogui": capture_pdf_dialogs
+}
+
+@traced("capture_pdf")
+def capture_record_pdf(driver, file_name, client_folder_path, record_title, client_name):
+    """Capture the record form opened by click_print_button() with the configured capture backend.
+    Returns a PdfLanded event for the post-processing stage, or a false value on failure"""
+    return CAPTURE_BACKENDS[CAPTURE_BACKEND](driver, file_name, client_folder_path, record_title, client_name)
+
+
+@traced("click_print_button")
+def click_print_button(driver):
+    """Click the print button inside the modal/slide"""
+    try:
+        print("      Clicking print button in modal...")
+        
+        # Check if the form is fully loaded by looking for the action buttons
+        print("      Checking if form is fully loaded...")
+        if wait_for_record_form(driver, timeout=40):
+            print(f"       Form is fully loaded (Email/Download and Refresh Form buttons are present)")
+        else:
             print("        Form action buttons not found, but proceeding anyway...")
         
+        # Remove any toast notifications that might interfere (the modal guard already keeps them hidden)
+        if not getattr(driver, "modal_guard", False):
+            try:
+                removed_count = driver.execute_script("""
+                    var toasts = document.querySelectorAll('div.toast, div.toast-body');
+                    toasts.forEach(function (toast) { toast.remove(); });
+                    return toasts.length;
+                """)
+                if removed_count > 0:
+                    print(f"       Removed {removed_count} toast notification(s)")
+            except Exception as e:
+                print(f"      Toast removal attempted")
+        
+        
         # The print button is inside the printslide div
         try:
             # First try to find the printslide div
@@ -432,7 +1965,8 @@ def click_print_button():
             # Ensure print button is visible and enabled
             if not print_button.is_displayed():
                 driver.execute_script("arguments[0].scrollIntoView(true);", print_button)
-                time.sleep(1)
+            
+            prepare_print_capture(driver)
             
             # Click the button
             try:
@@ -446,6 +1980,7 @@ def click_print_button():
             print(f"      DEBUG: Error with standard approach: {e}")
             # Fallback: Try to execute the onclick function directly
             try:
+                prepare_print_capture(driver)
                 driver.execute_script("runPrint();")
                 print("       Print function called")
             except Exception as e2:
@@ -458,7 +1993,8 @@ def click_print_button():
         print(f"       Error clicking print button: {e}")
         return False
 
-def close_pdf_dialog():
+@traced("close_pdf_dialog")
+def close_pdf_dialog(driver):
     """Close the PDF dialog/modal after saving"""
     try:
         print("      Closing modal after save...")
@@ -490,7 +2026,6 @@ def close_pdf_dialog():
             try:
                 # Scroll into view first
                 driver.execute_script("arguments[0].scrollIntoView(true);", close_button)
-                time.sleep(0.5)
                 close_button.click()
                 print("       Modal closed")
             except:
@@ -506,23 +2041,475 @@ def close_pdf_dialog():
                 return False
         
         # Wait for modal to close
-        time.sleep(2)
+        wait_for_hidden(driver, "record_form_closed", "printslide", 10)
         return True
         
     except Exception as e:
         print(f"       Error closing modal: {e}")
         return False
 
-def process_treatment_record_files(treatment_records_li, record_title, client_folder_path, client_name):
-    """Process all files in a Treatment Record folder"""
+# Records tree snapshots: the Electronic Records tree is read with one outerHTML round trip after each
+# DOM change and parsed locally, so WebDriver is only used for the clicks that change the tree.
+@dataclass
+class RecordDocument:
+    """A _doc item inside a Treatment Records folder"""
+    dom_id: str
+    name: str
+    onclick: str
+    launch_function: str
+    launch_args: list = field(default_factory=list)
+
+@dataclass
+class TreatmentFolder:
+    """The Treatment Records folder of a parent record"""
+    expanded: bool
+    active: bool
+    documents: list = field(default_factory=list)
+
+@dataclass
+class ParentRecord:
+    """A li.parentrec entry of the Electronic Records tree"""
+    index: int
+    title: str
+    expanded: bool
+    treatment_folder: TreatmentFolder = None
+
+# One argument of a JS call and the ',' or ')' after it; commas and parentheses inside quotes belong to the argument
+JS_ARG_PATTERN = re.compile(r"""\s*(?:'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)"|([^,)'"]*?))\s*([,)])""")
+
+def parse_js_call(onclick, function_pattern):
+    """Split the first call matching function_pattern in an onclick into (function name, [arguments])"""
+    match = re.search(r"(%s)\s*\(\s*" % function_pattern, onclick or "")
+    if not match:
+        return None, []
+    args = []
+    position = match.end()
+    if onclick.startswith(")", position):
+        return match.group(1), args
+    while True:
+        arg = JS_ARG_PATTERN.match(onclick, position)
+        if not arg:
+            # Unterminated call or an argument we cannot split (a nested call): not a call we understand
+            return None, []
+        quoted = arg.group(1) if arg.group(1) is not None else arg.group(2)
+        args.append(quoted if quoted is not None else arg.group(3))
+        position = arg.end()
+        if arg.group(4) == ")":
+            return match.group(1), args
+
+def node_text(node):
+    """Visible-ish text of an lxml node with whitespace collapsed"""
+    return " ".join(node.text_content().split())
+
+def has_class(node, class_name):
+    return class_name in (node.get("class") or "").split()
+
+def parse_parent_record(record_li, index):
+    """Turn one li.parentrec element into a ParentRecord"""
+    caret = record_li.xpath(".//span[contains(concat(' ', normalize-space(@class), ' '), ' parentcaret ')]")[0]
+    title_link = caret.xpath(".//a")[0]
+    record = ParentRecord(index=index, title=node_text(title_link), expanded=has_class(caret, "caret-down"))
+    
+    folders = record_li.xpath(".//li[span[contains(@class, 'caret')]//a[contains(text(), 'Treatment Records')]]")
+    if not folders:
+        return record
+    folder_li = folders[0]
+    folder_caret = folder_li.xpath("./span[contains(@class, 'caret')]")[0]
+    nested = folder_li.xpath("./ul[contains(@class, 'nested') and contains(@class, 'sub-nested')]")
+    folder = TreatmentFolder(
+        expanded=has_class(folder_caret, "caret-down"),
+        active=bool(nested) and has_class(nested[0], "active")
+    )
+    
+    if nested:
+        doc_links = nested[0].xpath(
+            "./li[contains(@id, '_doc')]/div[contains(@class, 'slide')]/a[contains(@onclick, 'launchERForm')]"
+        )
+        for file_index, doc_link in enumerate(doc_links):
+            name_nodes = doc_link.xpath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' treetextitem ')]")
+            file_name = node_text(name_nodes[0]) if name_nodes else node_text(doc_link)
+            onclick = doc_link.get("onclick") or ""
+            launch_function, launch_args = parse_js_call(onclick, r"launchE\w*")
+            folder.documents.append(RecordDocument(
+                dom_id=doc_link.getparent().getparent().get("id"),
+                name=file_name or f"File_{file_index + 1}",
+                onclick=onclick,
+                launch_function=launch_function,
+                launch_args=launch_args
+            ))
+    
+    record.treatment_folder = folder
+    return record
+
+def snapshot_records_tree(driver):
+    """Snapshot the whole Electronic Records tree in one round trip and parse it"""
+    tree_html = driver.execute_script("""
+        var records = document.querySelectorAll('li.parentrec');
+        var parts = [];
+        for (var i = 0; i < records.length; i++) { parts.push(records[i].outerHTML); }
+        return '<ul>' + parts.join('') + '</ul>';
+    """)
+    tree = lxml_html.fragment_fromstring(tree_html)
+    return [parse_parent_record(record_li, index) for index, record_li in enumerate(tree.xpath("./li"))]
+
+def snapshot_parent_record(driver, record_index):
+    """Re-read a single parent record after it changed"""
+    record_html = driver.execute_script(
+        "var record = document.querySelectorAll('li.parentrec')[arguments[0]]; return record ? record.outerHTML : null;",
+        record_index
+    )
+    if not record_html:
+        return None
+    return parse_parent_record(lxml_html.fragment_fromstring(record_html), record_index)
+
+@traced("expand_record_tree")
+def toggle_record_caret(driver, record_index, condition, treatment_folder=False):
+    """Click a parent record (or its Treatment Records folder) open and wait for its caret to turn down"""
+    driver.execute_script("""
+        var record = document.querySelectorAll('li.parentrec')[arguments[0]];
+        var link = record.querySelector('span.caret.parentcaret a');
+        if (arguments[1]) {
+            var folderLinks = record.querySelectorAll('li > span.caret a');
+            for (var i = 0; i < folderLinks.length; i++) {
+                if (folderLinks[i].textContent.indexOf('Treatment Records') !== -1) { link = folderLinks[i]; break; }
+            }
+        }
+        link.click();
+    """, record_index, treatment_folder)
+    expanded = wait_until(
+        condition,
+        lambda: page_check(driver, """
+            var record = document.querySelectorAll('li.parentrec')[arguments[0]];
+            var caret = record.querySelector('span.caret.parentcaret');
+            if (arguments[1]) {
+                var carets = record.querySelectorAll('li > span.caret');
+                for (var i = 0; i < carets.length; i++) {
+                    if (carets[i].textContent.indexOf('Treatment Records') !== -1) { caret = carets[i]; break; }
+                }
+            }
+            return caret.className.indexOf('caret-down') !== -1;
+        """, record_index, treatment_folder),
+        5
+    )
+    wait_for_dom_quiet(driver)
+    return expanded
+
+def expand_record(driver, record_index, treatment_folder=False):
+    """Expand a parent record (or its Treatment Records folder) unless it is open already.
+    Returns the record's new snapshot, or False when it did not open"""
+    record = snapshot_parent_record(driver, record_index)
+    if record is None:
+        return False
+    if treatment_folder:
+        if record.treatment_folder is None or record.treatment_folder.expanded:
+            return record
+    elif record.expanded:
+        return record
+    condition = "treatment_records_expanded" if treatment_folder else "record_expanded"
+    if not toggle_record_caret(driver, record_index, condition, treatment_folder):
+        return False
+    return snapshot_parent_record(driver, record_index) or False
+
+@traced("open_document")
+def open_record_document(driver, record_index, document):
+    """Click a document of a record's Treatment Records folder to open its form"""
+    return driver.execute_script("""
+        var link = null;
+        if (arguments[1]) {
+            var item = document.getElementById(arguments[1]);
+            link = item && item.querySelector("div.slide > a[onclick*='launchERForm']");
+        }
+        if (!link) {
+            var links = document.querySelectorAll('li.parentrec')[arguments[0]].querySelectorAll("a[onclick*='launchERForm']");
+            for (var i = 0; i < links.length; i++) {
+                if (links[i].getAttribute('onclick') === arguments[2]) { link = links[i]; break; }
+            }
+        }
+        if (!link) { return false; }
+        link.scrollIntoView(true);
+        link.click();
+        return true;
+    """, record_index, document.dom_id, document.onclick)
+
+def document_ref(document):
+    """Server-side identity of a document: the arguments of its launchERForm() call"""
+    return ",".join(document.launch_args) or document.dom_id
+
+def is_document_saved(client_id, record_title, document):
+    """True when the journal has this document on disk and its document ID has not changed since"""
+    saved = journal.saved_document(client_id, record_title, document.name) if journal and client_id else None
+    if not saved or not document_exists(saved[0]):
+        return False
+    return saved[1] is None or saved[1] == document_ref(document)
+
+def record_needs_sync(record, synced_titles):
+    """Delta sync: expand a record only if it was never fully synced or its date is recent enough to gain documents"""
+    if record.title not in synced_titles:
+        return True
+    record_date, _ = parse_record_title(record.title)
     try:
-        print(f"      Processing files in: {record_title}")
+        age_days = (datetime.now() - datetime.strptime(record_date, "%Y-%m-%d")).days
+    except ValueError:
+        return True
+    return age_days <= DELTA_RECHECK_DAYS
+
+# HTTP fast path: the browser logs in and discovers documents, a pooled keep-alive HTTP client downloads them
+http_sessions = {}
+http_sessions_lock = threading.Lock()
+
+def get_http_session(driver):
+    """Return this browser's pooled HTTP session, refreshed with its current cookies"""
+    with http_sessions_lock:
+        session = http_sessions.get(driver.session_id)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_CONCURRENCY, pool_maxsize=HTTP_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+            http_sessions[driver.session_id] = session
+    
+    # Re-export the cookies every time so the session follows the browser's login
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return session
+
+def document_url(origin, document):
+    """Build the download URL of a record document from its launchE...() arguments"""
+    return DOCUMENT_URL_TEMPLATE.format(origin=origin, args=document.launch_args, onclick=document.onclick)
+
+def download_document(session, url, full_path, metadata=None):
+    """Download one document to full_path. Returns (saved path, digest, store path), or raises when the response is not a good PDF"""
+    with session.get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+        response.raise_for_status()
+        if "/login" in response.url.lower():
+            raise Exception("session expired (redirected to login)")
         
-        # Wait a moment for the Treatment Records to fully expand
-        time.sleep(2)
+        # Hashed and checked as it streams; a login page or error page fails on its first bytes
+        try:
+            return store_pdf(response.iter_content(chunk_size=64 * 1024), full_path, metadata)
+        except Exception as e:
+            raise Exception(f"{e} ({response.headers.get('Content-Type', 'unknown type')})")
+
+@traced("http_fetch")
+def fetch_documents_http(driver, records, client_folder_path, client_name, client_id):
+    """Download the Treatment Records documents of a client concurrently over HTTP.
+    Returns the (record title, file name) pairs that were saved"""
+    try:
+        session = get_http_session(driver)
+        origin = driver.execute_script("return window.location.origin;")
+    except Exception as e:
+        print(f"    Could not set up the HTTP session, using the browser instead: {e}")
+        return set()
+    
+    jobs = []
+    for record in records:
+        for document in record.treatment_folder.documents:
+            if is_document_saved(client_id, record.title, document):
+                continue
+            if not document.launch_args:
+                continue
+            _, full_path = build_record_pdf_path(document.name, client_folder_path, record.title, client_name)
+            jobs.append((record.title, document.name, document_ref(document), document_url(origin, document), full_path))
+    
+    if not jobs:
+        return set()
+    
+    print(f"    Downloading {len(jobs)} documents over HTTP ({HTTP_CONCURRENCY} at a time)...")
+    started = time.monotonic()
+    saved = set()
+    with ThreadPoolExecutor(max_workers=HTTP_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(download_document, session, url, full_path, {
+                'client_id': client_id, 'record_title': record_title, 'file_name': file_name, 'ref': ref
+            }): (record_title, file_name, ref)
+            for record_title, file_name, ref, url, full_path in jobs
+        }
+        for future in as_completed(futures):
+            record_title, file_name, ref = futures[future]
+            try:
+                saved_path, digest, blob_path = future.result()
+                saved.add((record_title, file_name))
+                record_saved_document(client_id, record_title, file_name, saved_path, ref, digest, blob_path)
+            except Exception as e:
+                print(f"     HTTP download failed for {record_title} / {file_name}: {e}")
+    
+    elapsed = time.monotonic() - started
+    print(f"    Downloaded {len(saved)}/{len(jobs)} documents over HTTP in {elapsed:.1f}s")
+    return saved
+
+# Document tabs: DOCUMENT_TABS > 0 opens that many extra tabs in the same logged-in browser. The documents of a
+# Treatment Records folder are launched in them with their launchERForm() calls, so the server renders the next
+# forms while the current one is captured. Whatever a tab could not capture falls back to the one-by-one path
+# with its retries. Per-tab load and capture times are reported at the end of the run.
+DOCUMENT_TABS = max(0, int(os.getenv("DOCUMENT_TABS", "0")))
+# Chrome slows timers and rendering in background tabs, which would stall the forms loading there
+TAB_THROTTLING_FLAGS = (
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding"
+)
+
+@dataclass
+class DocumentTab:
+    """An extra tab and the document whose form is loading in it"""
+    index: int
+    handle: str
+    document: RecordDocument = None
+    started: float = 0.0
+
+document_tabs = {}  # browser session id -> [DocumentTab], or [] when tabs cannot be used there
+tab_stats = {}  # tab index -> {'documents', 'failed', 'load': [seconds], 'capture': [seconds]}
+tab_stats_lock = threading.Lock()
+tab_pipeline = {'seconds': 0.0, 'documents': 0}
+
+def get_document_tabs(driver):
+    """This browser's document tabs, opened on the Client List the first time they are needed"""
+    browser = driver.current if isinstance(driver, SupervisedDriver) else driver
+    tabs = document_tabs.get(browser.session_id)
+    if tabs is not None:
+        open_handles = set(browser.window_handles)
+        if all(tab.handle in open_handles for tab in tabs):
+            return tabs
+    
+    main_handle = browser.current_window_handle
+    main_modal_guard = getattr(browser, 'modal_guard', False)
+    tabs = []
+    try:
+        for index in range(1, DOCUMENT_TABS + 1):
+            browser.switch_to.new_window('tab')
+            install_modal_guard(browser)
+            browser.modal_guard = main_modal_guard
+            browser.get(CLIENT_LIST_URL)
+            # The tab can launch forms once the app layout (with launchERForm) has loaded
+            if not wait_until("document_tab_ready", lambda: page_check(browser, "return typeof launchERForm === 'function';"), 30):
+                raise Exception("launchERForm() is not available on the Client List page")
+            tabs.append(DocumentTab(index, browser.current_window_handle))
+        print(f"      Opened {len(tabs)} document tabs")
+    except Exception as e:
+        print(f"      Could not set up document tabs, capturing one document at a time: {e}")
+        for tab in tabs:
+            try:
+                browser.switch_to.window(tab.handle)
+                browser.close()
+            except Exception:
+                pass
+        tabs = []
+    finally:
+        browser.switch_to.window(main_handle)
+    document_tabs[browser.session_id] = tabs
+    return tabs
+
+def record_tab_timing(index, load_seconds, capture_seconds, succeeded):
+    with tab_stats_lock:
+        stats = tab_stats.setdefault(index, {'documents': 0, 'failed': 0, 'load': [], 'capture': []})
+        if not succeeded:
+            stats['failed'] += 1
+            return
+        stats['documents'] += 1
+        stats['load'].append(load_seconds)
+        stats['capture'].append(capture_seconds)
+
+def print_tab_report():
+    """Per-tab form load and capture times, and how many forms were loading at once on average"""
+    with tab_stats_lock:
+        stats = {index: dict(values, load=sorted(values['load']), capture=sorted(values['capture'])) for index, values in tab_stats.items()}
+        pipeline = dict(tab_pipeline)
+    if not stats:
+        return
+    print(f"\n{'='*60}")
+    print(f"Document tabs (DOCUMENT_TABS={DOCUMENT_TABS}):")
+    print(f"{'='*60}")
+    for index in sorted(stats):
+        tab = stats[index]
+        print(f"  Tab {index}: {tab['documents']} documents, {tab['failed']} failed, "
+              f"form load p50 {percentile(tab['load'], 0.50):.2f}s p95 {percentile(tab['load'], 0.95):.2f}s, "
+              f"capture p50 {percentile(tab['capture'], 0.50):.2f}s")
+    if pipeline['seconds'] > 0:
+        total_load = sum(sum(tab['load']) for tab in stats.values())
+        print(f"  Pipeline: {pipeline['documents']} documents in {pipeline['seconds']:.1f}s "
+              f"({pipeline['documents'] / pipeline['seconds'] * 60:.1f}/min), "
+              f"{total_load / pipeline['seconds']:.1f} forms loading at once on average")
+    print("  Raise DOCUMENT_TABS while form load times stay flat; when they grow with it, the server is the limit")
+
+def capture_documents_in_tabs(driver, record, client_folder_path, client_name, client_id):
+    """Capture a Treatment Records folder's documents through the document tabs, keeping every tab busy.
+    Returns the (record title, file name) pairs that were captured"""
+    pending = deque(
+        document for document in record.treatment_folder.documents
+        if document.onclick and not is_document_saved(client_id, record.title, document)
+    )
+    if len(pending) < 2:
+        return set()
+    tabs = get_document_tabs(driver)
+    if not tabs:
+        return set()
+    
+    print(f"      Capturing {len(pending)} documents through {len(tabs)} tabs...")
+    main_handle = driver.current_window_handle
+    started = time.monotonic()
+    saved = set()
+    loading = deque()
+    try:
+        while pending or loading:
+            # Launch the next documents in the idle tabs; their forms render while the oldest one is captured
+            for tab in tabs:
+                if tab.document is None and pending:
+                    document = pending.popleft()
+                    try:
+                        driver.switch_to.window(tab.handle)
+                        dismiss_overlays(driver)
+                        driver.execute_script(document.onclick)
+                        tab.document, tab.started = document, time.monotonic()
+                        loading.append(tab)
+                    except Exception as e:
+                        print(f"        [Tab {tab.index}] Could not launch {document.name}: {e}")
+                        record_tab_timing(tab.index, 0, 0, False)
+            if not loading:
+                break
+            
+            tab = loading.popleft()
+            document, tab.document = tab.document, None
+            try:
+                driver.switch_to.window(tab.handle)
+                if not click_print_button(driver):
+                    raise Exception("the form did not load")
+                loaded_at = time.monotonic()
+                landed = capture_record_pdf(driver, document.name, client_folder_path, record.title, client_name)
+                if not landed:
+                    raise Exception("the capture failed")
+                landed.client_id, landed.record_title, landed.file_name = client_id, record.title, document.name
+                landed.ref = document_ref(document)
+                if submit_landed_pdf(landed):
+                    saved.add((record.title, document.name))
+                record_tab_timing(tab.index, loaded_at - tab.started, time.monotonic() - loaded_at, True)
+                print(f"        [Tab {tab.index}] Captured {document.name}")
+            except Exception as e:
+                print(f"        [Tab {tab.index}] {document.name}: {e}, leaving it for the one-by-one path")
+                record_tab_timing(tab.index, 0, 0, False)
+            try:
+                dismiss_overlays(driver)
+            except Exception:
+                pass
+    finally:
+        for tab in tabs:
+            tab.document = None
+        driver.switch_to.window(main_handle)
+    
+    with tab_stats_lock:
+        tab_pipeline['seconds'] += time.monotonic() - started
+        tab_pipeline['documents'] += len(saved)
+    return saved
+
+def process_treatment_record_files(driver, record, client_folder_path, client_name, client_id, saved_files=()):
+    """Process all files in a Treatment Record folder. Returns True when every file is saved.
+    Files listed in saved_files as (record title, file name) were already saved by the HTTP fast path or the document tabs"""
+    record_title = record.title
+    try:
+        print(f"      Processing files in: {record_title}")
         
-        # Find only the files within the Treatment Records li element
-        treatment_files = treatment_records_li.find_elements(By.CSS_SELECTOR, "ul.nested.sub-nested > li[id*='_doc'] > div.slide > a[onclick*='launchERForm']")
+        # Files come from the record snapshot taken after the folder was expanded
+        treatment_files = record.treatment_folder.documents
         
         total_files = len(treatment_files)
         print(f"      Found {total_files} files in Treatment Records")
@@ -532,125 +2519,83 @@ def process_treatment_record_files(treatment_records_li, record_title, client_fo
             return True
         
         processed_files = []
-        processed_count = 0
         
-        # Process each file - but keep track to avoid double-processing
-        for file_index in range(total_files):
+        for file_index, document in enumerate(treatment_files):
             try:
-                # Re-find the files to avoid stale elements
-                treatment_files = treatment_records_li.find_elements(By.CSS_SELECTOR, "ul.nested.sub-nested > li[id*='_doc'] > div.slide > a[onclick*='launchERForm']")
+                file_name = document.name
                 
-                # Check if we've already processed all files we intended to
-                if processed_count >= total_files:
-                    print(f"        All {total_files} files have been processed")
-                    break
-                
-                if file_index >= len(treatment_files):
-                    print(f"        File index {file_index} out of range")
-                    break
-                    
-                file_element = treatment_files[file_index]
-                
-                # Get file name from the text content
-                file_name = None
+                print(f"\n        ========== FILE {file_index + 1}/{total_files} ==========")
+                print(f"        File name: {file_name}")
                 
-                # First try to get text from .treetextitem element
-                try:
-                    file_name_element = file_element.find_element(By.CSS_SELECTOR, ".treetextitem")
-                    file_name = file_name_element.text.strip()
-                except:
-                    # If that fails, try to get text directly from the anchor
-                    try:
-                        file_name = file_element.text.strip()
-                    except:
-                        file_name = f"File_{file_index + 1}"
+                # Skip files the HTTP fast path or the document tabs just saved
+                if (record_title, file_name) in saved_files:
+                    print(f"        Already saved by the fast path, skipping")
+                    processed_files.append(file_name)
+                    continue
                 
-                if not file_name or file_name == "":
-                    file_name = f"File_{file_index + 1}"
+                # Skip files the journal already has on disk under the same document ID
+                if is_document_saved(client_id, record_title, document):
+                    print(f"        Already saved in an earlier run, skipping")
+                    processed_files.append(file_name)
+                    continue
                 
-                print(f"\n        ========== FILE {file_index + 1}/{total_files} ==========")
-                print(f"        File name: {file_name}")
                 print(f"        Starting to process this file...")
                 
-                # Scroll the element into view if needed
-                if not file_element.is_displayed():
-                    driver.execute_script("arguments[0].scrollIntoView(true);", file_element)
-                    time.sleep(1)
-                    print(f"        Scrolled file into view")
-                
-                # Click the file to open it
+                # Click the file to open it (with the form's images and fonts allowed)
                 print(f"        Attempting to click on file...")
-                try:
-                    file_element.click()
-                    print(f"        ✓ Successfully clicked on file: {file_name}")
-                except Exception as e:
-                    print(f"        Regular click failed: {e}")
-                    # If regular click fails, try JavaScript click
-                    try:
-                        driver.execute_script("arguments[0].click();", file_element)
-                        print(f"        ✓ Successfully clicked on file using JavaScript: {file_name}")
-                    except Exception as e2:
-                        print(f"         JavaScript click also failed: {e2}")
-                        continue
+                block_page_assets(driver, False)
+                def reopen_document():
+                    dismiss_overlays(driver)
+                    return open_record_document(driver, record.index, document)
+                if not with_retries("open_document", lambda: open_record_document(driver, record.index, document),
+                                    recover=lambda: dismiss_overlays(driver), description=file_name):
+                    print(f"         Could not find file {file_name} in the tree")
+                    block_page_assets(driver, True)
+                    continue
+                print(f"        ✓ Successfully clicked on file: {file_name}")
                 
-                # Wait for the file modal/form to load
-                print(f"        Waiting for file to load...")
-                time.sleep(5)
-                
-                # Click print button
+                # Click print button (waits for the file modal/form to load) and capture the PDF with the
+                # configured capture backend; a failed try opens the document again
                 print(f"        Looking for print button...")
-                if click_print_button():
-                    print(f"         Print button clicked successfully")
+                landed = with_retries(
+                    "capture",
+                    lambda: click_print_button(driver) and capture_record_pdf(driver, file_name, client_folder_path, record_title, client_name),
+                    recover=reopen_document, description=file_name
+                )
+                if landed:
+                    # Writing, renaming and verifying continue in the background
+                    landed.client_id, landed.record_title, landed.file_name = client_id, record_title, file_name
+                    landed.ref = document_ref(document)
+                    if submit_landed_pdf(landed):
+                        print(f"         File captured")
+                        processed_files.append(file_name)
                     
-                    # Handle print dialog with PyAutoGUI
-                    if handle_print_dialog():
-                        print(f"         Print dialog handled successfully")
-                        
-                        # Handle save dialog with PyAutoGUI - now passing client_name
-                        if handle_save_dialog(file_name, client_folder_path, record_title, client_name):
-                            print(f"         File saved successfully")
-                            processed_files.append(file_name)
-                            processed_count += 1
-                            
-                            # Wait for save to complete
-                            time.sleep(3)
-                            
-                            # Close the modal after saving
-                            print(f"        Attempting to close the file modal...")
-                            if close_pdf_dialog():
-                                print(f"         Modal closed successfully")
-                            else:
-                                print(f"          Could not close modal, but file was saved")
-                            
-                            # IMPORTANT: Wait longer for DOM to stabilize after closing modal
-                            print(f"        Waiting for page to stabilize...")
-                            time.sleep(4)
-                            
-                        else:
-                            print(f"         Failed to save file {file_name}")
+                    # Close the modal after saving
+                    print(f"        Attempting to close the file modal...")
+                    if with_retries("close", lambda: close_pdf_dialog(driver), description=file_name):
+                        print(f"         Modal closed successfully")
                     else:
-                        print(f"         Failed to handle print dialog for {file_name}")
+                        print(f"          Could not close modal, but file was captured")
+                    
+                    # IMPORTANT: Wait for DOM to stabilize after closing modal
+                    print(f"        Waiting for page to stabilize...")
+                    wait_for_dom_quiet(driver)
+                    
                 else:
-                    print(f"         Failed to click print button for {file_name}")
+                    print(f"         Failed to save file {file_name}")
+                block_page_assets(driver, True)
                 
                 print(f"        ========== END OF FILE {file_index + 1}/{total_files} ==========\n")
                 
-                # Check if we've processed all files
-                if processed_count >= total_files:
-                    print(f"         All files processed, exiting loop")
-                    break
-                
-                # Small delay before processing next file
-                time.sleep(2)
-                
             except Exception as e:
                 print(f"         Error processing file at index {file_index}: {e}")
                 import traceback
                 traceback.print_exc()
+                block_page_assets(driver, True)
                 continue
         
         print(f"       Completed processing. Successfully processed {len(processed_files)} out of {total_files} files in {record_title}")
-        return True
+        return len(processed_files) >= total_files
         
     except Exception as e:
         print(f"       Error processing treatment record files: {e}")
@@ -658,7 +2603,7 @@ def process_treatment_record_files(treatment_records_li, record_title, client_fo
         traceback.print_exc()
         return False
 
-def process_electronic_records(client_info):
+def process_electronic_records(driver, client_info):
     """Process electronic records - click on each record and look for Treatment Records"""
     try:
         print("    Processing Electronic Records...")
@@ -670,103 +2615,113 @@ def process_electronic_records(client_info):
             return False, []
         
         treatment_record_folders = []  # List to store folders with Treatment Records
+        incomplete_records = []  # Records with files that could not be saved
+        journal_client_id = client_info['id'] if client_info['id'] != 'Unknown' else None
+        
+        discovered_records = []  # Expanded records waiting for the HTTP fast path
         
-        # Find all parent records
-        parent_records = driver.find_elements(By.CSS_SELECTOR, "li.parentrec")
-        total_records = len(parent_records)
+        # Snapshot all parent records once
+        records = snapshot_records_tree(driver)
+        total_records = len(records)
         print(f"    Found {total_records} electronic records")
         
+        # Marked synced by process_open_client once every document of the client is saved
+        client_info['record_titles'] = [record.title for record in records]
+        synced_titles = journal.synced_records(journal_client_id) if DELTA_SYNC and journal and journal_client_id else set()
+        
         if total_records == 0:
-            print("    No electronic records found")
-            return True, treatment_record_folders
+            # The tab switched and settled without records: look once more before calling the client empty
+            if not wait_until("electronic_records_recheck", lambda: has_parent_records(driver), EMPTY_RECORDS_RECHECK_SECONDS):
+                print("    No electronic records found")
+                return True, treatment_record_folders
+            records = snapshot_records_tree(driver)
+            total_records = len(records)
+            client_info['record_titles'] = [record.title for record in records]
+            print(f"    Found {total_records} electronic records on the re-check")
         
         # Process each record
-        for record_index in range(total_records):
+        for record in records:
+            record_index = record.index
             try:
-                # Re-find parent records to avoid stale elements
-                parent_records = driver.find_elements(By.CSS_SELECTOR, "li.parentrec")
-                if record_index >= len(parent_records):
-                    print(f"    Record index {record_index} out of range")
-                    break
-                
-                record = parent_records[record_index]
+                print(f"\n    [{record_index + 1}/{total_records}] Processing record: {record.title}")
                 
-                # Get the record title
-                record_title_element = record.find_element(By.CSS_SELECTOR, "span.caret.parentcaret a")
-                record_title = record_title_element.text.strip()
-                print(f"\n    [{record_index + 1}/{total_records}] Processing record: {record_title}")
+                if synced_titles and not record_needs_sync(record, synced_titles):
+                    print(f"      Unchanged since the last sync, skipping")
+                    continue
                 
                 # Check if parent record needs to be expanded
-                parent_caret_span = record.find_element(By.CSS_SELECTOR, "span.caret.parentcaret")
-                parent_classes = parent_caret_span.get_attribute('class')
-                
-                if 'caret-down' not in parent_classes:
+                if not record.expanded:
                     print(f"      Expanding parent record...")
-                    record_title_element.click()
-                    time.sleep(2)  # Wait for expansion
-                    print(f"       Parent record expanded")
+                    expanded = with_retries("expand_record", lambda: expand_record(driver, record_index), description=record.title)
+                    record = expanded or snapshot_parent_record(driver, record_index)
+                    print(f"       Parent record expanded" if expanded else f"        Warning: parent record may not have expanded")
                 else:
                     print(f"      Parent record already expanded")
                 
                 # Look for "Treatment Records" folder within this record
-                try:
-                    # Re-find the record after expansion
-                    parent_records = driver.find_elements(By.CSS_SELECTOR, "li.parentrec")
-                    record = parent_records[record_index]
-                    
-                    # Find the Treatment Records folder
-                    treatment_records_li = record.find_element(By.XPATH, ".//li[span[contains(@class, 'caret')]//a[contains(text(), 'Treatment Records')]]")
-                    treatment_records_link = treatment_records_li.find_element(By.XPATH, ".//span[contains(@class, 'caret')]//a[contains(text(), 'Treatment Records')]")
-                    
-                    print(f"       Found 'Treatment Records' folder")
-                    treatment_record_folders.append(record_title)
-                    
-                    # Check if Treatment Records folder needs to be expanded
-                    tr_parent_span = treatment_records_link.find_element(By.XPATH, "./parent::span")
-                    tr_span_classes = tr_parent_span.get_attribute('class')
+                if record is None or record.treatment_folder is None:
+                    print(f"       No 'Treatment Records' folder found in this record")
+                    continue
+                
+                print(f"       Found 'Treatment Records' folder")
+                treatment_record_folders.append(record.title)
+                
+                # Check if Treatment Records folder needs to be expanded
+                if not record.treatment_folder.expanded:
+                    print(f"      Expanding 'Treatment Records' folder...")
+                    expanded = with_retries(
+                        "expand_record", lambda: expand_record(driver, record_index, treatment_folder=True),
+                        description=f"{record.title} / Treatment Records"
+                    )
+                    record = expanded or snapshot_parent_record(driver, record_index)
+                    print(f"       'Treatment Records' folder expanded")
                     
-                    if 'caret-down' not in tr_span_classes:
-                        print(f"      Expanding 'Treatment Records' folder...")
-                        treatment_records_link.click()
-                        time.sleep(2)  # Wait for expansion
-                        print(f"       'Treatment Records' folder expanded")
-                        
-                        # Verify it's actually expanded
-                        tr_parent_span = treatment_records_link.find_element(By.XPATH, "./parent::span")
-                        tr_span_classes = tr_parent_span.get_attribute('class')
-                        if 'caret-down' in tr_span_classes:
-                            print(f"       Confirmed: Treatment Records is now expanded")
-                        else:
-                            print(f"        Warning: Treatment Records may not have expanded properly")
+                    # Verify it's actually expanded
+                    if expanded:
+                        print(f"       Confirmed: Treatment Records is now expanded")
                     else:
-                        print(f"      'Treatment Records' folder already expanded")
-                    
-                    # Check if the nested ul has the 'active' class
-                    nested_ul = treatment_records_li.find_element(By.CSS_SELECTOR, "ul.nested.sub-nested")
-                    ul_classes = nested_ul.get_attribute('class')
-                    print(f"      Treatment Records UL classes: {ul_classes}")
-                    
-                    if 'active' not in ul_classes:
-                        print(f"        Warning: Nested UL doesn't have 'active' class, files might not be visible")
-                    
-                    # Process files in the Treatment Records folder
-                    process_treatment_record_files(treatment_records_li, record_title, client_folder_path, client_info['name'])
-                    
-                except Exception as e:
-                    print(f"       No 'Treatment Records' folder found in this record: {e}")
+                        print(f"        Warning: Treatment Records may not have expanded properly")
+                else:
+                    print(f"      'Treatment Records' folder already expanded")
+                
+                # Check if the nested ul has the 'active' class
+                if not record.treatment_folder.active:
+                    print(f"        Warning: Nested UL doesn't have 'active' class, files might not be visible")
+                
+                # Process files in the Treatment Records folder
+                if FETCH_MODE == "http":
+                    # Downloaded together once every folder has been discovered
+                    discovered_records.append(record)
+                else:
+                    # The document tabs go first; the one-by-one path picks up whatever they did not capture
+                    saved_files = set()
+                    if DOCUMENT_TABS and CAPTURE_BACKEND == "cdp":
+                        saved_files = capture_documents_in_tabs(driver, record, client_folder_path, client_info['name'], journal_client_id)
+                    if not process_treatment_record_files(driver, record, client_folder_path, client_info['name'], journal_client_id, saved_files):
+                        incomplete_records.append(record.title)
                 
             except Exception as e:
                 print(f"       Error processing record {record_index + 1}: {e}")
                 import traceback
                 traceback.print_exc()
+                incomplete_records.append(f"record {record_index + 1}")
                 continue
         
+        # Fast path: download every discovered document over HTTP, then fall back to the browser for the rest
+        if discovered_records:
+            saved_files = fetch_documents_http(driver, discovered_records, client_folder_path, client_info['name'], journal_client_id)
+            for record in discovered_records:
+                if not process_treatment_record_files(driver, record, client_folder_path, client_info['name'], journal_client_id, saved_files):
+                    incomplete_records.append(record.title)
+        
         print(f"\n     Finished processing all electronic records")
         print(f"     Found {len(treatment_record_folders)} folders with Treatment Records:")
         for folder in treatment_record_folders:
             print(f"       {folder}")
+        if incomplete_records:
+            print(f"     Incomplete: {', '.join(incomplete_records)}")
         
-        return True, treatment_record_folders
+        return not incomplete_records, treatment_record_folders
         
     except Exception as e:
         print(f"     Error processing electronic records: {e}")
@@ -775,60 +2730,16 @@ def process_electronic_records(client_info):
         return False, []
 
 
-def cleanup_open_modals():
+@traced("cleanup_open_modals")
+def cleanup_open_modals(driver):
     """Close any open modals/slides before proceeding"""
     try:
         print("    Running modal cleanup...")
-        modals_closed = 0
-        
-        # Look for closeCustomSlide buttons
-        try:
-            close_buttons = driver.find_elements(By.CSS_SELECTOR, "div.closeCustomSlide.nav-customclose")
-            for close_btn in close_buttons:
-                if close_btn.is_displayed():
-                    try:
-                        close_btn.click()
-                        modals_closed += 1
-                        time.sleep(0.5)
-                    except:
-                        try:
-                            driver.execute_script("arguments[0].click();", close_btn)
-                            modals_closed += 1
-                            time.sleep(0.5)
-                        except:
-                            pass
-        except:
-            pass
-        
-        # Look for any close button with X if above fails
-        try:
-            x_buttons = driver.find_elements(By.XPATH, "//a[@class='close' and text()='×']")
-            for x_btn in x_buttons:
-                if x_btn.is_displayed():
-                    try:
-                        x_btn.click()
-                        modals_closed += 1
-                        time.sleep(0.5)
-                    except:
-                        try:
-                            driver.execute_script("arguments[0].click();", x_btn)
-                            modals_closed += 1
-                            time.sleep(0.5)
-                        except:
-                            pass
-        except:
-            pass
-        
-        # Press ESC key if all above fails
-        try:
-            driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-            time.sleep(0.5)
-        except:
-            pass
+        closed = dismiss_overlays(driver)
+        modals_closed = closed['slides'] + closed['buttons'] + closed['modals'] + closed['blocking']
         
         if modals_closed > 0:
             print(f"     Closed {modals_closed} modal(s)")
-            time.sleep(1)  # Give time for animations to complete
         else:
             print("     No modals to close")
             
@@ -839,81 +2750,30 @@ def cleanup_open_modals():
         return False
 
 
-def navigate_to_client_list():
+@traced("navigate_to_client_list")
+def navigate_to_client_list(driver):
     """Navigate to client list through the menu: Clients > Client List"""
     try:
         print("    Navigating back to Client List through menu...")
         
-        # CLEANUP Try to close any open modals before navigation
+        # CLEANUP Try to close any open modals (slides, toasts, blocking popups) before navigation
         print("    Checking for any open modals to close...")
         try:
-            # Look for the closeCustomSlide element
-            close_buttons = driver.find_elements(By.CSS_SELECTOR, "div.closeCustomSlide.nav-customclose")
-            closed_count = 0
-            
-            for close_btn in close_buttons:
-                if close_btn.is_displayed():
-                    try:
-                        # Try regular click
-                        close_btn.click()
-                        closed_count += 1
-                        print(f"     Closed modal {closed_count} with regular click")
-                        time.sleep(1)
-                    except:
-                        try:
-                            # Try JavaScript click
-                            driver.execute_script("arguments[0].click();", close_btn)
-                            closed_count += 1
-                            print(f"     Closed modal {closed_count} with JavaScript click")
-                            time.sleep(1)
-                        except:
-                            pass
-            
+            closed = dismiss_overlays(driver)
+            closed_count = closed['slides'] + closed['buttons'] + closed['modals'] + closed['blocking']
             if closed_count > 0:
                 print(f"    ✓ Closed {closed_count} modal(s) during cleanup")
-                time.sleep(2)  # Wait for modals to fully close
             else:
                 print("    No visible modals found during cleanup")
-                
         except Exception as e:
             print(f"    Cleanup check completed (no modals or error: {e})")
         
-        # Also try pressing ESC key as additional cleanup
-        try:
-            driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-            time.sleep(0.5)
-            print("     Pressed ESC key for additional cleanup")
-        except:
-            pass
-        
-        # Now check for blocking modals (like clientnotepop)
-        try:
-            # Look for any visible modal
-            modals = driver.find_elements(By.CSS_SELECTOR, ".modal.show, .modal.fade.show, #clientnotepop")
-            for modal in modals:
-                if modal.is_displayed():
-                    print("    DEBUG Found blocking modal, attempting to close...")
-                    # Try to find and click close button
-                    try:
-                        close_btn = modal.find_element(By.CSS_SELECTOR, ".close, .btn-close, [data-dismiss='modal'], [data-bs-dismiss='modal']")
-                        close_btn.click()
-                        print("     Closed blocking modal")
-                        time.sleep(1)
-                    except:
-                        # Try ESC key
-                        driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-                        print("     Closed modal with ESC")
-                        time.sleep(1)
-        except:
-            pass
-        
         # Click "Clients" in the main menu
         clients_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Clients') and contains(@class, 'dc-mega')]"))
         )
         clients_button.click()
         print("     Clicked 'Clients' menu")
-        time.sleep(1)
         
         # Click "Client List" submenu
         client_list_link = WebDriverWait(driver, 10).until(
@@ -923,8 +2783,8 @@ def navigate_to_client_list():
         print("     Clicked 'Client List' submenu")
         
         # Wait for client list page to load
-        wait_for_spinner_to_disappear()
-        wait_for_loading_to_complete()
+        wait_for_spinner_to_disappear(driver)
+        wait_for_loading_to_complete(driver)
         
         print("     Successfully navigated to Client List")
         return True
@@ -935,10 +2795,10 @@ def navigate_to_client_list():
         # Try recovery: navigate directly to client list URL
         try:
             print("    Attempting direct navigation to client list...")
-            driver.get("https://www.myaestheticspro.com/6722np22veg5/clients/index.cfm")
-            time.sleep(3)
-            wait_for_spinner_to_disappear()
-            wait_for_loading_to_complete()
+            driver.get(CLIENT_LIST_URL)
+            record_page_load(driver, getattr(driver, 'session_profile', None))
+            wait_for_spinner_to_disappear(driver)
+            wait_for_loading_to_complete(driver)
             print("     Direct navigation successful")
             return True
         except:
@@ -946,272 +2806,386 @@ def navigate_to_client_list():
             
         return False
 
-def get_client_links_for_letter():
+# The client list is a DataTable; these scripts read and page it through the DataTables API
+# so a whole page of rows costs one WebDriver round trip instead of two per row.
+CLIENT_TABLE_JS = """
+var clientTable = null;
+if (window.jQuery && jQuery.fn.dataTable) {
+    try { clientTable = jQuery('#tblClientLeadListBody').closest('table').DataTable(); } catch (e) {}
+}
+"""
+
+CLIENT_ROWS_JS = CLIENT_TABLE_JS + """
+var links = document.querySelectorAll("#tblClientLeadListBody tr:not(.dataTables_empty) td.clientName a[onclick*='clientdetails']");
+var rows = [];
+for (var i = 0; i < links.length; i++) {
+    rows.push({name: links[i].textContent.replace(/\\s+/g, ' ').trim(), onclick: links[i].getAttribute('onclick')});
+}
+return {rows: rows, info: clientTable ? clientTable.page.info() : null};
+"""
+
+CLIENT_LIST_PAGE_LENGTH = int(os.getenv("CLIENT_LIST_PAGE_LENGTH", "5000"))
+
+def read_client_rows(driver):
+    """Read every client row on the current list page, plus the DataTables page info, in one round trip"""
+    return driver.execute_script(CLIENT_ROWS_JS)
+
+def get_client_links_for_letter(driver):
     """Get all client links for the current letter"""
-    client_links = []
     try:
-        # Find all client name links with onclick="clientdetails"
-        client_elements = driver.find_elements(By.CSS_SELECTOR, "#tblClientLeadListBody tr:not(.dataTables_empty) td.clientName a[onclick*='clientdetails']")
-        
-        for element in client_elements:
-            try:
-                client_name = element.text.strip()
-                onclick_attr = element.get_attribute('onclick')
-                client_links.append({
-                    'name': client_name,
-                    'onclick': onclick_attr
-                })
-            except Exception as e:
-                print(f"Error getting client link: {e}")
-                continue
-                
+        return read_client_rows(driver)['rows']
     except Exception as e:
         print(f"Error getting client links: {e}")
-    
-    return client_links
+        return []
+
+def set_client_table_page_length(driver, page_length):
+    """Raise the client list page length so a whole letter draws at once. Returns True if the table redrew"""
+    draws = get_draw_count(driver)
+    changed = driver.execute_script(CLIENT_TABLE_JS + """
+        if (!clientTable || clientTable.page.len() === -1 || clientTable.page.len() >= arguments[0]) { return false; }
+        clientTable.page.len(arguments[0]).draw();
+        return true;
+    """, page_length)
+    if changed:
+        wait_for_spinner_to_disappear(driver)
+        wait_for_table_draw(driver, draws)
+        wait_for_loading_to_complete(driver)
+    return changed
 
-def click_letter(letter):
+def advance_client_table_page(driver):
+    """Move the client list to its next page through the DataTables API"""
+    draws = get_draw_count(driver)
+    driver.execute_script(CLIENT_TABLE_JS + "clientTable.page('next').draw('page');")
+    wait_for_spinner_to_disappear(driver)
+    wait_for_table_draw(driver, draws)
+    wait_for_loading_to_complete(driver)
+
+@traced("click_letter")
+def click_letter(driver, letter):
     """Click on a specific letter to filter clients"""
     try:
         letter_link = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.XPATH, f"//div[contains(@class,'sortingRow')]//a[text()='{letter}']"))
         )
+        draws = get_draw_count(driver)
         letter_link.click()
         print(f"     Clicked letter: {letter}")
         
         # Wait for the list to load
-        wait_for_spinner_to_disappear()
+        wait_for_spinner_to_disappear(driver)
         
-        # Add extra wait time to ensure the letter filter is applied
-        time.sleep(3)
+        # Wait for the table to redraw with the letter filter applied
+        wait_for_table_draw(driver, draws)
         
-        wait_for_loading_to_complete()
+        wait_for_loading_to_complete(driver)
         return True
         
     except Exception as e:
         print(f"     Error clicking letter {letter}: {e}")
         return False
 
-def robust_navigate_to_client_list():
-    """Robustly navigates to the Client > Client List page, handling UI glitches and scroll bugs."""
-    print("\n Navigating to Client List (robust fallback enabled)...")
-
-    # Try regular menu click
+def open_client_link(driver, client_link, client_name):
+    """Click a client in the client list and wait for its profile to load"""
+    # Scroll to and click the client
+    driver.execute_script("arguments[0].scrollIntoView(true);", client_link)
+    
+    # Try clicking with JavaScript if regular click fails
     try:
-        client_menu = driver.find_element(By.LINK_TEXT, "Client")
-        client_menu.click()
-        time.sleep(0.5)
-        client_list = driver.find_element(By.LINK_TEXT, "Client List")
-        client_list.click()
-        wait_for_spinner_to_disappear()
-        print("Reached Client List via normal sidebar.")
-        return True
-    except Exception as e:
-        print(f"Sidebar click failed: {e}")
+        client_link.click()
+        print(f"     Clicked on client: {client_name}")
+    except Exception as click_error:
+        print(f"    Regular click failed, trying JavaScript click: {click_error}")
+        driver.execute_script("arguments[0].click();", client_link)
+        print(f"     JavaScript clicked on client: {client_name}")
+    
+    # Wait for client page to load completely
+    print(f"    Waiting for client page to load...")
+    wait_until(
+        "client_profile_loaded",
+        lambda: driver.find_elements(By.CSS_SELECTOR, "#clientProfileInfoDiv h5"),
+        30
+    )
 
-    # Try re-expanding collapsed sidebar
-    try:
-        toggle = driver.find_element(By.CSS_SELECTOR, ".sidebar-collapse-toggle")
-        if toggle.is_displayed():
-            toggle.click()
-            print("Sidebar re-expanded.")
-            time.sleep(1)
-    except:
-        pass  # Not all views have a collapsible sidebar
+# Processed-client log: one row per finished client, appended to MAIN_FOLDER/processed_clients_<time>.csv
+# (or .jsonl) in batches of CLIENT_LOG_BATCH while the run goes, so a crash keeps everything flushed so far
+CLIENT_LOG_FORMAT = os.getenv("CLIENT_LOG_FORMAT", "csv").lower()
+CLIENT_LOG_BATCH = max(1, int(os.getenv("CLIENT_LOG_BATCH", "10")))
 
-    # Scroll to top and try JS click on Client List menu
-    try:
-        driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(1)
-        client_list_js = driver.find_element(By.CSS_SELECTOR, "a.menulink[onclick*='client_list']")
-        driver.execute_script("arguments[0].click();", client_list_js)
-        wait_for_spinner_to_disappear()
-        print("Client List reached via scroll + JS click.")
-        return True
-    except Exception as e:
-        print(f"JS click after scroll failed: {e}")
+@dataclass
+class ClientLogRecord:
+    """The processing result of one client"""
+    letter: str
+    client_number: int
+    page: int
+    position_on_page: int
+    name: str
+    client_name: str
+    client_id: str
+    folder_name: str
+    modal_appeared: bool
+    electronic_records_visited: bool
+    electronic_records_processed: bool
+    treatment_record_folders: tuple
+    finished_at: str
 
-    # Try directly triggering the JS page loader
-    try:
-        driver.execute_script("pagenav('clients/client_list/index.cfm', 0);")
-        wait_for_spinner_to_disappear()
-        print("Triggered Client List via JavaScript pagenav().")
-        return True
-    except Exception as e:
-        print(f"JS function pagenav() failed: {e}")
+CLIENT_LOG_COLUMNS = [column.name for column in fields(ClientLogRecord)]
+
+class ProcessedClientLog:
+    """Append-only log of processed clients that keeps the run summary counts as records come in.
+    The file is only created when the first record is written, so a run that processes no clients leaves none behind"""
+    
+    def __init__(self, path=None, log_format=CLIENT_LOG_FORMAT, batch_size=CLIENT_LOG_BATCH):
+        if log_format not in ("csv", "jsonl"):
+            raise Exception(f"Unknown CLIENT_LOG_FORMAT '{log_format}'. Use csv or jsonl.")
+        self.path = path or os.path.join(MAIN_FOLDER, f"processed_clients_{int(time.time())}.{log_format}")
+        self.format = log_format
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = []
+        self.total = 0
+        self.modal_count = 0
+        self.letter_counts = {}
+        self.file = None
+        self.writer = None
+    
+    def open_file(self):
+        """Open the log file for appending, writing the CSV header into a new file. Called with the lock held"""
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, 'a', newline='', encoding='utf-8')
+        if self.format == "csv":
+            self.writer = csv.writer(self.file)
+            if new_file:
+                self.writer.writerow(CLIENT_LOG_COLUMNS)
+    
+    def append(self, record):
+        with self.lock:
+            self.pending.append(record)
+            self.total += 1
+            self.modal_count += bool(record.modal_appeared)
+            self.letter_counts[record.letter] = self.letter_counts.get(record.letter, 0) + 1
+            if len(self.pending) >= self.batch_size:
+                self.flush_pending()
+    
+    def flush_pending(self):
+        """Write the buffered records. Called with the lock held"""
+        if not self.pending:
+            return
+        if self.file is None:
+            self.open_file()
+        for record in self.pending:
+            row = astuple(record)
+            if self.format == "csv":
+                self.writer.writerow(row[:-2] + ('; '.join(record.treatment_record_folders), record.finished_at))
+            else:
+                self.file.write(json.dumps(dict(zip(CLIENT_LOG_COLUMNS, row))) + "\n")
+        self.pending = []
+        self.file.flush()
+    
+    def flush(self):
+        with self.lock:
+            self.flush_pending()
+    
+    def close(self):
+        with self.lock:
+            self.flush_pending()
+            if self.file:
+                self.file.close()
+
+client_log = None
 
-    # FINAL fallback load the Client List page directly
+def log_processed_client(record):
+    if client_log:
+        client_log.append(record)
+
+@traced("client")
+def process_open_client(driver, letter, list_name, client_number, page_number, position_on_page, onclick=None):
+    """Run the per-client steps on an open client profile and return its log record"""
+    # Close modal if it appears
+    modal_closed = close_modal_if_present(driver)
+    
+    # Extract client information before clicking Electronic Records
+    client_info = extract_client_info(driver)
+    
+    # Click on Electronic Records tab after closing modal
+    electronic_records_clicked = click_electronic_records(driver)
+    
+    # Process electronic records if tab was clicked successfully
+    if electronic_records_clicked:
+        electronic_records_processed, treatment_record_folders = process_electronic_records(driver, client_info)
+        
+        # CLEANUP: Close any open modals after processing all records
+        print("    Performing cleanup after processing electronic records...")
+        cleanup_open_modals(driver)
+        
+    else:
+        electronic_records_processed = False
+        treatment_record_folders = []
+    
+    # A client note that popped up after the first check was still caught by the modal guard
+    if getattr(driver, "modal_guard", False) and not modal_closed:
+        modal_closed = "client_note" in take_interruptions(driver)
+    
+    # Only a client whose documents were all saved counts as finished for the next run,
+    # which is known once the post-processing stage has finalized its last file
+    key = client_key(list_name, onclick)
+    def client_finished(all_saved):
+        if OUTPUT_LAYOUT == "zip" and client_info['folder_name'] != 'Unknown':
+            write_client_manifest(client_info)
+        if journal and electronic_records_processed and not all_saved:
+            entry = {'letter': letter, 'client_number': client_number, 'page': page_number,
+                     'position': position_on_page, 'name': list_name, 'onclick': onclick}
+            journal.add_dead_letter(key, entry, "save", "a captured PDF could not be saved")
+        if not (journal and electronic_records_processed and all_saved):
+            return
+        if client_info['id'] != 'Unknown':
+            journal.mark_records_synced(client_info['id'], client_info.get('record_titles', []))
+        journal.mark_client_done(key, client_info['id'], list_name, letter, client_number)
+    if postprocessor and client_info['id'] != 'Unknown':
+        postprocessor.finish_client(client_info['id'], client_finished)
+    else:
+        client_finished(True)
+    
+    # Record the processing result
+    return ClientLogRecord(
+        letter, client_number, page_number, position_on_page, list_name,
+        client_info['name'], client_info['id'], client_info['folder_name'],
+        bool(modal_closed), bool(electronic_records_clicked), bool(electronic_records_processed),
+        tuple(treatment_record_folders), datetime.now().isoformat(timespec='seconds')
+    )
+
+def write_client_manifest(client_info):
+    """Add a manifest version to the client's archive listing everything it holds now"""
     try:
-        print("Loading Client List page directly...")
-        driver.get("https://secure.aestheticspro.com/clients/client_list/index.cfm")
-        wait_for_spinner_to_disappear()
-        print("Loaded Client List via direct URL.")
-        return True
+        manifest = ClientArchive(os.path.join(MAIN_FOLDER, client_info['folder_name']) + ".zip").write_manifest()
+        if manifest:
+            print(f"    Wrote {manifest} for {client_info['folder_name']}")
     except Exception as e:
-        print(f"All Client List navigation attempts failed: {e}")
+        print(f"    Could not write the archive manifest for {client_info['folder_name']}: {e}")
+
+def settle_client(entry, record, error=None):
+    """Dead-letter a client that failed, or that finished with steps that ran out of retries"""
+    exhausted = take_exhausted_steps()
+    if error is not None:
+        step, reason = (exhausted[-1][0] if exhausted else "client"), str(error)
+    elif record is None:
+        step, reason = "open_client", "could not open the client"
+    elif exhausted or not record.electronic_records_processed:
+        step = exhausted[0][0] if exhausted else "client"
+        reason = "; ".join(f"{failed_step}: {description}" for failed_step, description in exhausted) or "electronic records incomplete"
+    else:
         return False
+    print(f"     Dead-lettered {entry['name']} ({step}: {reason})")
+    if journal:
+        journal.add_dead_letter(client_key(entry['name'], entry['onclick']), entry, step, reason)
+    return True
 
+def run_dead_letter_pass(driver):
+    """Retry the clients dead-lettered during this run, once each and without backoff. Returns how many recovered:
+    finished clients, counted once the PDFs the retries captured have been saved"""
+    dead_letters = journal.dead_letters(journal.started) if journal else []
+    if not dead_letters:
+        return 0
+    print(f"\n{'='*60}")
+    print(f"Retrying {len(dead_letters)} dead-lettered clients")
+    print(f"{'='*60}")
+    
+    retry_state.fast = True
+    try:
+        for entry, step, reason, failures in dead_letters:
+            # Finished meanwhile, e.g. the post-processing stage saved its last file after all
+            if is_client_finished(entry['name'], entry['onclick']):
+                continue
+            print(f"\n  [Retry] Client #{entry['client_number']}: {entry['name']} (failed {failures}x, last at {step}: {reason})")
+            run_status.set_worker(1, "retrying dead letters", entry)
+            record, error = None, None
+            try:
+                record = process_manifest_entry(driver, entry)
+            except Exception as e:
+                error = e
+                print(f"     Retry failed: {e}")
+                navigate_to_client_list(driver)
+            settle_client(entry, record, error)
+    finally:
+        retry_state.fast = False
+    
+    # A retried client is only done once its captured PDFs are saved, or dead-lettered again if one failed
+    if postprocessor:
+        postprocessor.wait_idle()
+    recovered = sum(1 for entry, *_ in dead_letters if is_client_finished(entry['name'], entry['onclick']))
+    print(f"\nRetry pass: {recovered} of {len(dead_letters)} dead-lettered clients recovered")
+    return recovered
 
-def process_clients_for_letter(letter, start_client_number=1):
-    """Process all clients for a specific letter starting from a given client number"""
+def process_clients_for_letter(driver, letter, start_client_number=1):
+    """Process all clients for a specific letter starting from a given client number. Returns how many were processed"""
     print(f"\n{'='*60}")
     print(f"Processing clients for letter: {letter}")
     print(f"Starting from client number: {start_client_number}")
     print(f"{'='*60}")
     
-    processed_clients = []
-    client_index = start_client_number - 1  # Convert to 0-based index
+    # Clients are opened straight from the manifest, so the list is paginated once per letter, not once per client
+    manifest = get_client_manifest(driver, letter)
     
-    while True:
+    processed_count = 0
+    seen_clients = set()
+    last_client_number = start_client_number - 1
+    run_status.plan(letter, sum(1 for entry in manifest if entry['client_number'] >= start_client_number))
+    
+    for entry in manifest:
+        if entry['client_number'] < start_client_number:
+            continue
+        
+        client_number = entry['client_number']
+        actual_client_name = entry['name']
+        last_client_number = client_number
         try:
-            # Calculate which page this client should be on (100 clients per page)
-            page_number = (client_index // 100) + 1
-            page_local_index = client_index % 100
-            
-            print(f"\n  Client #{client_index + 1} → Page {page_number}, Position {page_local_index + 1}")
-            
-            # Navigate to the correct page
-            if not go_to_client_page(letter, page_number):
-                print(f"     Failed to navigate to page {page_number}")
-                break
-            
-            # Get all client links on the current page
-            client_links_current = driver.find_elements(By.CSS_SELECTOR, 
-                "#tblClientLeadListBody tr:not(.dataTables_empty) td.clientName a[onclick*='clientdetails']")
-            
-            total_clients_on_page = len(client_links_current)
-            print(f"    Found {total_clients_on_page} clients on page {page_number}")
-            
-            # Check if we've processed all clients
-            if total_clients_on_page == 0:
-                print(f"    No more clients found on page {page_number}")
-                break
-            
-            # Check if our target client exists on this page
-            if page_local_index >= total_clients_on_page:
-                print(f"    No client at position {page_local_index + 1} on page {page_number}")
-                # Check if there's a next page
-                try:
-                    next_button = driver.find_element(By.ID, "clientlistTableBody_next")
-                    if "disabled" in next_button.get_attribute("class"):
-                        print("    No more pages available")
-                        break
-                    else:
-                        print("    Moving to next page...")
-                        client_index = page_number * 100  # Jump to first client of next page
-                        continue
-                except:
-                    print("    No pagination found")
-                    break
-            
-            # Get the specific client to process
-            client_link = client_links_current[page_local_index]
-            actual_client_name = client_link.text.strip()
-            
-            print(f"\n  [Client #{client_index + 1}] Processing: {actual_client_name}")
-            print(f"    (Page {page_number}, Position {page_local_index + 1} on page)")
+            print(f"\n  [Client #{client_number}] Processing: {actual_client_name}")
+            print(f"    (Page {entry['page']}, Position {entry['position']} on page)")
             
-            # Check if we already processed this client (avoid duplicates)
-            already_processed = any(p['name'] == actual_client_name for p in processed_clients)
-            if already_processed:
+            # Check if we already processed this client, in this run or an earlier one (avoid duplicates)
+            key = client_key(actual_client_name, entry['onclick'])
+            if key in seen_clients or is_client_finished(actual_client_name, entry['onclick']):
                 print(f"     Client {actual_client_name} already processed, moving to next")
-                client_index += 1
+                run_status.client_skipped()
                 continue
+            seen_clients.add(key)
             
-            # Scroll to and click the client
-            driver.execute_script("arguments[0].scrollIntoView(true);", client_link)
-            time.sleep(1)
-            
-            # Try clicking with JavaScript if regular click fails
-            try:
-                client_link.click()
-                print(f"     Clicked on client: {actual_client_name}")
-            except Exception as click_error:
-                print(f"    Regular click failed, trying JavaScript click: {click_error}")
-                driver.execute_script("arguments[0].click();", client_link)
-                print(f"     JavaScript clicked on client: {actual_client_name}")
-            
-            # Wait for client page to load completely
-            print(f"    Waiting for client page to load...")
-            time.sleep(5)
-            
-            # Close modal if it appears
-            modal_closed = close_modal_if_present()
-            
-            # Extract client information before clicking Electronic Records
-            client_info = extract_client_info()
-            
-            # Click on Electronic Records tab after closing modal
-            electronic_records_clicked = click_electronic_records()
-            
-            # Process electronic records if tab was clicked successfully
-            if electronic_records_clicked:
-                electronic_records_processed, treatment_record_folders = process_electronic_records(client_info)
-                
-                # CLEANUP: Close any open modals after processing all records
-                print("    Performing cleanup after processing electronic records...")
-                cleanup_open_modals()
-                
-            else:
-                electronic_records_processed = False
-                treatment_record_folders = []
-            
-            # Record the processing result
-            processed_clients.append({
-                'name': actual_client_name,
-                'letter': letter,
-                'processed': True,
-                'modal_appeared': modal_closed,
-                'client_name': client_info['name'],
-                'client_id': client_info['id'],
-                'folder_name': client_info['folder_name'],
-                'electronic_records_visited': electronic_records_clicked,
-                'electronic_records_processed': electronic_records_processed,
-                'treatment_record_folders': treatment_record_folders,
-                'client_number': client_index + 1,
-                'page': page_number,
-                'position_on_page': page_local_index + 1
-            })
-            
-            # Navigate back to client list through menu
-            if not robust_navigate_to_client_list():
-                print(f"     Could not return to Client List. Skipping {actual_client_name}")
-                client_index += 1
+            # Open the client and run the per-client steps
+            run_status.set_worker(1, "processing", entry)
+            record = process_manifest_entry(driver, entry)
+            run_status.client_finished(1, record is not None)
+            settle_client(entry, record)
+            if record is None:
+                print(f"     Could not open {actual_client_name}. Skipping")
                 continue
+            log_processed_client(record)
+            processed_count += 1
             
-            print(f"     Client #{client_index + 1} ({actual_client_name}) processed successfully")
-            
-            # Move to next client
-            client_index += 1
-            
-            # Small delay between clients
-            time.sleep(2)
+            print(f"     Client #{client_number} ({actual_client_name}) processed successfully")
             
         except Exception as e:
-            print(f"     Error processing client at index {client_index}: {e}")
+            print(f"     Error processing client #{client_number}: {e}")
             import traceback
             traceback.print_exc()
+            run_status.client_finished(1, False)
+            settle_client(entry, None, e)
             
             # Try to recover by navigating back to client list
             try:
                 print(f"    Attempting recovery...")
-                navigate_to_client_list()
-                print(f"     Recovery successful, moving to next client")
-                client_index += 1
-            except:
+                if with_retries("navigate", lambda: navigate_to_client_list(driver)):
+                    print(f"     Recovery successful, moving to next client")
+                else:
+                    print(f"     Recovery failed, moving to next client anyway")
+            except Exception:
                 print(f"     Recovery failed, moving to next client anyway")
-                client_index += 1
-            
-            time.sleep(3)
-            continue
     
-    print(f"\nFinal count for letter {letter}: {len(processed_clients)} clients processed")
+    print(f"\nFinal count for letter {letter}: {processed_count} clients processed")
     print(f"   Started from client #{start_client_number}")
-    print(f"   Ended at client #{client_index}")
-    return processed_clients
+    print(f"   Ended at client #{last_client_number}")
+    return processed_count
 
 
-def get_client_count():
+def get_client_count(driver):
     """Get the number of client rows currently displayed"""
     try:
         client_rows = driver.find_elements(By.CSS_SELECTOR, "#tblClientLeadListBody tr:not(.dataTables_empty)")
@@ -1219,163 +3193,1009 @@ def get_client_count():
     except:
         return -1
 
-# --- Auto-detect Chrome binary ---
-default_chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-chrome_path = default_chrome_path if os.path.exists(default_chrome_path) else shutil.which("google-chrome")
-
-if not chrome_path:
-    raise Exception("Chrome binary not found. Please install Chrome or specify the path manually.")
-
-# --- Auto-detect ChromeDriver binary ---
-chromedriver_path = shutil.which("chromedriver")
-if not chromedriver_path:
-    raise Exception("ChromeDriver not found in PATH. Please install it or add to PATH.")
-
-# Setup Chrome options
-options = webdriver.ChromeOptions()
-options.binary_location = chrome_path
-options.add_argument("--start-maximized")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-
-# Configure Chrome to auto-download PDFs
-prefs = {
-    "printing.print_preview_sticky_settings.appState": '{"recentDestinations":[{"id":"Save as PDF","origin":"local","account":""}],"selectedDestinationId":"Save as PDF","version":2}',
-    "savefile.default_directory": os.path.abspath(MAIN_FOLDER),  # Set default download directory
-    "download.default_directory": os.path.abspath(MAIN_FOLDER),
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True,
-    "plugins.always_open_pdf_externally": True,  # Download PDFs instead of opening
-    "printing.default_destination_selection_rules": {
-        "kind": "local",
-        "namePattern": "Save as PDF",
-    }
-}
-options.add_experimental_option("prefs", prefs)
+def click_next_page(driver):
+    """Click the client list 'Next' button. Returns False when there is no next page"""
+    try:
+        next_button = driver.find_element(By.ID, "clientlistTableBody_next")
+        if "disabled" in next_button.get_attribute("class"):
+            return False
+        draws = get_draw_count(driver)
+        next_button.click()
+        wait_for_spinner_to_disappear(driver)
+        wait_for_table_draw(driver, draws)
+        wait_for_loading_to_complete(driver)
+        return True
+    except NoSuchElementException:
+        return False
 
-# Add argument to handle print dialog
-options.add_argument("--kiosk-printing")  # This enables automatic printing without dialog
+def list_clients_for_letter(driver, letter, start_client_number=1):
+    """Read the client list for a letter once and return one work item per client"""
+    print(f"\n  Listing clients for letter {letter}...")
+    work_items = []
+    if not click_letter(driver, letter):
+        return work_items
+    
+    # Draw the whole letter on one page when the table allows it
+    if set_client_table_page_length(driver, CLIENT_LIST_PAGE_LENGTH):
+        print(f"    Raised client list page length to {CLIENT_LIST_PAGE_LENGTH}")
+    
+    client_number = 0
+    page_number = 1
+    while True:
+        client_page = read_client_rows(driver)
+        client_links = client_page['rows']
+        info = client_page['info']
+        for position, client_link in enumerate(client_links, start=1):
+            client_number += 1
+            if client_number < start_client_number:
+                continue
+            work_items.append({
+                'letter': letter,
+                'client_number': client_number,
+                'page': page_number,
+                'position': position,
+                'name': client_link['name'],
+                'onclick': client_link['onclick']
+            })
+        
+        if info:
+            print(f"    Page {page_number}/{info['pages']}: {len(client_links)} clients ({info['recordsDisplay']} in letter)")
+            if not client_links or page_number >= info['pages']:
+                break
+            advance_client_table_page(driver)
+        else:
+            # No DataTables API on the page: fall back to the pagination buttons
+            print(f"    Page {page_number}: {len(client_links)} clients")
+            if not client_links or not click_next_page(driver):
+                break
+        page_number += 1
+    
+    print(f"  Found {client_number} clients for letter {letter}, {len(work_items)} to process")
+    return work_items
 
-# Initialize WebDriver
-driver = webdriver.Chrome(service=Service(chromedriver_path), options=options)
-wait = WebDriverWait(driver, 10)
+# Client manifests: every client row of a letter, harvested in one pass over the list pages
+MANIFEST_FOLDER = os.path.join(MAIN_FOLDER, "manifests")
+MANIFEST_MAX_AGE_HOURS = float(os.getenv("MANIFEST_MAX_AGE_HOURS", "24"))
 
-try:
-    # Login process
-    print("Starting AestheticsPro Web Scraper...")
-    print("PyAutoGUI is configured for handling save dialogs")
-    print("Note: Move mouse to top-left corner to abort if needed")
-    print("-" * 60)
+def parse_clientdetails_args(onclick):
+    """Return the arguments of the clientdetails(...) call in a client link's onclick"""
+    return parse_js_call(onclick, "clientdetails")[1]
+
+def manifest_path(letter):
+    return os.path.join(MANIFEST_FOLDER, f"{letter}.json")
+
+@traced("harvest_client_manifest")
+def harvest_client_manifest(driver, letter):
+    """Walk the letter's list pages once and persist every client row to the manifest"""
+    entries = list_clients_for_letter(driver, letter)
+    for entry in entries:
+        entry['args'] = parse_clientdetails_args(entry['onclick'])
+        entry['client_id'] = entry['args'][0] if entry['args'] else None
     
-    print("Logging in...")
-    driver.get("https://www.aestheticspro.com/Login/")
-    time.sleep(2)
+    if not os.path.exists(MANIFEST_FOLDER):
+        os.makedirs(MANIFEST_FOLDER)
+    temp_path = manifest_path(letter) + ".part"
+    with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump({'letter': letter, 'harvested_at': time.time(), 'clients': entries}, manifest_file, indent=1)
+    os.replace(temp_path, manifest_path(letter))
+    print(f"  Saved manifest for letter {letter}: {len(entries)} clients -> {manifest_path(letter)}")
+    return entries
+
+def load_client_manifest(letter, max_age_hours=MANIFEST_MAX_AGE_HOURS):
+    """Load a letter's manifest, or None if it is missing or older than max_age_hours"""
+    try:
+        with open(manifest_path(letter), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    age_hours = (time.time() - manifest['harvested_at']) / 3600
+    if age_hours > max_age_hours:
+        print(f"  Manifest for letter {letter} is {age_hours:.1f}h old, harvesting again")
+        return None
+    return manifest['clients']
+
+def get_client_manifest(driver, letter):
+    """Return the letter's manifest, harvesting it first when there is no fresh one on disk"""
+    entries = load_client_manifest(letter)
+    if entries is None:
+        entries = harvest_client_manifest(driver, letter)
+    else:
+        print(f"  Using saved manifest for letter {letter}: {len(entries)} clients")
+    return entries
+
+def run_manifest_dry_run(driver):
+    """Harvest manifests for the chosen letters and report how many clients a run would cover"""
+    letters_input = input("Enter the letters to size (e.g. ABC, or * for A–Z): ").upper().strip()
+    letters = string.ascii_uppercase if letters_input == "*" else [letter for letter in letters_input if letter.isalpha()]
+    
+    letter_counts = {}
+    for letter in letters:
+        entries = harvest_client_manifest(driver, letter)
+        remaining = sum(
+            1 for entry in entries
+            if not is_client_finished(entry['name'], entry['onclick'])
+        )
+        letter_counts[letter] = (len(entries), remaining)
+    
+    print(f"\n{'='*60}")
+    print("DRY RUN: clients per letter")
+    print(f"{'='*60}")
+    for letter, (total, remaining) in letter_counts.items():
+        print(f"  {letter}: {total} clients, {remaining} not yet processed")
+    print(f"\nTotal: {sum(total for total, _ in letter_counts.values())} clients, "
+          f"{sum(remaining for _, remaining in letter_counts.values())} not yet processed")
+
+@traced("open_client")
+def open_client_from_manifest(driver, entry):
+    """Open a client by calling its clientdetails() directly, without paginating the client list"""
+    for attempt in range(2):
+        # clientdetails() lives in the app layout; go back to the list only if this page does not have it
+        if not driver.execute_script("return typeof clientdetails === 'function';"):
+            navigate_to_client_list(driver)
+        
+        previous_profile = driver.execute_script(
+            "var info = document.getElementById('clientProfileInfoDiv'); return info ? info.textContent : null;"
+        )
+        try:
+            driver.execute_script(entry['onclick'])
+        except Exception as e:
+            print(f"     Direct open failed: {e}")
+            continue
+        
+        print(f"     Opened client directly: {entry['name']}")
+        print(f"    Waiting for client page to load...")
+        loaded = wait_until(
+            "client_profile_loaded",
+            lambda: driver.execute_script("""
+                var info = document.getElementById('clientProfileInfoDiv');
+                return info !== null && info.querySelector('h5') !== null && info.textContent !== arguments[0];
+            """, previous_profile),
+            30
+        )
+        if loaded:
+            return True
+        navigate_to_client_list(driver)
+    
+    # Last resort: find the row through the list pagination
+    print(f"     Falling back to the client list for {entry['name']}")
+    return open_client_item(driver, entry)
+
+def open_client_item(driver, item):
+    """Open the client of a work item from the client list"""
+    if not click_letter(driver, item['letter']):
+        return False
+    set_client_table_page_length(driver, CLIENT_LIST_PAGE_LENGTH)
+    
+    # The list may have shifted since it was harvested, so find the row by its onclick rather than its position
+    while True:
+        client_link = driver.execute_script("""
+            var links = document.querySelectorAll("#tblClientLeadListBody td.clientName a[onclick*='clientdetails']");
+            for (var i = 0; i < links.length; i++) {
+                if (links[i].getAttribute('onclick') === arguments[0]) { return links[i]; }
+            }
+            return null;
+        """, item['onclick'])
+        if client_link is not None:
+            break
+        info = read_client_rows(driver)['info']
+        if info and info['page'] + 1 < info['pages']:
+            advance_client_table_page(driver)
+        elif not info and click_next_page(driver):
+            continue
+        else:
+            print(f"     Client {item['name']} not found in the client list")
+            return False
+    
+    open_client_link(driver, client_link, item['name'])
+    return True
+
+def pool_worker(driver, worker_id, work_queue):
+    """Pull client work items from the shared queue and process them in this worker's browser.
+    Returns how many clients this worker processed"""
+    processed_count = 0
+    while True:
+        try:
+            item = work_queue.get_nowait()
+        except queue.Empty:
+            break
+        
+        try:
+            print(f"\n  [Worker {worker_id}] Client #{item['client_number']}: {item['name']}")
+            run_status.set_worker(worker_id, "processing", item)
+            record = process_manifest_entry(driver, item)
+            run_status.client_finished(worker_id, record is not None)
+            settle_client(item, record)
+            if record is None:
+                print(f"     [Worker {worker_id}] Could not open {item['name']}, skipping")
+                continue
+            
+            log_processed_client(record)
+            processed_count += 1
+            
+            print(f"     [Worker {worker_id}] Client #{item['client_number']} ({item['name']}) processed successfully")
+            
+        except Exception as e:
+            print(f"     [Worker {worker_id}] Error processing client #{item['client_number']}: {e}")
+            import traceback
+            traceback.print_exc()
+            run_status.client_finished(worker_id, False)
+            settle_client(item, None, e)
+            try:
+                with_retries("navigate", lambda: navigate_to_client_list(driver))
+            except Exception as navigate_error:
+                print(f"     [Worker {worker_id}] Could not get back to the Client List: {navigate_error}")
+    run_status.set_worker(worker_id, "finished")
+    return processed_count
+
+def run_pool_worker(worker_id, work_queue, counts):
+    """Start a browser for one worker, log in and drain the work queue"""
+    driver = None
+    try:
+        driver = SupervisedDriver(worker_id)
+        counts[worker_id] = pool_worker(driver, worker_id, work_queue)
+    except Exception as e:
+        print(f"     [Worker {worker_id}] Stopped: {e}")
+        run_status.set_worker(worker_id, f"stopped: {e}")
+    finally:
+        if driver:
+            driver.quit()
 
+def run_worker_pool(driver, letter, start_client_number=1, worker_count=1):
+    """Shard the clients of a letter across worker_count browser sessions. Returns how many clients were processed"""
+    print(f"\n{'='*60}")
+    print(f"Processing clients for letter {letter} with {worker_count} workers")
+    print(f"{'='*60}")
+    
+    work_queue = queue.Queue()
+    skipped = 0
+    for item in get_client_manifest(driver, letter):
+        if item['client_number'] < start_client_number:
+            continue
+        if is_client_finished(item['name'], item['onclick']):
+            skipped += 1
+            continue
+        work_queue.put(item)
+    if skipped:
+        print(f"  Skipping {skipped} clients already finished in earlier runs")
+    run_status.plan(letter, work_queue.qsize(), skipped)
+    navigate_to_client_list(driver)
+    
+    counts = {}  # worker id -> clients processed
+    
+    # The already logged-in browser is worker 1, the others start their own sessions
+    threads = [
+        threading.Thread(target=run_pool_worker, args=(worker_id, work_queue, counts), name=f"worker-{worker_id}")
+        for worker_id in range(2, worker_count + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    counts[1] = pool_worker(driver, 1, work_queue)
+    for thread in threads:
+        thread.join()
+    
+    processed_count = sum(counts.values())
+    print(f"\nFinal count for letter {letter}: {processed_count} clients processed by {worker_count} workers")
+    return processed_count
+
+# Browser pool: one chromedriver serves every browser of the run. Each browser gets a profile folder
+# (browser_profiles/slot-N) that is kept between launches and runs, so its HTTP disk cache still holds the
+# app's static assets. WARM_BROWSERS spare browsers are started and logged in in the background. A recycled
+# browser or a new worker takes a ready spare instead of paying Chrome startup and login.
+PROFILE_FOLDER = os.path.join(MAIN_FOLDER, "browser_profiles")
+PERSISTENT_PROFILES = os.getenv("PERSISTENT_PROFILES", "1") == "1"  # 0 wipes a slot's profile before every launch
+DISK_CACHE_MB = int(os.getenv("DISK_CACHE_MB", "512"))
+WARM_BROWSERS = max(0, int(os.getenv("WARM_BROWSERS", "0")))  # Each spare is a full extra logged-in session
+
+chromedriver_service = None
+chromedriver_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def find_browser_binaries():
+    """Locate the Chrome and ChromeDriver binaries (once per run)"""
+    # --- Auto-detect Chrome binary ---
+    default_chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    chrome_path = default_chrome_path if os.path.exists(default_chrome_path) else shutil.which("google-chrome")
+    
+    if not chrome_path:
+        raise Exception("Chrome binary not found. Please install Chrome or specify the path manually.")
+    
+    # --- Auto-detect ChromeDriver binary ---
+    chromedriver_path = shutil.which("chromedriver")
+    if not chromedriver_path:
+        raise Exception("ChromeDriver not found in PATH. Please install it or add to PATH.")
+    
+    return chrome_path, chromedriver_path
+
+def shared_chromedriver():
+    """The run's chromedriver, started on first use (and again if it died)"""
+    global chromedriver_service
+    with chromedriver_lock:
+        if chromedriver_service is None or not chromedriver_service.is_connectable():
+            chromedriver_service = Service(find_browser_binaries()[1])
+            chromedriver_service.start()
+        return chromedriver_service
+
+def stop_chromedriver():
+    global chromedriver_service
+    with chromedriver_lock:
+        if chromedriver_service:
+            try:
+                chromedriver_service.stop()
+            except Exception:
+                pass
+            chromedriver_service = None
+
+def create_driver(profile=SESSION_PROFILE, profile_dir=None):
+    """Start a new Chrome session set up for record capture, on profile_dir if given"""
+    chrome_path = find_browser_binaries()[0]
+    
+    # Setup Chrome options
+    options = webdriver.ChromeOptions()
+    options.binary_location = chrome_path
+    if profile == "lean":
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={LEAN_VIEWPORT}")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--mute-audio")
+    elif HEADLESS:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("--start-maximized")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    if DOCUMENT_TABS:
+        for flag in TAB_THROTTLING_FLAGS:
+            options.add_argument(flag)
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+        options.add_argument(f"--disk-cache-size={DISK_CACHE_MB * 1024 * 1024}")
+    
+    # Configure Chrome to auto-download PDFs
+    prefs = {
+        "download.default_directory": os.path.abspath(MAIN_FOLDER),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        "plugins.always_open_pdf_externally": True,  # Download PDFs instead of opening
+    }
+    if CAPTURE_BACKEND == "pyautogui":
+        # The print dialog is only used by the pyautogui backend: default it to Save as PDF and skip the preview
+        prefs.update({
+            "printing.print_preview_sticky_settings.appState": '{"recentDestinations":[{"id":"Save as PDF","origin":"local","account":""}],"selectedDestinationId":"Save as PDF","version":2}',
+            "savefile.default_directory": os.path.abspath(MAIN_FOLDER),  # Set default download directory
+            "printing.default_destination_selection_rules": {
+                "kind": "local",
+                "namePattern": "Save as PDF",
+            }
+        })
+        options.add_argument("--kiosk-printing")  # This enables automatic printing without dialog
+    options.add_experimental_option("prefs", prefs)
+    
+    # A Remote session on the shared chromedriver: quitting it closes the browser but leaves chromedriver running
+    executor = ChromiumRemoteConnection(
+        remote_server_addr=shared_chromedriver().service_url, vendor_prefix="goog", browser_name="chrome", keep_alive=True
+    )
+    driver = instrument_driver(webdriver.Remote(command_executor=executor, options=options))
+    driver.session_profile = profile
+    driver.profile_dir = profile_dir
+    install_modal_guard(driver)
+    if profile == "lean":
+        # Drop the assets we never use before the first page loads
+        execute_cdp(driver, "Network.enable")
+        block_page_assets(driver, True)
+    return driver
+
+@traced("login")
+def login(driver):
+    """Log in with the USERNAME/PASSWORD environment variables"""
+    print("Logging in...")
+    driver.get(LOGIN_URL)
+    wait_until("login_form", lambda: driver.find_elements(By.ID, "btnSignin"), 20)
+    
     username = os.getenv("USERNAME")
     password = os.getenv("PASSWORD")
-
+    
     # Enter credentials
     driver.find_element(By.ID, "username").send_keys(username)
     driver.find_element(By.ID, "password").send_keys(password)
     driver.find_element(By.ID, "btnSignin").click()
-
-    # Wait for login to complete
-    time.sleep(5)
+    
+    # Wait for login to complete (we leave the login page)
+    wait_until("login_complete", lambda: "/login" not in driver.current_url.lower(), 30)
+    wait_for_spinner_to_disappear(driver)
+    record_page_load(driver, getattr(driver, 'session_profile', None))
     print("Current URL after login:", driver.current_url)
 
-    # Navigate to Client List initially
-    print("Navigating to Client List...")
-    navigate_to_client_list()
+# Session persistence: each worker's cookies and local storage are saved after login and restored on the
+# next start, so a run usually skips the login page. A cheap logged-out check runs before each client;
+# an expired session is logged in again and the interrupted client is retried.
+SESSION_MAX_AGE_HOURS = float(os.getenv("SESSION_MAX_AGE_HOURS", "8"))
+SESSION_RETRIES = int(os.getenv("SESSION_RETRIES", "2"))
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+
+LOGGED_OUT_JS = """
+return window.location.pathname.toLowerCase().indexOf('/login') !== -1 ||
+    document.getElementById('btnSignin') !== null ||
+    (document.readyState === 'complete' && document.querySelector('a.dc-mega') === null);
+"""
+
+def session_state_path(worker_id=1):
+    # One file per worker: parallel browsers must not share a server-side session
+    return os.path.join(MAIN_FOLDER, f"session_state_{worker_id}.json")
 
-    # Process user-selected letter and starting client
-    all_processed_clients = []
+def save_session_state(driver):
+    """Save the browser's cookies and the page's local storage for the next run"""
+    try:
+        cookies = execute_cdp(driver, "Network.getAllCookies")['cookies']
+        local_storage = driver.execute_script(
+            "var items = {}; for (var i = 0; i < localStorage.length; i++) { var key = localStorage.key(i); items[key] = localStorage.getItem(key); } return items;"
+        )
+        state = {'saved_at': time.time(), 'url': driver.current_url, 'cookies': cookies, 'local_storage': local_storage}
+        
+        path = session_state_path(getattr(driver, 'worker_id', 1))
+        temp_path = path + ".part"
+        # The file holds live login cookies, so keep it private to this user
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, path)
+    except Exception as e:
+        print(f"  Could not save session state: {e}")
+
+def restore_session_state(driver):
+    """Load saved cookies and local storage into the browser. Returns True if the session is still logged in"""
+    path = session_state_path(getattr(driver, 'worker_id', 1))
+    try:
+        with open(path, encoding='utf-8') as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return False
+    age_hours = (time.time() - state['saved_at']) / 3600
+    if age_hours > SESSION_MAX_AGE_HOURS:
+        print(f"  Saved session is {age_hours:.1f}h old, logging in again")
+        return False
+    
+    try:
+        cookies = []
+        for cookie in state['cookies']:
+            restored = {key: cookie[key] for key in COOKIE_FIELDS if key in cookie}
+            if not cookie.get('session') and cookie.get('expires', -1) > 0:
+                restored['expires'] = cookie['expires']
+            cookies.append(restored)
+        execute_cdp(driver, "Network.setCookies", {"cookies": cookies})
+        
+        driver.get(CLIENT_LIST_URL)
+        if state.get('local_storage'):
+            driver.execute_script(
+                "var items = arguments[0]; for (var key in items) { localStorage.setItem(key, items[key]); }",
+                state['local_storage']
+            )
+            driver.refresh()
+        wait_until("session_page_loaded", lambda: driver.execute_script("return document.readyState;") == "complete", 30)
+        wait_for_spinner_to_disappear(driver)
+        return not is_logged_out(driver)
+    except Exception as e:
+        print(f"  Could not restore session: {e}")
+        return False
+
+def is_logged_out(driver):
+    """One round trip: are we on the login page, or has the app menu disappeared?"""
+    try:
+        return bool(driver.execute_script(LOGGED_OUT_JS))
+    except Exception:
+        return False
+
+def start_session(driver, worker_id=1):
+    """Reuse the worker's saved session if it is still valid, otherwise log in and save the new one"""
+    driver.worker_id = worker_id
+    if restore_session_state(driver):
+        print("Restored saved session, skipping login")
+        return
+    login(driver)
+    save_session_state(driver)
+
+def ensure_logged_in(driver):
+    """Log in again if the session expired. Returns True if a new login was needed"""
+    if not is_logged_out(driver):
+        return False
+    print("    Session expired, logging in again...")
+    login(driver)
+    save_session_state(driver)
+    navigate_to_client_list(driver)
+    return True
+
+# Browser supervisor: long runs slowly bloat Chrome, so each worker's browser is recycled after
+# RECYCLE_AFTER_CLIENTS clients, above RECYCLE_ABOVE_MB of memory (Chrome and its processes), or when opening
+# a client gets RECYCLE_LATENCY_FACTOR times slower than it was on the fresh browser. A browser that dies is
+# replaced the same way and the interrupted client is retried.
+RECYCLE_AFTER_CLIENTS = int(os.getenv("RECYCLE_AFTER_CLIENTS", "200"))
+RECYCLE_ABOVE_MB = float(os.getenv("RECYCLE_ABOVE_MB", "3000"))
+RECYCLE_LATENCY_FACTOR = float(os.getenv("RECYCLE_LATENCY_FACTOR", "3"))
+LATENCY_WINDOW = 5  # Clients per latency sample (baseline and recent)
+
+def process_tree_rss_mb(root_pid):
+    """Resident memory of a process and all its descendants in MB, or None if it cannot be read"""
+    try:
+        if psutil:
+            root = psutil.Process(root_pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / (1024 * 1024)
+        
+        # /proc fallback (Linux): build the parent map once, then walk down from root_pid
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as stat_file:
+                    parent = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+                children.setdefault(parent, []).append(int(entry))
+            except (OSError, ValueError, IndexError):
+                pass
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        total = 0
+        pending = [root_pid]
+        while pending:
+            pid = pending.pop()
+            pending.extend(children.get(pid, []))
+            try:
+                with open(f"/proc/{pid}/statm") as statm_file:
+                    total += int(statm_file.read().split()[1]) * page_size
+            except (OSError, ValueError, IndexError):
+                pass
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+def browser_process_id(profile_dir):
+    """PID of the Chrome browser process running on profile_dir (its renderers and helpers run under it)"""
+    flag = f"--user-data-dir={os.path.abspath(profile_dir)}"
+    try:
+        if psutil:
+            processes = ((process.pid, process.info['cmdline'] or []) for process in psutil.process_iter(['cmdline']))
+        else:
+            processes = []
+            for entry in os.listdir("/proc"):
+                if entry.isdigit():
+                    try:
+                        with open(f"/proc/{entry}/cmdline", 'rb') as cmdline_file:
+                            processes.append((int(entry), cmdline_file.read().decode(errors='replace').split("\0")))
+                    except OSError:
+                        pass
+        for pid, arguments in processes:
+            if flag in arguments and not any(argument.startswith("--type=") for argument in arguments):
+                return pid
+    except Exception:
+        pass
+    return None
+
+def browser_memory_mb(driver):
+    """Memory of a pooled browser: its Chrome process and everything under it"""
+    profile_dir = getattr(driver, 'profile_dir', None)
+    if not profile_dir:
+        return None
+    if not getattr(driver, 'browser_pid', None):
+        driver.browser_pid = browser_process_id(profile_dir)
+    return process_tree_rss_mb(driver.browser_pid) if driver.browser_pid else None
+
+class BrowserPool:
+    """Hands out logged-in browsers, each on its own profile slot, and keeps WARM_BROWSERS spares ready"""
     
-    # letter input from user
-    selected_letter = input("Enter the letter of the client names to process (A–Z): ").upper().strip()
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.free_slots = []
+        self.slot_count = 0
+        self.spares = queue.Queue()
+        self.warm_target = 0
+        self.warming = 0
+        self.closed = False
     
-    if len(selected_letter) != 1 or not selected_letter.isalpha():
-        print("Invalid input. Please enter a single letter from A to Z.")
-    else:
-        # Get starting client number from user
-        start_client_input = input(f"Enter the starting client number for letter {selected_letter} (default is 1): ").strip()
+    def take_slot(self):
+        with self.lock:
+            if self.free_slots:
+                return self.free_slots.pop(0)
+            self.slot_count += 1
+            return self.slot_count
+    
+    def free_slot(self, slot):
+        with self.lock:
+            self.free_slots.append(slot)
+            self.free_slots.sort()
+    
+    def launch(self, profile=SESSION_PROFILE):
+        """Start a browser on a free profile slot"""
+        slot = self.take_slot()
+        profile_dir = os.path.join(PROFILE_FOLDER, f"slot-{slot}")
+        if not PERSISTENT_PROFILES:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        os.makedirs(profile_dir, exist_ok=True)
+        try:
+            driver = create_driver(profile, profile_dir)
+        except Exception:
+            self.free_slot(slot)
+            raise
+        driver.profile_slot = slot
+        return driver
+    
+    def release(self, driver):
+        """Close a browser and give its profile slot back"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        slot = getattr(driver, 'profile_slot', None)
+        if slot is not None:
+            self.free_slot(slot)
+    
+    def acquire(self, worker_id):
+        """A logged-in browser on the Client List for worker_id: a warm spare if one is ready, otherwise a new one"""
+        try:
+            driver = self.spares.get_nowait()
+        except queue.Empty:
+            driver = None
+        self.refill()
+        
+        if driver is not None:
+            try:
+                if not is_logged_out(driver) and driver.execute_script("return 1;") == 1:
+                    # The spare's login becomes this worker's saved session
+                    driver.worker_id = worker_id
+                    save_session_state(driver)
+                    print(f"  [Browser {worker_id}] Using a warm browser")
+                    return driver
+            except Exception:
+                pass
+            self.release(driver)
         
-        # Parse the starting client number
+        driver = self.launch()
+        try:
+            start_session(driver, worker_id)
+            print("Navigating to Client List...")
+            navigate_to_client_list(driver)
+        except Exception:
+            self.release(driver)
+            raise
+        return driver
+    
+    def prewarm(self, count=WARM_BROWSERS):
+        """Keep count spare browsers ready from now on"""
+        self.warm_target = count
+        self.refill()
+    
+    def refill(self):
+        with self.lock:
+            missing = self.warm_target - self.spares.qsize() - self.warming
+            if self.closed or missing <= 0:
+                return
+            self.warming += missing
+        for _ in range(missing):
+            threading.Thread(target=self.warm_up, name="browser-warmup", daemon=True).start()
+    
+    def warm_up(self):
+        """Start a spare browser, log it in with its own session and park it on the Client List"""
+        driver = None
+        try:
+            driver = self.launch()
+            start_session(driver, f"spare-{driver.profile_slot}")
+            navigate_to_client_list(driver)
+            self.spares.put(driver)
+            driver = None
+        except Exception as e:
+            print(f"  Could not warm up a spare browser: {e}")
+        finally:
+            with self.lock:
+                self.warming -= 1
+            if driver is not None:
+                self.release(driver)
+        if self.closed:
+            self.release_spares()
+    
+    def release_spares(self):
+        while True:
+            try:
+                self.release(self.spares.get_nowait())
+            except queue.Empty:
+                return
+    
+    def close(self):
+        """Close the spares and stop chromedriver"""
+        with self.lock:
+            self.closed = True
+        self.release_spares()
+        stop_chromedriver()
+
+browser_pool = BrowserPool()
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else 0.0
+
+class SupervisedDriver:
+    """Stands in for one worker's WebDriver and swaps in a fresh Chrome when the current one is recycled
+    or dies. Every WebDriver attribute is forwarded to the current browser, so it can be passed anywhere
+    a driver is expected"""
+    
+    def __init__(self, worker_id=1):
+        self.worker_id = worker_id
+        self.current = None
+        self.recycles = 0
+        self.start()
+    
+    def __getattr__(self, name):
+        current = self.__dict__.get('current')
+        if current is None:
+            raise AttributeError(name)
+        return getattr(current, name)
+    
+    def start(self):
+        """Take a logged-in browser on the Client List from the pool (a warm spare, or a new one)"""
+        self.current = browser_pool.acquire(self.worker_id)
+        self.clients_since_start = 0
+        self.open_times = []
+        self.baseline_open_time = None
+    
+    def is_alive(self):
+        try:
+            self.current.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+    
+    def memory_mb(self):
+        """Memory of this worker's Chrome processes"""
+        return browser_memory_mb(self.current)
+    
+    def recycle_reason(self):
+        """Why the browser should be recycled now, or None"""
+        if RECYCLE_AFTER_CLIENTS and self.clients_since_start >= RECYCLE_AFTER_CLIENTS:
+            return f"processed {self.clients_since_start} clients"
+        memory = self.memory_mb()
+        if RECYCLE_ABOVE_MB and memory is not None and memory > RECYCLE_ABOVE_MB:
+            return f"using {memory:.0f} MB"
+        if self.baseline_open_time and len(self.open_times) >= LATENCY_WINDOW:
+            recent = median(self.open_times[-LATENCY_WINDOW:])
+            if recent > self.baseline_open_time * RECYCLE_LATENCY_FACTOR:
+                return f"opening a client takes {recent:.1f}s (was {self.baseline_open_time:.1f}s)"
+        return None
+    
+    def client_finished(self, open_seconds):
+        """Record one processed client and recycle the browser if a threshold was crossed"""
+        self.clients_since_start += 1
+        self.open_times.append(open_seconds)
+        if self.baseline_open_time is None and len(self.open_times) >= LATENCY_WINDOW:
+            self.baseline_open_time = median(self.open_times[:LATENCY_WINDOW])
+        reason = self.recycle_reason()
+        if reason:
+            self.restart(reason)
+    
+    def restart(self, reason):
+        """Replace the browser, keeping the login session"""
+        print(f"\n  [Browser {self.worker_id}] Recycling Chrome: {reason}")
+        run_status.set_worker(self.worker_id, f"restarting browser ({reason})")
+        if self.is_alive():
+            save_session_state(self)
+        self.quit()
+        self.recycles += 1
+        self.start()
+    
+    def quit(self):
+        browser_pool.release(self.current)
+
+def process_manifest_entry(driver, entry):
+    """Open a manifest client and process it. When the session expires (or the browser dies) in the middle
+    of the client, log in again (or restart the browser) and retry it; documents already saved are skipped
+    through the journal. Returns the client's log record, or None if it could not be opened"""
+    supervised = isinstance(driver, SupervisedDriver)
+    take_exhausted_steps()
+    for attempt in range(SESSION_RETRIES + 1):
+        ensure_logged_in(driver)
+        record = None
+        error = None
+        open_seconds = None
         try:
-            start_client_number = int(start_client_input) if start_client_input else 1
-            if start_client_number < 1:
-                print("Invalid client number. Starting from client 1.")
-                start_client_number = 1
-        except ValueError:
-            print("Invalid input. Starting from client 1.")
-            start_client_number = 1
+            opened_at = time.monotonic()
+            if with_retries("open_client", lambda: open_client_from_manifest(driver, entry),
+                            recover=lambda: navigate_to_client_list(driver), description=entry['name']):
+                open_seconds = time.monotonic() - opened_at
+                record = process_open_client(driver, entry['letter'], entry['name'], entry['client_number'], entry['page'], entry['position'], entry['onclick'])
+        except Exception as e:
+            error = e
         
-        print(f"\nWill process letter {selected_letter} starting from client #{start_client_number}")
+        attempts_left = SESSION_RETRIES - attempt
+        if supervised and not driver.is_alive():
+            print(f"     Browser died while processing {entry['name']} (attempt {attempt + 1} of {SESSION_RETRIES + 1} failed), restarting it"
+                  + (" and retrying" if attempts_left else ""))
+            driver.restart("browser stopped responding")
+            continue
+        if not is_logged_out(driver):
+            if error:
+                raise error
+            if supervised and open_seconds is not None:
+                driver.client_finished(open_seconds)
+            return record
+        print(f"     Session expired while processing {entry['name']} (attempt {attempt + 1} of {SESSION_RETRIES + 1} failed)"
+              + (", retrying" if attempts_left else ""))
+    
+    if error:
+        raise error
+    return record
+
+def main():
+    if CAPTURE_BACKEND not in CAPTURE_BACKENDS:
+        raise Exception(f"Unknown CAPTURE_BACKEND '{CAPTURE_BACKEND}'. Use one of: {', '.join(CAPTURE_BACKENDS)}")
+    if CAPTURE_BACKEND == "pyautogui" and pyautogui is None:
+        raise Exception("CAPTURE_BACKEND=pyautogui needs PyAutoGUI and a visible desktop. Install it or use CAPTURE_BACKEND=cdp.")
+    if FETCH_MODE not in ("browser", "http"):
+        raise Exception(f"Unknown FETCH_MODE '{FETCH_MODE}'. Use browser or http.")
+    if FETCH_MODE == "http" and requests is None:
+        raise Exception("FETCH_MODE=http needs the requests package. Install it or use FETCH_MODE=browser.")
+    if SESSION_PROFILE not in ("standard", "lean"):
+        raise Exception(f"Unknown SESSION_PROFILE '{SESSION_PROFILE}'. Use standard or lean.")
+    if SESSION_PROFILE == "lean" and CAPTURE_BACKEND == "pyautogui":
+        raise Exception("SESSION_PROFILE=lean runs headless, which the pyautogui capture backend cannot drive. Use CAPTURE_BACKEND=cdp.")
+    if OUTPUT_LAYOUT not in ("folders", "zip"):
+        raise Exception(f"Unknown OUTPUT_LAYOUT '{OUTPUT_LAYOUT}'. Use folders or zip.")
+    if OUTPUT_LAYOUT == "zip":
+        compression_method()
+        if CAPTURE_BACKEND == "pyautogui":
+            raise Exception("OUTPUT_LAYOUT=zip needs CAPTURE_BACKEND=cdp: the save dialog writes into the client folder.")
+    apply_retry_overrides()
+    if CLIENT_LOG_FORMAT not in ("csv", "jsonl"):
+        raise Exception(f"Unknown CLIENT_LOG_FORMAT '{CLIENT_LOG_FORMAT}'. Use csv or jsonl.")
+    if CAPTURE_BACKEND == "pyautogui" and WORKER_COUNT > 1:
+        raise Exception("The pyautogui capture backend drives a single desktop and cannot run with WORKER_COUNT > 1.")
+    
+    # Open the run journal so finished clients and documents are skipped
+    global journal, postprocessor, text_indexer, client_log
+    journal = RunJournal(JOURNAL_PATH)
+    client_log = ProcessedClientLog()
+    postprocessor = PostProcessor()
+    if EXTRACT_WORKERS:
+        text_indexer = TextIndexer(INDEX_PATH, EXTRACT_WORKERS)
+    status_server = start_status_server()
+    start_trace()
+    
+    driver = None
+    try:
+        # Drop bad or missing PDFs from the journal so this run fetches just those again
+        if VERIFY_STORE:
+            verify_saved_documents()
         
-        # Calculate which page this will start on
-        start_page = ((start_client_number - 1) // 100) + 1
-        position_on_page = ((start_client_number - 1) % 100) + 1
-        print(f"   This is page {start_page}, position {position_on_page} on that page")
+        # Login process
+        print("Starting AestheticsPro Web Scraper...")
+        if CAPTURE_BACKEND == "pyautogui":
+            print("PyAutoGUI is configured for handling save dialogs")
+            print("Note: Move mouse to top-left corner to abort if needed")
+        else:
+            print("PDFs are captured with DevTools printToPDF (no print/save dialogs)")
+        print("-" * 60)
         
-        # Process clients
-        processed_clients = process_clients_for_letter(selected_letter, start_client_number)
-        all_processed_clients.extend(processed_clients)
+        # Spare browsers start in the background; the pyautogui backend needs the one window it drives
+        if WARM_BROWSERS and not DRY_RUN and CAPTURE_BACKEND != "pyautogui":
+            browser_pool.prewarm(WARM_BROWSERS)
         
-        print(f"\n{'='*40}")
-        print(f"Letter {selected_letter} Summary:")
-        print(f"Started from: Client #{start_client_number}")
-        print(f"Processed: {len(processed_clients)} clients")
-        print(f"{'='*40}")
-
+        # Start Chrome under the supervisor: it logs in (or restores the saved session), opens the
+        # Client List, and replaces the browser whenever it needs recycling
+        driver = SupervisedDriver()
+        
+        if DRY_RUN:
+            run_manifest_dry_run(driver)
+            return
 
-    # Step 4: Final Summary
-    print(f"\n{'='*60}")
-    print(f"SCRAPING COMPLETED!")
-    print(f"{'='*60}")
-    print(f"Total clients processed: {len(all_processed_clients)}")
-    
-    # Group by letter for summary
-    letter_counts = {}
-    for client in all_processed_clients:
-        letter = client['letter']
-        letter_counts[letter] = letter_counts.get(letter, 0) + 1
-    
-    print("\nClients processed per letter:")
-    for letter in sorted(letter_counts.keys()):
-        print(f"  {letter}: {letter_counts[letter]} clients")
-
-    # Count clients with modals
-    modal_count = sum(1 for client in all_processed_clients if client.get('modal_appeared', False))
-    print(f"\nClients with modals: {modal_count}")
-
-    # Optional: Save to file
-    save_to_file = input("\nDo you want to save the processing log to a CSV file? (y/n): ").lower().strip()
-    if save_to_file == 'y':
-        import csv
-        filename = f"aestheticspro_processed_clients_{int(time.time())}.csv"
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['letter', 'name', 'processed', 'modal_appeared', 'client_name', 'client_id', 'folder_name', 'electronic_records_visited', 'electronic_records_processed', 'treatment_record_folders', 'index']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+        # Process user-selected letter and starting client
+        # letter input from user
+        selected_letter = input("Enter the letter of the client names to process (A–Z): ").upper().strip()
+        
+        if len(selected_letter) != 1 or not selected_letter.isalpha():
+            print("Invalid input. Please enter a single letter from A to Z.")
+        else:
+            # Get starting client number from user. The default is the top of the letter: client numbers shift as
+            # clients are added, so finished clients are skipped by their journal key rather than by position
+            resume_client_number = 1
+            start_client_input = input(f"Enter the starting client number for letter {selected_letter} (default is {resume_client_number}): ").strip()
+            
+            # Parse the starting client number
+            try:
+                start_client_number = int(start_client_input) if start_client_input else resume_client_number
+                if start_client_number < 1:
+                    print("Invalid client number. Starting from client 1.")
+                    start_client_number = 1
+            except ValueError:
+                print(f"Invalid input. Starting from client {resume_client_number}.")
+                start_client_number = resume_client_number
             
-            # Convert treatment_record_folders list to string for CSV
-            for client in all_processed_clients:
-                if 'treatment_record_folders' in client and isinstance(client['treatment_record_folders'], list):
-                    client['treatment_record_folders'] = '; '.join(client['treatment_record_folders'])
+            print(f"\nWill process letter {selected_letter} starting from client #{start_client_number}")
             
-            writer.writerows(all_processed_clients)
+            # Process clients
+            if WORKER_COUNT > 1:
+                processed_count = run_worker_pool(driver, selected_letter, start_client_number, WORKER_COUNT)
+            else:
+                processed_count = process_clients_for_letter(driver, selected_letter, start_client_number)
+            
+            # Every captured PDF is finalized first, so clients whose saves failed are dead-lettered too.
+            # The workers keep running for the PDFs the retries capture; they are only stopped in finally
+            recovered_count = 0
+            if DEAD_LETTER_PASS:
+                postprocessor.wait_idle()
+                recovered_count = run_dead_letter_pass(driver)
+            
+            print(f"\n{'='*40}")
+            print(f"Letter {selected_letter} Summary:")
+            print(f"Started from: Client #{start_client_number}")
+            print(f"Processed: {processed_count} clients")
+            if recovered_count:
+                print(f"Recovered in the retry pass: {recovered_count} clients")
+            print(f"{'='*40}")
+
+
+        # Every captured PDF is on disk and verified before the summary
+        postprocessor.wait_idle()
         
-        print(f"Processing log saved to: {filename}")
+        # Step 4: Final Summary
+        print(f"\n{'='*60}")
+        print(f"SCRAPING COMPLETED!")
+        print(f"{'='*60}")
+        print(f"Total clients processed: {client_log.total}")
+        
+        print("\nClients processed per letter:")
+        for letter in sorted(client_log.letter_counts.keys()):
+            print(f"  {letter}: {client_log.letter_counts[letter]} clients")
 
-    print("\nBrowser will remain open. Press CTRL+C or close the window to quit.")
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("Exiting...")
-
-finally:
-    # Uncomment the next line if you want to automatically close the browser
-    # driver.quit()
-    pass
+        print(f"\nClients with modals: {client_log.modal_count}")
+        
+        dead_letters = journal.dead_letters(journal.started)
+        if dead_letters:
+            print(f"\nStill failing: {len(dead_letters)} clients (retried on the next run)")
+            for entry, step, reason, failures in dead_letters:
+                print(f"  #{entry['client_number']} {entry['name']}: {step} ({reason})")
+
+        # Where the waiting time actually went
+        print_readiness_report()
+        print_span_report()
+        print_page_load_report()
+        print_tab_report()
+        
+        # What this sync added, per client
+        if DELTA_SYNC:
+            write_delta_report()
+
+        client_log.flush()
+        if client_log.total:
+            print(f"Processing log saved to: {client_log.path}")
+
+        if not HEADLESS:
+            print("\nBrowser will remain open. Press CTRL+C or close the window to quit.")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                print("Exiting...")
+
+    finally:
+        # Finish the captured PDFs still queued; everything finished is then in the journal,
+        # so a rerun resumes from here
+        postprocessor.drain()
+        if text_indexer:
+            text_indexer.close()
+        if status_server:
+            status_server.shutdown()
+        client_log.close()
+        journal.close()
+        stop_trace()
+        if driver:
+            driver.quit()
+        browser_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+from contextlib import contextmanager
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import zipfile
+import threading
+
+# Per-client archive output (OUTPUT_LAYOUT=zip): instead of a folder of small PDFs, every client gets one
+# "<Client Name - ID>.zip" next to where the folder would be. Documents are appended as they finish, each
+# member carries its metadata as a JSON member comment, and a versioned manifest/NNNN.json lists them all.
+# Zip keeps a central directory, so one document can be read without unpacking the rest. Changes are appended in
+# place: the new member overwrites the old central directory and a new one is written after it. The old central
+# directory (with its offset) is saved to "<archive>.zip.rollback" first, so an append that fails or is cut short by
+# a crash is undone by writing it back and truncating there. Members already in the archive are never rewritten.
+#   python Aesthetics_Pro_Archive.py "Aesthetics Pro/Doe, Jane - 1234.zip"             list the latest manifest
+#   python Aesthetics_Pro_Archive.py "Aesthetics Pro/Doe, Jane - 1234.zip" <member>    extract one document
+OUTPUT_LAYOUT = os.getenv("OUTPUT_LAYOUT", "folders").lower()
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "stored").lower()
+ARCHIVE_SEPARATOR = "::"  # Saved document paths inside an archive look like "<archive>.zip::<member>"
+MANIFEST_PREFIX = "manifest/"
+ROLLBACK_SUFFIX = ".rollback"
+
+# PDFs are already compressed, so members are stored by default; zstd needs a zipfile with ZIP_ZSTANDARD (Python 3.14+)
+COMPRESSION_METHODS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "zstd": getattr(zipfile, "ZIP_ZSTANDARD", None)
+}
+
+archive_locks = {}
+archive_locks_lock = threading.Lock()
+
+def archive_lock(path):
+    """One lock per archive file: post-processing threads may finish documents of the same client together"""
+    path = os.path.abspath(path)
+    with archive_locks_lock:
+        if path not in archive_locks:
+            archive_locks[path] = threading.Lock()
+        return archive_locks[path]
+
+def compression_method():
+    method = COMPRESSION_METHODS.get(ARCHIVE_COMPRESSION)
+    if method is None:
+        raise Exception(f"ARCHIVE_COMPRESSION '{ARCHIVE_COMPRESSION}' is not available here. Use stored or deflate.")
+    return method
+
+def archive_document_path(archive_path, member):
+    return f"{archive_path}{ARCHIVE_SEPARATOR}{member}"
+
+def split_document_path(path):
+    """Split a saved document path into (archive path, member), or (path, None) for a plain file"""
+    archive_path, separator, member = path.partition(ARCHIVE_SEPARATOR)
+    return (archive_path, member) if separator else (path, None)
+
+def recover_archive(archive_path):
+    """Undo an append that did not finish: put the saved central directory back at its offset and cut the file there.
+    An offset of -1 means the append created the archive, so it is removed. Call with the archive's lock held"""
+    rollback_path = archive_path + ROLLBACK_SUFFIX
+    if not os.path.exists(rollback_path):
+        return False
+    with open(rollback_path, 'rb') as rollback_file:
+        saved = rollback_file.read()
+    offset = struct.unpack("<q", saved[:8])[0]
+    if offset < 0:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+    else:
+        with open(archive_path, 'rb+') as archive_file:
+            archive_file.seek(offset)
+            archive_file.write(saved[8:])
+            archive_file.truncate()
+            os.fsync(archive_file.fileno())
+    os.remove(rollback_path)
+    print(f"  Rolled back an unfinished change to {os.path.basename(archive_path)}")
+    return True
+
+def document_exists(path):
+    archive_path, member = split_document_path(path)
+    if member is None:
+        return os.path.exists(path)
+    with archive_lock(archive_path):
+        recover_archive(archive_path)
+        if not os.path.exists(archive_path):
+            return False
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                archive.getinfo(member)
+            return True
+        except (KeyError, zipfile.BadZipFile):
+            return False
+
+@contextmanager
+def open_document(path):
+    """Open a saved document for reading, whether it is a plain file or an archive member.
+    The archive is opened under its lock; members are never rewritten, so reading goes on while later ones are appended"""
+    archive_path, member = split_document_path(path)
+    if member is None:
+        with open(path, 'rb') as document_file:
+            yield document_file
+        return
+    with archive_lock(archive_path):
+        recover_archive(archive_path)
+        archive = zipfile.ZipFile(archive_path)
+    with archive:
+        with archive.open(member) as document_file:
+            yield document_file
+
+def archive_members(archive_path):
+    """Documents of an archive as saved document paths (manifests excluded)"""
+    with zipfile.ZipFile(archive_path) as archive:
+        return [
+            archive_document_path(archive_path, name) for name in archive.namelist()
+            if not name.startswith(MANIFEST_PREFIX)
+        ]
+
+class ClientArchive:
+    """A client's zip archive. Changes are appended in place and rolled back if they do not complete"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = archive_lock(path)
+
+    def save_rollback(self):
+        """Save the central directory and end record the next append overwrites, with their offset, to the rollback file.
+        It is written under a temporary name and renamed, so a rollback file that exists is always complete"""
+        if os.path.exists(self.path):
+            with zipfile.ZipFile(self.path) as archive:
+                offset = archive.start_dir
+            with open(self.path, 'rb') as archive_file:
+                archive_file.seek(offset)
+                saved = archive_file.read()
+        else:
+            offset, saved = -1, b""
+        temp_path = self.path + ROLLBACK_SUFFIX + ".part"
+        with open(temp_path, 'wb') as rollback_file:
+            rollback_file.write(struct.pack("<q", offset) + saved)
+            rollback_file.flush()
+            os.fsync(rollback_file.fileno())
+        os.replace(temp_path, self.path + ROLLBACK_SUFFIX)
+
+    @contextmanager
+    def appending(self, compression, check_member=None):
+        """Yield the archive open for appending. When the block finishes, the change is verified (check_member(),
+        if given, names a member whose data and CRC are read back) and flushed to disk. On any error the archive is
+        rolled back to how it was. Call with self.lock held"""
+        recover_archive(self.path)
+        self.save_rollback()
+        try:
+            with zipfile.ZipFile(self.path, 'a', compression=compression) as archive:
+                yield archive
+            if check_member:
+                with zipfile.ZipFile(self.path) as archive, archive.open(check_member()) as written:
+                    while written.read(256 * 1024):
+                        pass  # ZipExtFile raises BadZipFile at the end of a member whose CRC does not match
+            with open(self.path, 'rb+') as archive_file:
+                os.fsync(archive_file.fileno())
+        except BaseException:
+            recover_archive(self.path)
+            raise
+        os.remove(self.path + ROLLBACK_SUFFIX)
+
+    def add(self, source_path, member, metadata=None):
+        """Add a file as member (renamed "<name>-2.pdf", ... if the name is taken by an earlier version).
+        Returns the saved document path of the new member once the archive holding it is on disk"""
+        with self.lock:
+            with self.appending(compression_method(), lambda: member) as archive:
+                names = set(archive.namelist())
+                base, extension = os.path.splitext(member)
+                version = 1
+                while member in names:
+                    version += 1
+                    member = f"{base}-{version}{extension}"
+
+                info = zipfile.ZipInfo.from_file(source_path, member)
+                info.compress_type = compression_method()
+                info.comment = json.dumps(dict(metadata or {}, added_at=time.time())).encode()
+                with open(source_path, 'rb') as source, archive.open(info, 'w') as destination:
+                    shutil.copyfileobj(source, destination, 256 * 1024)
+        return archive_document_path(self.path, member)
+
+    def write_manifest(self):
+        """Add manifest/NNNN.json listing every document with its metadata, unless nothing changed since the last one.
+        Returns the manifest member name or None"""
+        with self.lock:
+            recover_archive(self.path)
+            if not os.path.exists(self.path):
+                return None
+            with zipfile.ZipFile(self.path) as archive:
+                manifests = sorted(name for name in archive.namelist() if name.startswith(MANIFEST_PREFIX))
+                documents = [
+                    dict(json.loads(info.comment or b"{}"), member=info.filename, size=info.file_size,
+                         compressed_size=info.compress_size, offset=info.header_offset)
+                    for info in archive.infolist() if not info.filename.startswith(MANIFEST_PREFIX)
+                ]
+                if manifests and json.loads(archive.read(manifests[-1])).get('document_count') == len(documents):
+                    return None
+            name = f"{MANIFEST_PREFIX}{len(manifests) + 1:04d}.json"
+            with self.appending(zipfile.ZIP_DEFLATED, lambda: name) as archive:
+                archive.writestr(name, json.dumps({
+                    'version': len(manifests) + 1,
+                    'written_at': time.time(),
+                    'document_count': len(documents),
+                    'documents': documents
+                }, indent=1))
+        return name
+
+def read_manifest(archive_path):
+    """The latest manifest of an archive, rebuilt from the member comments if none was written yet"""
+    with zipfile.ZipFile(archive_path) as archive:
+        manifests = sorted(name for name in archive.namelist() if name.startswith(MANIFEST_PREFIX))
+        if manifests:
+            return json.loads(archive.read(manifests[-1]))
+        documents = [
+            dict(json.loads(info.comment or b"{}"), member=info.filename, size=info.file_size)
+            for info in archive.infolist()
+        ]
+        return {'version': 0, 'document_count': len(documents), 'documents': documents}
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python Aesthetics_Pro_Archive.py <client archive.zip> [member to extract]")
+        return
+    archive_path = sys.argv[1]
+
+    if len(sys.argv) > 2:
+        member = sys.argv[2]
+        with open_document(archive_document_path(archive_path, member)) as source, open(os.path.basename(member), 'wb') as target:
+            shutil.copyfileobj(source, target)
+        print(f"Extracted {member}")
+        return
+
+    manifest = read_manifest(archive_path)
+    print(f"{archive_path}: {manifest['document_count']} documents (manifest version {manifest['version']})")
+    for document in manifest['documents']:
+        print(f"  {document['member']}  {document['size']} bytes  {document.get('record_title', '')} / {document.get('file_name', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+# End-to-end throughput benchmark: runs the real Aesthetics_Pro.py pipeline in headless Chrome against the
+# local mock site (Aesthetics_Pro_Mock.py) over a synthetic dataset and reports clients/hour and documents/hour.
+# Every scraper setting (CAPTURE_BACKEND, FETCH_MODE, WORKER_COUNT, ...) can be set in the environment as usual.
+BENCH_CLIENTS = int(os.getenv("BENCH_CLIENTS", "20"))
+BENCH_LETTERS = os.getenv("BENCH_LETTERS", "AB")
+BENCH_LATENCY_MS = int(os.getenv("BENCH_LATENCY_MS", "150"))
+BENCH_PORT = int(os.getenv("BENCH_PORT", "8765"))
+BENCH_KEEP_OUTPUT = os.getenv("BENCH_KEEP_OUTPUT", "0") == "1"
+# BENCH_COMPARE_PROFILES=1 only times cold client list loads with the standard and the lean session profile
+BENCH_COMPARE_PROFILES = os.getenv("BENCH_COMPARE_PROFILES", "0") == "1"
+BENCH_PAGE_LOADS = int(os.getenv("BENCH_PAGE_LOADS", "5"))
+
+REPO_FOLDER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_FOLDER)
+
+def compare_session_profiles(scraper):
+    """Load the client list page BENCH_PAGE_LOADS times with each session profile and compare load times"""
+    for profile in ("standard", "lean"):
+        print(f"\nTiming {BENCH_PAGE_LOADS} page loads with the {profile} profile...")
+        driver = scraper.create_driver(profile)
+        try:
+            scraper.login(driver)
+            for _ in range(BENCH_PAGE_LOADS):
+                # Drop the HTTP cache so every load is cold
+                scraper.execute_cdp(driver, "Network.clearBrowserCache")
+                driver.get(scraper.CLIENT_LIST_URL)
+                scraper.record_page_load(driver, profile)
+        finally:
+            driver.quit()
+    scraper.print_page_load_report()
+
+def main():
+    import Aesthetics_Pro_Mock as mock
+    server, site = mock.start_mock_server(BENCH_PORT, BENCH_CLIENTS, BENCH_LETTERS, BENCH_LATENCY_MS)
+    base_url = f"http://127.0.0.1:{BENCH_PORT}"
+    expected_documents = len(site.documents)
+    print(f"Mock site: {len(site.clients)} clients ({BENCH_LETTERS}), {expected_documents} documents, "
+          f"{BENCH_LATENCY_MS}ms latency")
+
+    # The scraper reads its settings at import time and writes its output relative to the working directory
+    os.environ.setdefault("HEADLESS", "1")
+    os.environ.setdefault("USERNAME", "benchmark")
+    os.environ.setdefault("PASSWORD", "benchmark")
+    os.environ["LOGIN_URL"] = f"{base_url}/login"
+    os.environ["CLIENT_LIST_URL"] = f"{base_url}/app/clients"
+    output_folder = tempfile.mkdtemp(prefix="aesthetics_pro_bench_")
+    os.chdir(output_folder)
+    import Aesthetics_Pro as scraper
+    from Aesthetics_Pro_Archive import archive_members
+
+    if BENCH_COMPARE_PROFILES:
+        try:
+            compare_session_profiles(scraper)
+        finally:
+            scraper.browser_pool.close()
+            server.shutdown()
+            os.chdir(REPO_FOLDER)
+            shutil.rmtree(output_folder, ignore_errors=True)
+        return
+
+    scraper.journal = scraper.RunJournal(scraper.JOURNAL_PATH)
+    scraper.postprocessor = scraper.PostProcessor()
+    scraper.start_trace()
+    driver = None
+
+    try:
+        driver = scraper.SupervisedDriver()
+
+        started = time.monotonic()
+        processed_count = 0
+        for letter in BENCH_LETTERS:
+            if scraper.WORKER_COUNT > 1:
+                processed_count += scraper.run_worker_pool(driver, letter, 1, scraper.WORKER_COUNT)
+            else:
+                processed_count += scraper.process_clients_for_letter(driver, letter, 1)
+        scraper.postprocessor.drain()
+        elapsed = time.monotonic() - started
+
+        saved_documents = 0
+        for folder, folders, files in os.walk(scraper.MAIN_FOLDER):
+            # Stored copies are linked into the client folders (or archives), count those only
+            folders[:] = [name for name in folders if name != os.path.basename(scraper.STORE_FOLDER)]
+            saved_documents += sum(1 for name in files if name.endswith(".pdf"))
+            for name in files:
+                if name.endswith(".zip"):
+                    saved_documents += sum(1 for member in archive_members(os.path.join(folder, name)) if member.endswith(".pdf"))
+
+        scraper.print_readiness_report()
+        scraper.print_span_report()
+        scraper.print_page_load_report()
+        scraper.print_tab_report()
+
+        hours = elapsed / 3600
+        print(f"\n{'='*60}")
+        print("BENCHMARK RESULT")
+        print(f"{'='*60}")
+        print(f"  Settings: CAPTURE_BACKEND={scraper.CAPTURE_BACKEND} FETCH_MODE={scraper.FETCH_MODE} "
+              f"WORKER_COUNT={scraper.WORKER_COUNT} DOCUMENT_TABS={scraper.DOCUMENT_TABS} latency={BENCH_LATENCY_MS}ms")
+        print(f"  Clients: {processed_count}/{len(site.clients)} in {elapsed:.1f}s")
+        print(f"  Documents: {saved_documents}/{expected_documents} saved")
+        print(f"  Throughput: {processed_count / hours:.0f} clients/hour, {saved_documents / hours:.0f} documents/hour")
+        print(f"  Server requests: {sum(site.counters.values())}")
+
+    finally:
+        if driver:
+            driver.quit()
+        scraper.browser_pool.close()
+        scraper.journal.close()
+        scraper.stop_trace()
+        server.shutdown()
+        os.chdir(REPO_FOLDER)
+        if BENCH_KEEP_OUTPUT:
+            print(f"  Output kept in: {output_folder}")
+        else:
+            shutil.rmtree(output_folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import os
+import json
+import time
+import random
+import secrets
+import threading
+
+# Stand-in for the Aesthetics Pro site: serves the HTML/JS fixtures in mock_site/ and a small JSON API
+# over a synthetic client dataset, with configurable latency. Used by Aesthetics_Pro_Benchmark.py.
+MOCK_PORT = int(os.getenv("MOCK_PORT", "8765"))
+MOCK_CLIENTS = int(os.getenv("MOCK_CLIENTS", "30"))  # Clients in the dataset, spread over MOCK_LETTERS
+MOCK_LETTERS = os.getenv("MOCK_LETTERS", "ABC")
+MOCK_MAX_RECORDS = int(os.getenv("MOCK_MAX_RECORDS", "4"))  # Electronic records per client (0..N)
+MOCK_MAX_DOCUMENTS = int(os.getenv("MOCK_MAX_DOCUMENTS", "3"))  # Documents per Treatment Records folder (1..N)
+MOCK_LATENCY_MS = int(os.getenv("MOCK_LATENCY_MS", "150"))  # Server latency of every API call
+MOCK_JITTER_MS = int(os.getenv("MOCK_JITTER_MS", "100"))
+MOCK_NOTE_RATE = float(os.getenv("MOCK_NOTE_RATE", "1.0"))  # Share of clients whose note popup opens
+MOCK_TOAST_RATE = float(os.getenv("MOCK_TOAST_RATE", "0.3"))  # Share of record forms that raise a toast
+MOCK_SEED = int(os.getenv("MOCK_SEED", "7"))
+MOCK_ASSET_KB = int(os.getenv("MOCK_ASSET_KB", "200"))  # Size of each image/font/script asset the pages pull in
+MOCK_SESSION_TTL = float(os.getenv("MOCK_SESSION_TTL", "0"))  # Seconds until a login expires (0 = never)
+
+SITE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_site")
+CONTENT_TYPES = {".html": "text/html", ".js": "application/javascript", ".css": "text/css", ".svg": "image/svg+xml"}
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Dan", "Emma", "Finn", "Grace", "Hugo", "Isla", "Jack", "Kate", "Liam", "Mia", "Noah"]
+LAST_NAME_ENDINGS = ["dams", "rown", "ole", "avis", "vans", "isher", "reen", "ill", "ngram", "ones", "ing", "ewis"]
+RECORD_NAMES = ["HRT", "HRT LABS", "BOTOX", "FILLER", "LASER", "CONSULT", "PEEL"]
+DOCUMENT_NAMES = ["Progress Note", "Treatment Record", "Consent", "Lab Order", "Before Photos", "Aftercare"]
+
+def build_dataset(client_count=MOCK_CLIENTS, letters=MOCK_LETTERS, seed=MOCK_SEED):
+    """Generate clients, their electronic records and documents deterministically"""
+    rng = random.Random(seed)
+    clients = {}
+    documents = {}
+    for number in range(client_count):
+        letter = letters[number % len(letters)]
+        client_id = str(1000 + number)
+        name = f"{letter}{rng.choice(LAST_NAME_ENDINGS)}{number}, {rng.choice(FIRST_NAMES)}"
+        records = []
+        for record_number in range(rng.randint(0, MOCK_MAX_RECORDS)):
+            record_id = f"{client_id}-{record_number + 1}"
+            title = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2019, 2024)} {rng.choice(RECORD_NAMES)}"
+            folders = {"Consents": []}
+            if rng.random() < 0.8:
+                treatment_documents = []
+                for document_number in range(rng.randint(1, MOCK_MAX_DOCUMENTS)):
+                    document_id = f"{record_id}-{document_number + 1}"
+                    document = {'id': document_id, 'name': f"{rng.choice(DOCUMENT_NAMES)} {document_number + 1}"}
+                    documents[document_id] = dict(document, client_id=client_id, record_title=title)
+                    treatment_documents.append(document)
+                folders["Treatment Records"] = treatment_documents
+            records.append({'id': record_id, 'title': title, 'folders': folders})
+        clients[client_id] = {
+            'id': client_id,
+            'name': name,
+            'letter': letter,
+            'note': f"Note for {name}" if rng.random() < MOCK_NOTE_RATE else "",
+            'records': records
+        }
+    return clients, documents
+
+def build_pdf(text):
+    """A minimal valid one-page PDF showing text"""
+    stream = f"BT /F1 18 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+class MockSite:
+    """Dataset, sessions and request counters shared by the request handlers"""
+
+    def __init__(self, client_count=MOCK_CLIENTS, letters=MOCK_LETTERS, latency_ms=MOCK_LATENCY_MS, jitter_ms=MOCK_JITTER_MS):
+        self.clients, self.documents = build_dataset(client_count, letters)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.sessions = {}  # token -> login time
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def delay(self):
+        """Simulated server time for one API call"""
+        time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+
+class MockHandler(BaseHTTPRequestHandler):
+    site = None  # Set by start_mock_server()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200, headers=None):
+        self.send_body(json.dumps(data).encode(), "application/json", status, headers)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_fixture(self, name):
+        path = os.path.join(SITE_FOLDER, name)
+        if not os.path.isfile(path):
+            self.send_body(b"Not found", "text/plain", 404)
+            return
+        with open(path, 'rb') as fixture:
+            self.send_body(fixture.read(), CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream"))
+
+    def logged_in(self):
+        cookies = dict(
+            part.strip().split("=", 1) for part in self.headers.get("Cookie", "").split(";") if "=" in part
+        )
+        logged_in_at = self.site.sessions.get(cookies.get("APSESSION"))
+        if logged_in_at is None:
+            return False
+        return not MOCK_SESSION_TTL or time.time() - logged_in_at < MOCK_SESSION_TTL
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        site = self.site
+        site.count(url.path)
+
+        if url.path in ("/", "/login"):
+            return self.send_fixture("login.html")
+        if url.path.startswith("/static/"):
+            return self.send_fixture(os.path.basename(url.path))
+        if url.path.startswith("/assets/"):
+            # Images, fonts and analytics the scraper never needs: slow and heavy on purpose
+            site.delay()
+            content_type = "application/javascript" if url.path.endswith(".js") else "application/octet-stream"
+            return self.send_body(b"/*" + b"0" * (MOCK_ASSET_KB * 1024) + b"*/", content_type)
+        if not self.logged_in():
+            if url.path.startswith("/api/"):
+                return self.send_json({'error': 'not logged in'}, 401)
+            return self.redirect("/login")
+
+        if url.path == "/app/clients":
+            return self.send_fixture("app.html")
+
+        if url.path == "/api/clients":
+            site.delay()
+            letter = query.get("letter", "")
+            rows = [
+                {'id': client['id'], 'name': client['name']}
+                for client in site.clients.values() if client['name'].upper().startswith(letter)
+            ]
+            return self.send_json(sorted(rows, key=lambda row: row['name']))
+
+        if url.path == "/api/client":
+            site.delay()
+            client = site.clients.get(query.get("id"))
+            if not client:
+                return self.send_json({'error': 'unknown client'}, 404)
+            return self.send_json({'id': client['id'], 'name': client['name'], 'note': client['note']})
+
+        if url.path == "/api/records":
+            site.delay()
+            client = site.clients.get(query.get("client"))
+            if not client:
+                return self.send_json({'error': 'unknown client'}, 404)
+            return self.send_json(client['records'])
+
+        if url.path == "/api/form":
+            site.delay()
+            document = site.documents.get(query.get("doc"))
+            if not document:
+                return self.send_json({'error': 'unknown document'}, 404)
+            return self.send_json(dict(document, toast=random.random() < MOCK_TOAST_RATE))
+
+        if url.path == "/clients/electronic_records/emailDownloadERC.cfm":
+            site.delay()
+            document = site.documents.get(query.get("formid"))
+            if not document:
+                return self.send_body(b"<html>Unknown form</html>", "text/html", 404)
+            site.count("pdf_downloads")
+            pdf = build_pdf(f"{document['record_title']} - {document['name']} - client {document['client_id']}")
+            return self.send_body(pdf, "application/pdf")
+
+        self.send_body(b"Not found", "text/plain", 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.site.count(url.path)
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        if url.path == "/api/login":
+            self.site.delay()
+            token = secrets.token_hex(16)
+            with self.site.lock:
+                self.site.sessions[token] = time.time()
+            return self.send_json({'ok': True}, headers={"Set-Cookie": f"APSESSION={token}; Path=/; HttpOnly"})
+        self.send_body(b"Not found", "text/plain", 404)
+
+def start_mock_server(port=MOCK_PORT, client_count=MOCK_CLIENTS, letters=MOCK_LETTERS, latency_ms=MOCK_LATENCY_MS):
+    """Start the mock site on a background thread. Returns (server, site)"""
+    site = MockSite(client_count, letters, latency_ms)
+    handler = type("BoundMockHandler", (MockHandler,), {'site': site})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-site", daemon=True).start()
+    return server, site
+
+def main():
+    server, site = start_mock_server()
+    document_count = len(site.documents)
+    print(f"Mock Aesthetics Pro site on http://127.0.0.1:{MOCK_PORT}/login")
+    print(f"  {len(site.clients)} clients ({MOCK_LETTERS}), {document_count} treatment record documents, "
+          f"{MOCK_LATENCY_MS}ms latency (+{MOCK_JITTER_MS}ms jitter)")
+    print(f"  Point the scraper at it with LOGIN_URL=http://127.0.0.1:{MOCK_PORT}/login "
+          f"CLIENT_LIST_URL=http://127.0.0.1:{MOCK_PORT}/app/clients")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping mock site...")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
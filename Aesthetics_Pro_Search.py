@@ -0,0 +1,309 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+import re
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+import zipfile
+from Aesthetics_Pro_Archive import open_document, split_document_path, archive_members
+
+# PyPDF gives the best text; without it only the literal strings of simple PDFs are read
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Full-text index over the saved treatment record PDFs: text is extracted on a process pool and stored once per
+# content hash in a SQLite FTS5 table, next to the client, record date, record type and file name of every copy.
+#   python Aesthetics_Pro_Search.py index          index every PDF under Aesthetics Pro/ that is not indexed yet
+#   python Aesthetics_Pro_Search.py botox consent  search (SEARCH_CLIENT and SEARCH_LIMIT narrow the results)
+# The scraper imports its output folder and file locations from here (this module cannot import the scraper back)
+MAIN_FOLDER = "Aesthetics Pro"
+INDEX_PATH = os.path.join(MAIN_FOLDER, "search_index.sqlite3")
+JOURNAL_PATH = os.path.join(MAIN_FOLDER, "run_journal.sqlite3")
+EXTRACT_WORKERS = max(0, int(os.getenv("EXTRACT_WORKERS", "2")))  # 0 turns extraction off during scraping
+SEARCH_CLIENT = os.getenv("SEARCH_CLIENT", "")
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "50"))
+
+# YYYY-MM-DD_RecordName FileName_Treatment_Records_ClientName.pdf inside "Client Name - ID/"
+SAVED_PDF_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2}|[^_]*)_(.*)_Treatment_Records_(.*)\.pdf$", re.S)
+STREAM_PATTERN = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+TEXT_OPERATOR_PATTERN = re.compile(rb"\(((?:\\.|[^\\)])*)\)\s*Tj|\[((?:\\.|[^\]])*)\]\s*TJ", re.S)
+LITERAL_PATTERN = re.compile(rb"\(((?:\\.|[^\\)])*)\)", re.S)
+LITERAL_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+def unescape_literal(literal):
+    return re.sub(rb"\\(.)", lambda match: LITERAL_ESCAPES.get(match.group(1), match.group(1)), literal, flags=re.S)
+
+def extract_literal_text(pdf_bytes):
+    """Text shown by the Tj/TJ operators of a PDF's content streams (plain or Flate compressed)"""
+    lines = []
+    for stream in STREAM_PATTERN.findall(pdf_bytes):
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for shown, array in TEXT_OPERATOR_PATTERN.findall(stream):
+            parts = [shown] if shown else LITERAL_PATTERN.findall(array)
+            lines.append(b"".join(unescape_literal(part) for part in parts).decode("latin-1"))
+    return "\n".join(line for line in lines if line.strip())
+
+def extract_pdf_text(path, pdf_bytes=None):
+    """Return (text, page count) of a PDF file or archive member. Runs in the extraction worker processes.
+    pdf_bytes is the content when the caller already read it"""
+    if pdf_bytes is None:
+        with open_document(path) as pdf_file:
+            pdf_bytes = pdf_file.read()
+    if PdfReader:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        pages = [page.extract_text() or "" for page in reader.pages]
+        return "\n".join(pages), len(pages)
+    return extract_literal_text(pdf_bytes), len(re.findall(rb"/Type\s*/Page(?![A-Za-z])", pdf_bytes))
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open_document(path) as pdf_file:
+        for chunk in iter(lambda: pdf_file.read(256 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def fields_from_path(path, file_name=None):
+    """Client, record date, record type and file name of a saved PDF, parsed back from its folder (or archive) and filename.
+    The filename joins the record name and the file name with a space, so the two are only split when file_name is known;
+    otherwise the whole "RecordName FileName" is returned as the file name"""
+    archive_path, member = split_document_path(path)
+    if member is None:
+        folder_name, saved_name = os.path.basename(os.path.dirname(path)), os.path.basename(path)
+    else:
+        folder_name, saved_name = os.path.splitext(os.path.basename(archive_path))[0], member
+    client_name, _, client_id = folder_name.rpartition(" - ")
+    match = SAVED_PDF_PATTERN.match(saved_name)
+    record_date, names = (match.group(1), match.group(2)) if match else ("", "")
+    if file_name and names.endswith(" " + file_name):
+        record_type = names[:-len(file_name) - 1]
+    else:
+        record_type, file_name = "", names
+    return {
+        'client_name': client_name or folder_name,
+        'client_id': client_id,
+        'record_date': record_date,
+        'record_type': record_type,
+        'file_name': file_name
+    }
+
+def absolute_path(path):
+    archive_path, member = split_document_path(path)
+    return os.path.abspath(path) if member is None else path.replace(archive_path, os.path.abspath(archive_path), 1)
+
+def journal_file_names(path=JOURNAL_PATH):
+    """File name of every document the scraper's run journal recorded, by absolute saved path"""
+    if not os.path.exists(path):
+        return {}
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {absolute_path(saved_path): file_name for saved_path, file_name in
+                connection.execute("SELECT path, file_name FROM documents WHERE path IS NOT NULL")}
+    except sqlite3.Error:
+        return {}
+    finally:
+        connection.close()
+
+class TextIndexer:
+    """SQLite FTS5 index fed by a process pool. add() returns at once; text of content already indexed is not extracted again"""
+
+    def __init__(self, path=INDEX_PATH, worker_count=EXTRACT_WORKERS):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS pdf_files (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT,
+                client_name TEXT,
+                client_id TEXT,
+                record_date TEXT,
+                record_type TEXT,
+                file_name TEXT,
+                indexed_at REAL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS pdf_files_by_sha256 ON pdf_files (sha256);
+            CREATE TABLE IF NOT EXISTS pdf_contents (
+                sha256 TEXT PRIMARY KEY,
+                pages INTEGER,
+                error TEXT,
+                extracted_at REAL,
+                text_rowid INTEGER
+            ) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE IF NOT EXISTS pdf_text USING fts5(sha256 UNINDEXED, text);
+        """)
+        # Older indexes do not keep the pdf_text rowid of each content
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(pdf_contents)")]
+        if "text_rowid" not in columns:
+            self.connection.execute("ALTER TABLE pdf_contents ADD COLUMN text_rowid INTEGER")
+        # Spawned, not forked: the scraper process has browser and post-processing threads running
+        self.pool = ProcessPoolExecutor(max_workers=max(1, worker_count), mp_context=multiprocessing.get_context("spawn"))
+        self.in_flight = set()  # Hashes being extracted right now
+        self.slots = threading.BoundedSemaphore(max(1, worker_count) * 4)  # Bounds the extraction backlog
+        self.extracted = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def add(self, path, sha256=None, **fields):
+        """Record a saved PDF (a file or an archive member) and queue its text for extraction unless that content is already indexed"""
+        sha256 = sha256 or file_sha256(path)
+        row = dict(fields_from_path(path, fields.get('file_name')), **{key: value for key, value in fields.items() if value})
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pdf_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (absolute_path(path), sha256, row['client_name'], row['client_id'], row['record_date'],
+                 row['record_type'], row['file_name'], time.time())
+            )
+            known = self.connection.execute("SELECT 1 FROM pdf_contents WHERE sha256 = ? AND error IS NULL", (sha256,)).fetchone()
+            if known or sha256 in self.in_flight:
+                self.skipped += 1
+                return False
+            self.in_flight.add(sha256)
+
+        self.slots.acquire()
+        try:
+            # Archives are appended to in place under a lock this process holds, so members are read here, not by the workers
+            pdf_bytes = None
+            if split_document_path(path)[1] is not None:
+                with open_document(path) as pdf_file:
+                    pdf_bytes = pdf_file.read()
+            future = self.pool.submit(extract_pdf_text, absolute_path(path), pdf_bytes)
+        except Exception:
+            self.slots.release()
+            with self.lock:
+                self.in_flight.discard(sha256)
+            raise
+        future.add_done_callback(lambda done: self.store_text(sha256, done))
+        return True
+
+    def store_text(self, sha256, future):
+        """Write one extraction result. Runs on the pool's result thread.
+        A failed extraction only records its error, so the next add() or index run tries that content again.
+        pdf_contents keeps the pdf_text rowid of each content (0 for none), so earlier text is replaced by rowid:
+        a lookup on the UNINDEXED sha256 column would scan the whole text table"""
+        try:
+            text, pages, error = "", 0, None
+            try:
+                text, pages = future.result()
+            except Exception as e:
+                error = str(e)
+                print(f"       [index] Could not extract text: {e}")
+            with self.lock:
+                self.connection.execute("BEGIN")
+                previous = self.connection.execute("SELECT text_rowid FROM pdf_contents WHERE sha256 = ?", (sha256,)).fetchone()
+                if previous and previous[0]:
+                    self.connection.execute("DELETE FROM pdf_text WHERE rowid = ?", (previous[0],))
+                elif previous and previous[0] is None:
+                    # Written by an older version that did not keep the rowid
+                    self.connection.execute("DELETE FROM pdf_text WHERE sha256 = ?", (sha256,))
+                text_rowid = 0
+                if error is None:
+                    text_rowid = self.connection.execute("INSERT INTO pdf_text VALUES (?, ?)", (sha256, text)).lastrowid
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pdf_contents VALUES (?, ?, ?, ?, ?)", (sha256, pages, error, time.time(), text_rowid)
+                )
+                self.connection.execute("COMMIT")
+                self.in_flight.discard(sha256)
+                if error:
+                    self.failures += 1
+                else:
+                    self.extracted += 1
+        finally:
+            self.slots.release()
+
+    def index_folder(self, folder=MAIN_FOLDER, journal_path=JOURNAL_PATH):
+        """Add every saved PDF and client archive member under folder (the content store itself excluded).
+        File names come from the run journal where it has the document, so the record type can be split off"""
+        file_names = journal_file_names(journal_path)
+        # Only files whose text was extracted count as indexed; failed extractions are retried
+        with self.lock:
+            indexed_at = dict(self.connection.execute("""
+                SELECT f.path, f.indexed_at FROM pdf_files f JOIN pdf_contents c ON c.sha256 = f.sha256
+                WHERE c.error IS NULL
+            """))
+        for current, folders, files in os.walk(folder):
+            folders[:] = [name for name in folders if not name.startswith(".")]
+            for name in files:
+                path = os.path.join(current, name)
+                if name.endswith(".zip"):
+                    try:
+                        documents = [member for member in archive_members(path) if member.endswith(".pdf")]
+                    except zipfile.BadZipFile:
+                        print(f"Skipping damaged archive {path}")
+                        continue
+                elif name.endswith(".pdf"):
+                    documents = [path]
+                else:
+                    continue
+                # Files (and archives) unchanged since they were indexed are skipped without hashing them again
+                modified_at = os.path.getmtime(path)
+                for document in documents:
+                    if indexed_at.get(absolute_path(document), 0) >= modified_at:
+                        self.skipped += 1
+                        continue
+                    self.add(document, file_name=file_names.get(absolute_path(document)))
+
+    def close(self):
+        """Wait for the queued extractions and close the index"""
+        self.pool.shutdown(wait=True)
+        with self.lock:
+            self.connection.close()
+        print(f"Text index: {self.extracted} PDFs extracted, {self.skipped} already indexed, {self.failures} failed")
+
+def search(term, client=SEARCH_CLIENT, limit=SEARCH_LIMIT, path=INDEX_PATH):
+    """Full-text search of the index. Returns dicts with the matching file, its fields and a snippet"""
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute("""
+            SELECT f.path, f.client_name, f.client_id, f.record_date, f.record_type, f.file_name,
+                   snippet(pdf_text, 1, '[', ']', '...', 12)
+            FROM pdf_text JOIN pdf_files f ON f.sha256 = pdf_text.sha256
+            WHERE pdf_text MATCH ? AND (? = '' OR f.client_name LIKE ? OR f.client_id = ?)
+            ORDER BY pdf_text.rank, f.record_date DESC
+            LIMIT ?
+        """, (term, client, f"%{client}%", client, limit)).fetchall()
+    finally:
+        connection.close()
+    columns = ('path', 'client_name', 'client_id', 'record_date', 'record_type', 'file_name', 'snippet')
+    return [dict(zip(columns, row)) for row in rows]
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python Aesthetics_Pro_Search.py index | <search terms>")
+        return
+    if not os.path.exists(MAIN_FOLDER):
+        print(f"No {MAIN_FOLDER} folder here: run the scraper first")
+        return
+
+    if sys.argv[1:] == ["index"]:
+        started = time.monotonic()
+        indexer = TextIndexer()
+        indexer.index_folder()
+        indexer.close()
+        print(f"Indexed in {time.monotonic() - started:.1f}s")
+        return
+
+    term = " ".join(sys.argv[1:])
+    started = time.monotonic()
+    results = search(term)
+    elapsed_ms = (time.monotonic() - started) * 1000
+    for result in results:
+        names = " ".join(name for name in (result['record_type'], result['file_name']) if name)
+        print(f"{result['record_date']}  {result['client_name']} ({result['client_id']})  {names}".rstrip())
+        print(f"    {' '.join(result['snippet'].split())}")
+        print(f"    {result['path']}")
+    print(f"\n{len(results)} results for '{term}' in {elapsed_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
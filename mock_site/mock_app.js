@@ -0,0 +1,216 @@
+// Behaviour of the mock Aesthetics Pro app: client list, client profile, Electronic Records tree and
+// record forms. Element IDs and function names follow the real site as used by Aesthetics_Pro.py.
+var LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+var currentClient = null;
+var clientTable = null;
+
+function spinner(visible) {
+    document.getElementById('spinnerapplayout').style.display = visible ? 'block' : 'none';
+}
+
+function api(path) {
+    spinner(true);
+    return fetch(path, {credentials: 'same-origin'}).then(function (response) {
+        spinner(false);
+        if (response.status === 401) {
+            window.location = '/login';
+            throw new Error('Logged out');
+        }
+        return response.json();
+    });
+}
+
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, function (c) {
+        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+    });
+}
+
+// ---- Client list ----
+
+function renderClientRows(table) {
+    var body = document.getElementById('tblClientLeadListBody');
+    var rows = table.pageRows();
+    if (!rows.length) {
+        body.innerHTML = '<tr><td class="dataTables_empty">No matching records found</td></tr>';
+    } else {
+        body.innerHTML = rows.map(function (row) {
+            return '<tr><td class="clientName"><a href="#" onclick="clientdetails(\'' + row.id + '\'); return false;">' +
+                escapeHtml(row.name) + '</a></td></tr>';
+        }).join('');
+    }
+
+    var info = table.page.info();
+    var pager = '<a id="clientlistTableBody_previous" class="paginate_button previous' + (info.page === 0 ? ' disabled' : '') +
+        '" onclick="goToPage(\'previous\')">Previous</a>';
+    for (var i = 0; i < info.pages; i++) {
+        pager += '<a class="paginate_button' + (i === info.page ? ' current' : '') + '" onclick="goToPage(' + i + ')">' + (i + 1) + '</a>';
+    }
+    pager += '<a id="clientlistTableBody_next" class="paginate_button next' + (info.page + 1 >= info.pages ? ' disabled' : '') +
+        '" onclick="goToPage(\'next\')">Next</a>';
+    document.getElementById('clientlistTableBody_paginate').innerHTML = pager;
+}
+
+function goToPage(action) {
+    spinner(true);
+    setTimeout(function () {
+        spinner(false);
+        clientTable.page(action).draw('page');
+    }, 50);
+}
+
+function loadLetter(letter) {
+    document.getElementById('tblClientLeadListBody').innerHTML = '<tr><td class="dataTables_empty">Loading...</td></tr>';
+    api('/api/clients?letter=' + encodeURIComponent(letter)).then(function (rows) {
+        clientTable.setRows(rows).draw();
+    });
+}
+
+function showClientList() {
+    document.getElementById('clientsMenu').className = 'submenu';
+    document.getElementById('clientView').style.display = 'none';
+    document.getElementById('clientListView').style.display = 'block';
+    closeSlide();
+    loadLetter('A');
+}
+
+function toggleClientsMenu() {
+    var menu = document.getElementById('clientsMenu');
+    menu.className = menu.className.indexOf('open') === -1 ? 'submenu open' : 'submenu';
+}
+
+// ---- Client profile ----
+
+function clientdetails(clientId) {
+    closeSlide();
+    return api('/api/client?id=' + encodeURIComponent(clientId)).then(function (client) {
+        currentClient = client;
+        document.getElementById('clientListView').style.display = 'none';
+        document.getElementById('clientView').style.display = 'block';
+        document.getElementById('clientProfileInfoDiv').innerHTML =
+            '<h5>' + escapeHtml(client.name) + '</h5><p>ID: ' + escapeHtml(client.id) + '</p>';
+        document.getElementById('clientTabContent').innerHTML = '<p>Profile details</p>';
+        if (client.note) {
+            // The note pops up a moment after the profile renders, like the real site
+            setTimeout(function () {
+                document.getElementById('clientNoteText').textContent = client.note;
+                document.getElementById('clientnotepop').style.display = 'block';
+            }, 300);
+        }
+    });
+}
+
+function closeClientNote() {
+    document.getElementById('clientnotepop').style.display = 'none';
+}
+
+function changeClientTab(tab) {
+    var content = document.getElementById('clientTabContent');
+    if (tab !== 2) {
+        content.innerHTML = '<p>Profile details</p>';
+        return;
+    }
+    content.innerHTML = '';
+    api('/api/records?client=' + encodeURIComponent(currentClient.id)).then(function (records) {
+        content.innerHTML = '<ul id="erTree">' + records.map(renderParentRecord).join('') + '</ul>';
+    });
+}
+
+// ---- Electronic Records tree ----
+
+function renderParentRecord(record) {
+    var folders = '';
+    for (var name in record.folders) {
+        folders += '<li><span class="caret"><a href="#" onclick="toggleFolder(this, \'' + record.id + '\', \'' + name + '\'); return false;">' +
+            escapeHtml(name) + '</a></span><ul class="nested sub-nested"></ul></li>';
+    }
+    return '<li class="parentrec" id="rec_' + record.id + '" data-record="' + escapeHtml(JSON.stringify(record)) + '">' +
+        '<span class="caret parentcaret"><a href="#" onclick="toggleRecord(this); return false;">' + escapeHtml(record.title) + '</a></span>' +
+        '<ul class="nested">' + folders + '</ul></li>';
+}
+
+function toggleRecord(link) {
+    var caret = link.parentNode;
+    var nested = caret.parentNode.querySelector('ul.nested');
+    var open = caret.className.indexOf('caret-down') === -1;
+    caret.className = open ? 'caret parentcaret caret-down' : 'caret parentcaret';
+    nested.className = open ? 'nested active' : 'nested';
+}
+
+function toggleFolder(link, recordId, folderName) {
+    var caret = link.parentNode;
+    var nested = caret.parentNode.querySelector('ul.sub-nested');
+    if (caret.className.indexOf('caret-down') !== -1) {
+        caret.className = 'caret';
+        nested.className = 'nested sub-nested';
+        return;
+    }
+    // Folder contents load lazily; the caret turns down once they are in
+    var record = JSON.parse(document.getElementById('rec_' + recordId).getAttribute('data-record'));
+    spinner(true);
+    setTimeout(function () {
+        spinner(false);
+        nested.innerHTML = record.folders[folderName].map(function (doc) {
+            return '<li id="' + doc.id + '_doc"><div class="slide"><a href="#" onclick="launchERForm(\'' + doc.id + '\', \'' +
+                currentClient.id + '\', \'' + recordId + '\'); return false;"><i class="fa-file"></i><span class="treetextitem">' +
+                escapeHtml(doc.name) + '</span></a></div></li>';
+        }).join('');
+        nested.className = 'nested sub-nested active';
+        caret.className = 'caret caret-down';
+    }, 150);
+}
+
+// ---- Record forms ----
+
+function launchERForm(documentId, clientId, recordId) {
+    var slide = document.getElementById('customSlide');
+    slide.innerHTML = '<p>Loading form...</p>';
+    slide.style.display = 'block';
+    api('/api/form?doc=' + encodeURIComponent(documentId)).then(function (form) {
+        slide.innerHTML =
+            '<div class="closeCustomSlide nav-customclose" onclick="closeSlide()"><img src="/static/menu-close.svg"></div>' +
+            '<div class="er_icons">' +
+            '<div onclick="emailDownloadERC(\'' + documentId + '\')">Email/Download</div>' +
+            '<div onclick="refreshFormERC(\'' + documentId + '\')">Refresh Form</div>' +
+            '</div>' +
+            '<div id="printslide"><button id="printKey" onclick="runPrint()">Print</button></div>' +
+            '<div class="erform"><h3>' + escapeHtml(form.record_title) + '</h3><h4>' + escapeHtml(form.name) + '</h4>' +
+            '<p>Client ' + escapeHtml(clientId) + ', record ' + escapeHtml(recordId) + '</p></div>';
+        if (form.toast) { showToast('Form ' + form.name + ' loaded'); }
+    });
+}
+
+function runPrint() {
+    window.print();
+}
+
+function emailDownloadERC(documentId) {
+    window.open('/clients/electronic_records/emailDownloadERC.cfm?formid=' + encodeURIComponent(documentId) + '&download=1');
+}
+
+function refreshFormERC(documentId) {
+    launchERForm(documentId, currentClient.id, '');
+}
+
+function closeSlide() {
+    var slide = document.getElementById('customSlide');
+    if (!slide) { return; }
+    slide.innerHTML = '';
+    slide.style.display = 'none';
+}
+
+function showToast(message) {
+    var container = document.getElementById('toastContainer');
+    container.innerHTML = '<div class="d-flex"><div class="toast"><div class="toast-body">' + escapeHtml(message) + '</div></div></div>';
+    setTimeout(function () { container.innerHTML = ''; }, 4000);
+}
+
+// ---- Start up ----
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelector('.sortingRow').innerHTML = LETTERS.split('').map(function (letter) {
+        return '<a href="#" onclick="loadLetter(\'' + letter + '\'); return false;">' + letter + '</a>';
+    }).join('');
+    clientTable = jQuery('#tblClientLeadListBody').closest('table').DataTable({render: renderClientRows});
+    loadLetter('A');
+});
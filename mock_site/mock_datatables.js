@@ -0,0 +1,110 @@
+// Minimal stand-in for the parts of jQuery and DataTables the scraper talks to:
+// jQuery(document).on('draw.dt', fn), jQuery(selector).closest('table').DataTable(),
+// and the DataTables page API (page.info(), page.len(), page('next'), draw()).
+(function () {
+    var handlers = {};
+    var tables = [];
+
+    function DataTableApi(table, render) {
+        var api = this;
+        this.table = table;
+        this.rows = [];
+        this.start = 0;
+        this.length = 25;
+        this.render = render;
+
+        var page = function (action) {
+            var info = api.page.info();
+            if (action === 'next' && info.page + 1 < info.pages) { api.start += api.length; }
+            else if (action === 'previous' && info.page > 0) { api.start -= api.length; }
+            else if (action === 'first') { api.start = 0; }
+            else if (action === 'last') { api.start = (info.pages - 1) * api.length; }
+            else if (typeof action === 'number') { api.start = action * api.length; }
+            return api;
+        };
+        page.info = function () {
+            var length = api.length === -1 ? Math.max(api.rows.length, 1) : api.length;
+            return {
+                page: Math.floor(api.start / length),
+                pages: Math.max(1, Math.ceil(api.rows.length / length)),
+                start: api.start,
+                end: Math.min(api.start + length, api.rows.length),
+                length: api.length,
+                recordsTotal: api.rows.length,
+                recordsDisplay: api.rows.length
+            };
+        };
+        page.len = function (length) {
+            if (length === undefined) { return api.length; }
+            api.length = length;
+            api.start = 0;
+            return api;
+        };
+        this.page = page;
+    }
+
+    DataTableApi.prototype.setRows = function (rows) {
+        this.rows = rows;
+        this.start = 0;
+        return this;
+    };
+
+    DataTableApi.prototype.pageRows = function () {
+        if (this.length === -1) { return this.rows.slice(); }
+        return this.rows.slice(this.start, this.start + this.length);
+    };
+
+    DataTableApi.prototype.draw = function () {
+        this.render(this);
+        trigger('draw.dt');
+        return this;
+    };
+
+    function trigger(event) {
+        var list = handlers[event] || [];
+        for (var i = 0; i < list.length; i++) {
+            try { list[i]({type: event}); } catch (e) {}
+        }
+    }
+
+    function Selection(elements) {
+        this.elements = elements;
+        this.length = elements.length;
+    }
+
+    Selection.prototype.closest = function (selector) {
+        var found = [];
+        for (var i = 0; i < this.elements.length; i++) {
+            var match = this.elements[i].closest ? this.elements[i].closest(selector) : null;
+            if (match) { found.push(match); }
+        }
+        return new Selection(found);
+    };
+
+    Selection.prototype.on = function (event, handler) {
+        (handlers[event] = handlers[event] || []).push(handler);
+        return this;
+    };
+
+    Selection.prototype.DataTable = function (options) {
+        var table = this.elements[0];
+        if (!table) { throw new Error('No table selected'); }
+        for (var i = 0; i < tables.length; i++) {
+            if (tables[i].table === table) { return tables[i]; }
+        }
+        var api = new DataTableApi(table, (options && options.render) || function () {});
+        tables.push(api);
+        return api;
+    };
+
+    var jQuery = function (selector) {
+        if (typeof selector === 'string') {
+            return new Selection(Array.prototype.slice.call(document.querySelectorAll(selector)));
+        }
+        return new Selection(selector ? [selector] : []);
+    };
+    jQuery.fn = Selection.prototype;
+    jQuery.fn.dataTable = DataTableApi;
+
+    window.jQuery = window.$ = jQuery;
+})();
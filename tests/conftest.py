@@ -0,0 +1,41 @@
+import os
+import sys
+import socket
+import importlib
+
+import pytest
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_FOLDER)
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+# The scraper reads its settings at import time, so the mock site's port is fixed before it is imported
+MOCK_TEST_PORT = free_port()
+
+@pytest.fixture(scope="session")
+def scraper(tmp_path_factory):
+    """Aesthetics_Pro imported with test settings, writing its output under a temporary folder"""
+    os.environ.setdefault("USERNAME", "test")
+    os.environ.setdefault("PASSWORD", "test")
+    os.environ["HEADLESS"] = "1"
+    os.environ["LOGIN_URL"] = f"http://127.0.0.1:{MOCK_TEST_PORT}/login"
+    os.environ["CLIENT_LIST_URL"] = f"http://127.0.0.1:{MOCK_TEST_PORT}/app/clients"
+    previous_folder = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("output"))
+    try:
+        yield importlib.import_module("Aesthetics_Pro")
+    finally:
+        os.chdir(previous_folder)
+
+@pytest.fixture(scope="session")
+def mock_site():
+    """The mock site on MOCK_TEST_PORT with a small dataset and no latency. Yields (base URL, site)"""
+    import Aesthetics_Pro_Mock as mock
+    server, site = mock.start_mock_server(MOCK_TEST_PORT, client_count=6, letters="AB", latency_ms=0)
+    site.jitter_ms = 0
+    yield f"http://127.0.0.1:{MOCK_TEST_PORT}", site
+    server.shutdown()
@@ -0,0 +1,85 @@
+import os
+import zipfile
+
+import pytest
+
+from Aesthetics_Pro_Archive import ClientArchive, archive_members, document_exists, open_document, read_manifest
+from Aesthetics_Pro_Mock import build_pdf
+
+@pytest.fixture
+def source_pdf(tmp_path):
+    path = tmp_path / "incoming.pdf"
+    path.write_bytes(build_pdf("archived"))
+    return str(path)
+
+def test_add_versions_repeated_names(tmp_path, source_pdf):
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    paths = [archive.add(source_pdf, "Consent.pdf", {'record_title': "06/08/2023 HRT"}) for _ in range(3)]
+    assert [path.rpartition("::")[2] for path in paths] == ["Consent.pdf", "Consent-2.pdf", "Consent-3.pdf"]
+    assert all(document_exists(path) for path in paths)
+    assert not document_exists(archive.path + "::Missing.pdf")
+    with open_document(paths[1]) as document:
+        assert document.read() == build_pdf("archived")
+
+def test_manifest_versions(tmp_path, source_pdf):
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    archive.add(source_pdf, "Consent.pdf", {'file_name': "Consent"})
+    assert archive.write_manifest() == "manifest/0001.json"
+    assert archive.write_manifest() is None  # Nothing changed since the last manifest
+
+    archive.add(source_pdf, "Progress Note.pdf")
+    assert archive.write_manifest() == "manifest/0002.json"
+    manifest = read_manifest(archive.path)
+    assert (manifest['version'], manifest['document_count']) == (2, 2)
+    assert manifest['documents'][0]['file_name'] == "Consent"
+    assert len(archive_members(archive.path)) == 2
+
+def test_read_manifest_without_one(tmp_path, source_pdf):
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    archive.add(source_pdf, "Consent.pdf", {'sha256': "abc"})
+    manifest = read_manifest(archive.path)
+    assert (manifest['version'], manifest['document_count']) == (0, 1)
+    assert manifest['documents'][0]['sha256'] == "abc"
+
+def test_failed_change_is_rolled_back(tmp_path, source_pdf):
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    archive.add(source_pdf, "Consent.pdf")
+    with open(archive.path, 'rb') as before:
+        original = before.read()
+
+    with pytest.raises(RuntimeError):
+        with archive.lock, archive.appending(zipfile.ZIP_STORED) as appended:
+            appended.writestr("Half written.pdf", b"%PDF-")
+            raise RuntimeError("crashed mid-write")
+
+    with open(archive.path, 'rb') as after:
+        assert after.read() == original
+    assert sorted(os.listdir(tmp_path)) == ["Doe, Jane - 1000.zip", "incoming.pdf"]
+
+def test_crash_mid_append_is_recovered(tmp_path, source_pdf):
+    """A rollback file left by a crash is applied on the next access: the half-written member is cut off"""
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    first = archive.add(source_pdf, "Consent.pdf")
+    with archive.lock:
+        archive.save_rollback()
+    with open(archive.path, 'rb+') as archive_file:
+        archive_file.seek(-22, os.SEEK_END)  # Overwrite the end record like a member that never finished
+        archive_file.write(b"PK\x03\x04 half written")
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(archive.path)
+
+    assert document_exists(first)
+    assert not os.path.exists(archive.path + ".rollback")
+    second = archive.add(source_pdf, "Progress Note.pdf")
+    assert [path.rpartition("::")[2] for path in archive_members(archive.path)] == ["Consent.pdf", "Progress Note.pdf"]
+    with open_document(second) as document:
+        assert document.read() == build_pdf("archived")
+
+def test_crash_while_creating_the_archive_removes_it(tmp_path):
+    archive = ClientArchive(str(tmp_path / "Doe, Jane - 1000.zip"))
+    with archive.lock:
+        archive.save_rollback()
+    with open(archive.path, 'wb') as archive_file:
+        archive_file.write(b"PK\x03\x04")
+    assert not document_exists(archive.path + "::Consent.pdf")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,14 @@
+def test_processed_client_log_is_created_on_first_record(scraper, tmp_path):
+    path = tmp_path / "processed_clients.csv"
+    client_log = scraper.ProcessedClientLog(str(path), "csv", batch_size=10)
+    client_log.flush()
+    assert not path.exists()
+
+    record = scraper.ClientLogRecord("D", 1, 1, 1, "Doe, Jane", "Doe, Jane", "1000", "Doe, Jane - 1000",
+                                     True, True, True, ("06/08/2023 HRT",), "2023-06-08 10:00:00")
+    client_log.append(record)
+    client_log.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == ",".join(scraper.CLIENT_LOG_COLUMNS)
+    assert len(lines) == 2
+    assert (client_log.total, client_log.modal_count, client_log.letter_counts) == (1, 1, {"D": 1})
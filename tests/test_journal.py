@@ -0,0 +1,51 @@
+def test_client_key_prefers_the_client_id(scraper):
+    assert scraper.client_key("Doe, Jane", "clientdetails('1234','Doe, Jane')") == "id:1234"
+    assert scraper.client_key("Doe, Jane", "") == "name:Doe, Jane"
+
+def test_finished_clients_and_documents(scraper, tmp_path):
+    journal = scraper.RunJournal(str(tmp_path / "journal.sqlite3"))
+    try:
+        journal.mark_document_done("1000", "06/08/2023 HRT", "Consent", "a.pdf")
+        assert journal.saved_document("1000", "06/08/2023 HRT", "Consent") == ("a.pdf", None)
+        journal.mark_client_done("id:1000", "1000", "Doe, Jane", "D", 1)
+        assert journal.is_client_done("id:1000")
+        assert not journal.is_client_done("id:1000", since=journal.started + 3600)
+        assert not journal.is_client_done("id:1001")
+
+        journal.forget_documents([("1000", "06/08/2023 HRT", "Consent")])
+        assert journal.saved_document("1000", "06/08/2023 HRT", "Consent") is None
+        assert not journal.is_client_done("id:1000")
+    finally:
+        journal.close()
+
+def test_journal_survives_a_restart(scraper, tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = scraper.RunJournal(path)
+    journal.mark_client_done("id:1000", "1000", "Doe, Jane", "D", 1)
+    journal.close()
+    journal = scraper.RunJournal(path)
+    try:
+        assert journal.is_client_done("id:1000")
+    finally:
+        journal.close()
+
+def test_changes_are_logged_as_new_resaved_or_changed(scraper, tmp_path):
+    journal = scraper.RunJournal(str(tmp_path / "journal.sqlite3"))
+    try:
+        journal.mark_document_done("1000", "06/08/2023 HRT", "Consent", "a.pdf", ref="1")
+        journal.mark_document_done("1000", "06/08/2023 HRT", "Consent", "a.pdf", ref="1")
+        journal.mark_document_done("1000", "06/08/2023 HRT", "Consent", "a-2.pdf", ref="2")
+        assert journal.saved_document("1000", "06/08/2023 HRT", "Consent") == ("a-2.pdf", "2")
+        assert [row[3] for row in journal.changes_since(0)] == ["new", "resaved", "changed"]
+        journal.mark_records_synced("1000", ["06/08/2023 HRT"])
+        assert journal.synced_records("1000") == {"06/08/2023 HRT"}
+    finally:
+        journal.close()
+
+def test_record_needs_sync(scraper, monkeypatch):
+    monkeypatch.setattr(scraper, "DELTA_RECHECK_DAYS", 14)
+    recent = scraper.datetime.now().strftime("%m/%d/%Y") + " HRT"
+    synced = {"01/02/2020 PEEL", recent}
+    assert scraper.record_needs_sync(scraper.ParentRecord(0, "03/04/2021 BOTOX", False), synced)
+    assert not scraper.record_needs_sync(scraper.ParentRecord(1, "01/02/2020 PEEL", False), synced)
+    assert scraper.record_needs_sync(scraper.ParentRecord(2, recent, False), synced)
@@ -0,0 +1,47 @@
+import pytest
+from lxml import html as lxml_html
+
+RECORD_HTML = """
+<li class="parentrec" id="rec_1000-1">
+  <span class="caret parentcaret caret-down"><a href="#" onclick="toggleRecord(this); return false;">06/08/2023 HRT LABS</a></span>
+  <ul class="nested active">
+    <li><span class="caret"><a href="#">Consents</a></span><ul class="nested sub-nested"></ul></li>
+    <li><span class="caret caret-down"><a href="#">Treatment Records</a></span>
+      <ul class="nested sub-nested active">
+        <li id="1000-1-1_doc"><div class="slide"><a href="#" onclick="launchERForm('1000-1-1', '1000', '1000-1'); return false;"><span class="treetextitem">Progress Note 1</span></a></div></li>
+        <li id="1000-1-2_doc"><div class="slide"><a href="#" onclick="launchERForm('1000-1-2', '1000', 'Doe, Jane (x)'); return false;"><span class="treetextitem">Consent 2</span></a></div></li>
+      </ul>
+    </li>
+  </ul>
+</li>
+"""
+
+@pytest.mark.parametrize("onclick, pattern, expected", [
+    ("clientdetails('1234','Doe, Jane (x)')", "clientdetails", ("clientdetails", ["1234", "Doe, Jane (x)"])),
+    ("clientdetails( 12 , \"a)b\" ); return false;", "clientdetails", ("clientdetails", ["12", "a)b"])),
+    ("clientdetails()", "clientdetails", ("clientdetails", [])),
+    ("launchERForm('1', '2', this); other('x')", r"launchE\w*", ("launchERForm", ["1", "2", "this"])),
+    ("clientdetails('1234'", "clientdetails", (None, [])),
+    ("", "clientdetails", (None, [])),
+])
+def test_parse_js_call(scraper, onclick, pattern, expected):
+    assert scraper.parse_js_call(onclick, pattern) == expected
+
+def test_parse_parent_record(scraper):
+    record = scraper.parse_parent_record(lxml_html.fragment_fromstring(RECORD_HTML), 3)
+    assert (record.index, record.title, record.expanded) == (3, "06/08/2023 HRT LABS", True)
+    folder = record.treatment_folder
+    assert folder.expanded and folder.active
+    assert [document.name for document in folder.documents] == ["Progress Note 1", "Consent 2"]
+    assert folder.documents[0].dom_id == "1000-1-1_doc"
+    assert folder.documents[1].launch_function == "launchERForm"
+    assert folder.documents[1].launch_args == ["1000-1-2", "1000", "Doe, Jane (x)"]
+
+def test_parse_parent_record_without_treatment_records(scraper):
+    record_li = lxml_html.fragment_fromstring(
+        '<li class="parentrec"><span class="caret parentcaret"><a href="#">01/02/2020 PEEL</a></span>'
+        '<ul class="nested"><li><span class="caret"><a href="#">Consents</a></span></li></ul></li>'
+    )
+    record = scraper.parse_parent_record(record_li, 0)
+    assert not record.expanded
+    assert record.treatment_folder is None
@@ -0,0 +1,63 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+@pytest.fixture
+def gated_finalize(scraper, monkeypatch):
+    """finalize_landed_pdf blocks until the returned event is set, and records what it finalized"""
+    release = threading.Event()
+    finalized = []
+
+    def finalize(event):
+        release.wait(5)
+        finalized.append(event.final_path)
+
+    monkeypatch.setattr(scraper, "finalize_landed_pdf", finalize)
+    return release, finalized
+
+def test_finish_client_waits_for_queued_documents(scraper, gated_finalize):
+    release, finalized = gated_finalize
+    postprocessor = scraper.PostProcessor(worker_count=2, queue_size=4)
+    finished = []
+    postprocessor.submit(SimpleNamespace(client_id="1000", final_path="a.pdf"))
+    postprocessor.finish_client("1000", finished.append)
+    assert finished == []
+    release.set()
+    postprocessor.drain()
+    assert (finished, finalized) == ([True], ["a.pdf"])
+
+def test_finish_client_without_queued_documents(scraper):
+    postprocessor = scraper.PostProcessor(worker_count=1, queue_size=4)
+    finished = []
+    postprocessor.finish_client("1000", finished.append)
+    postprocessor.drain()
+    assert finished == [True]
+
+def test_keeps_every_finish_callback_of_a_client(scraper, gated_finalize):
+    release, _ = gated_finalize
+    postprocessor = scraper.PostProcessor(worker_count=1, queue_size=4)
+    finished = []
+    postprocessor.submit(SimpleNamespace(client_id="1000", final_path="a.pdf"))
+    postprocessor.finish_client("1000", lambda all_saved: finished.append(("first", all_saved)))
+    postprocessor.submit(SimpleNamespace(client_id="1000", final_path="b.pdf"))
+    postprocessor.finish_client("1000", lambda all_saved: finished.append(("second", all_saved)))
+    release.set()
+    postprocessor.drain()
+    assert finished == [("first", True), ("second", True)]
+
+def test_failed_document_fails_its_client(scraper, monkeypatch):
+    def finalize(event):
+        if event.final_path == "bad.pdf":
+            raise Exception("truncated (no %%EOF)")
+
+    monkeypatch.setattr(scraper, "finalize_landed_pdf", finalize)
+    postprocessor = scraper.PostProcessor(worker_count=1, queue_size=4)
+    finished = []
+    postprocessor.submit(SimpleNamespace(client_id="1000", final_path="bad.pdf"))
+    postprocessor.submit(SimpleNamespace(client_id="1001", final_path="good.pdf"))
+    postprocessor.drain()
+    postprocessor.finish_client("1000", lambda all_saved: finished.append(("1000", all_saved)))
+    postprocessor.finish_client("1001", lambda all_saved: finished.append(("1001", all_saved)))
+    assert finished == [("1000", False), ("1001", True)]
+    assert postprocessor.failures == [("bad.pdf", "truncated (no %%EOF)")]
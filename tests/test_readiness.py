@@ -0,0 +1,22 @@
+import pytest
+
+@pytest.fixture
+def empty_client(scraper, tmp_path, monkeypatch):
+    """A client whose Electronic Records tab settled without any parent record"""
+    monkeypatch.setattr(scraper, "create_client_folder", lambda client_info: str(tmp_path))
+    monkeypatch.setattr(scraper, "snapshot_records_tree", lambda driver: [])
+    monkeypatch.setattr(scraper, "EMPTY_RECORDS_RECHECK_SECONDS", 0.2)
+    return {'id': "1000", 'name': "Doe, Jane", 'folder_name': "Doe, Jane - 1000"}
+
+def test_settled_tab_without_records_is_empty(scraper, empty_client, monkeypatch):
+    checks = []
+    monkeypatch.setattr(scraper, "has_parent_records", lambda driver: checks.append(True) and False)
+    assert scraper.process_electronic_records(None, empty_client) == (True, [])
+    assert checks  # The tree was looked at again before the client counted as empty
+
+def test_records_that_show_up_on_the_recheck_are_processed(scraper, empty_client, monkeypatch):
+    snapshots = iter([[], [scraper.ParentRecord(index=0, title="06/08/2023 HRT", expanded=False)]])
+    monkeypatch.setattr(scraper, "snapshot_records_tree", lambda driver: next(snapshots))
+    monkeypatch.setattr(scraper, "has_parent_records", lambda driver: True)
+    scraper.process_electronic_records(None, empty_client)
+    assert empty_client['record_titles'] == ["06/08/2023 HRT"]
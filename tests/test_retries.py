@@ -0,0 +1,123 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+def test_run_journal_dead_letters(scraper, tmp_path):
+    journal = scraper.RunJournal(str(tmp_path / "journal.sqlite3"))
+    entry = {'letter': 'D', 'client_number': 4, 'name': "Doe, Jane"}
+    try:
+        journal.add_dead_letter("id:1000", entry, "open_client", "timed out")
+        journal.add_dead_letter("id:1000", entry, "capture", "no PDF")
+        assert journal.dead_letters() == [(entry, "capture", "no PDF", 2)]
+        journal.mark_client_done("id:1000", "1000", "Doe, Jane", "D", 4)
+        assert journal.dead_letters() == []
+    finally:
+        journal.close()
+
+def test_retry_policy_backoff_is_capped(scraper):
+    policy = scraper.RetryPolicy(attempts=5, base_delay=1, max_delay=3)
+    assert all(0 <= policy.backoff(1) <= 1 for _ in range(50))
+    assert all(0 <= policy.backoff(6) <= 3 for _ in range(50))
+
+def test_apply_retry_overrides(scraper, monkeypatch):
+    monkeypatch.setitem(scraper.RETRY_POLICIES, "capture", scraper.RetryPolicy(3, 1, 10))
+    monkeypatch.setitem(scraper.RETRY_POLICIES, "navigate", scraper.RetryPolicy(3, 1, 10))
+    scraper.apply_retry_overrides("capture=5:2:60, navigate=4")
+    assert scraper.RETRY_POLICIES["capture"] == scraper.RetryPolicy(5, 2, 60)
+    assert scraper.RETRY_POLICIES["navigate"] == scraper.RetryPolicy(4, 1, 10)
+    with pytest.raises(Exception, match="Unknown step"):
+        scraper.apply_retry_overrides("download=2")
+
+@pytest.fixture
+def quick_retries(scraper, monkeypatch):
+    """A fresh breaker and policy for the capture step, without the backoff sleeps"""
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    monkeypatch.setitem(scraper.RETRY_POLICIES, "capture", scraper.RetryPolicy(3, 1, 10))
+    monkeypatch.setitem(scraper.circuit_breakers, "capture", scraper.CircuitBreaker("capture"))
+    scraper.take_exhausted_steps()
+
+def test_with_retries_recovers_and_succeeds(scraper, quick_retries):
+    results = iter([None, Exception("stale element"), "saved"])
+    recovered = []
+
+    def action():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert scraper.with_retries("capture", action, recover=lambda: recovered.append(True)) == "saved"
+    assert len(recovered) == 2
+    assert scraper.take_exhausted_steps() == []
+
+def test_with_retries_gives_up(scraper, quick_retries):
+    calls = []
+
+    def action():
+        calls.append(True)
+        raise Exception("no PDF")
+
+    with pytest.raises(Exception, match="no PDF"):
+        scraper.with_retries("capture", action, description="Consent")
+    assert len(calls) == 3
+    assert scraper.take_exhausted_steps() == [("capture", "Consent")]
+
+def test_circuit_breaker_opens_and_closes(scraper, monkeypatch):
+    monkeypatch.setattr(scraper, "BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(scraper, "BREAKER_PAUSE_SECONDS", 10)
+    breaker = scraper.CircuitBreaker("capture")
+    breaker.record(False)
+    assert breaker.seconds_open() == 0
+    breaker.record(False)
+    assert 9 < breaker.seconds_open() <= 10
+
+    # Half-open after the pause: one more failure reopens it for twice as long
+    breaker.open_until = 0
+    breaker.record(False)
+    assert 19 < breaker.seconds_open() <= 20
+
+    breaker.open_until = 0
+    breaker.record(True)
+    assert (breaker.failures, breaker.trips) == (0, 0)
+
+def test_dead_letter_pass_saves_what_the_retries_capture(scraper, tmp_path, monkeypatch):
+    """The post-processing workers still run during the retry pass: more PDFs than the queue holds are captured,
+    all of them are saved, and the client only counts as recovered once its finish callback marked it done"""
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    scraper.take_exhausted_steps()
+    journal = scraper.RunJournal(str(tmp_path / "journal.sqlite3"))
+    postprocessor = scraper.PostProcessor(worker_count=1, queue_size=1)
+    monkeypatch.setattr(scraper, "journal", journal)
+    monkeypatch.setattr(scraper, "postprocessor", postprocessor)
+    monkeypatch.setattr(scraper, "finalize_landed_pdf", lambda event: None)
+
+    entry = {'letter': 'D', 'client_number': 4, 'page': 1, 'position': 4, 'name': "Doe, Jane", 'onclick': "openClient(1000)"}
+    key = scraper.client_key(entry['name'], entry['onclick'])
+    journal.add_dead_letter(key, entry, "capture", "no PDF")
+    finished = []
+
+    def retry_client(driver, entry):
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            postprocessor.submit(SimpleNamespace(client_id="1000", final_path=name))
+        def client_finished(all_saved):
+            finished.append(all_saved)
+            journal.mark_client_done(key, "1000", entry['name'], "D", 4)
+        postprocessor.finish_client("1000", client_finished)
+        return scraper.ClientLogRecord("D", 4, 1, 4, entry['name'], entry['name'], "1000", "Doe, Jane - 1000",
+                                       False, True, True, (), "2023-06-08 10:00:00")
+    monkeypatch.setattr(scraper, "process_manifest_entry", retry_client)
+
+    result = []
+    try:
+        postprocessor.wait_idle()
+        retry_pass = threading.Thread(target=lambda: result.append(scraper.run_dead_letter_pass(None)), daemon=True)
+        retry_pass.start()
+        retry_pass.join(10)
+        assert not retry_pass.is_alive()
+        assert result == [1]
+        assert (postprocessor.finalized, finished) == (3, [True])
+        assert journal.dead_letters(journal.started) == []
+    finally:
+        postprocessor.drain()
+        journal.close()
@@ -0,0 +1,81 @@
+import sqlite3
+from concurrent.futures import Future
+
+import pytest
+
+import Aesthetics_Pro_Search as search
+
+SAVED_PATH = "Aesthetics Pro/Doe, Jane - 1000/2023-06-08_HRT LABS Consent Form_Treatment_Records_Doe, Jane.pdf"
+
+def test_fields_from_path_with_known_file_name():
+    fields = search.fields_from_path(SAVED_PATH, "Consent Form")
+    assert fields == {
+        'client_name': "Doe, Jane",
+        'client_id': "1000",
+        'record_date': "2023-06-08",
+        'record_type': "HRT LABS",
+        'file_name': "Consent Form"
+    }
+
+def test_fields_from_path_of_an_archive_member():
+    fields = search.fields_from_path(
+        "Aesthetics Pro/Doe, Jane - 1000.zip::2023-06-08_HRT LABS Consent Form_Treatment_Records_Doe, Jane.pdf"
+    )
+    # Without the file name the record name cannot be split off
+    assert (fields['client_id'], fields['record_type'], fields['file_name']) == ("1000", "", "HRT LABS Consent Form")
+
+@pytest.fixture
+def indexer(tmp_path):
+    indexer = search.TextIndexer(str(tmp_path / "index.sqlite3"), worker_count=1)
+    yield indexer
+    indexer.close()
+
+def extraction(result=None, error=None):
+    future = Future()
+    if error:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+def test_store_text_keeps_one_row_per_content(indexer):
+    for _ in range(2):
+        indexer.slots.acquire()
+        indexer.store_text("abc", extraction(("botox consent", 1)))
+    rows = indexer.connection.execute("SELECT text FROM pdf_text WHERE sha256 = 'abc'").fetchall()
+    assert rows == [("botox consent",)]
+
+def test_failed_extraction_is_retried(indexer):
+    indexer.slots.acquire()
+    indexer.store_text("abc", extraction(error=Exception("damaged PDF")))
+    assert indexer.failures == 1
+    assert indexer.connection.execute("SELECT COUNT(*) FROM pdf_text").fetchone() == (0,)
+    known = indexer.connection.execute("SELECT 1 FROM pdf_contents WHERE sha256 = 'abc' AND error IS NULL").fetchone()
+    assert known is None
+
+def test_text_is_replaced_by_rowid_after_a_failure(indexer):
+    indexer.slots.acquire()
+    indexer.store_text("abc", extraction(error=Exception("damaged PDF")))
+    indexer.slots.acquire()
+    indexer.store_text("abc", extraction(("botox consent", 1)))
+    text_rowid = indexer.connection.execute("SELECT text_rowid FROM pdf_contents WHERE sha256 = 'abc'").fetchone()[0]
+    assert indexer.connection.execute("SELECT rowid, text FROM pdf_text").fetchall() == [(text_rowid, "botox consent")]
+
+def test_index_written_before_text_rowids(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE pdf_contents (sha256 TEXT PRIMARY KEY, pages INTEGER, error TEXT, extracted_at REAL) WITHOUT ROWID;
+        CREATE VIRTUAL TABLE pdf_text USING fts5(sha256 UNINDEXED, text);
+        INSERT INTO pdf_contents VALUES ('abc', 0, 'damaged PDF', 0);
+        INSERT INTO pdf_text VALUES ('abc', '');
+    """)
+    connection.close()
+
+    indexer = search.TextIndexer(path, worker_count=1)
+    try:
+        indexer.slots.acquire()
+        indexer.store_text("abc", extraction(("botox consent", 1)))
+        assert indexer.connection.execute("SELECT text FROM pdf_text").fetchall() == [("botox consent",)]
+    finally:
+        indexer.close()
@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+from Aesthetics_Pro_Mock import build_pdf
+
+def test_pdf_digest_in_chunks(scraper):
+    pdf = build_pdf("hello")
+    digest = scraper.PdfDigest()
+    for start in range(0, len(pdf), 7):
+        digest.update(pdf[start:start + 7])
+    assert digest.check() is None
+    assert digest.sha256 == hashlib.sha256(pdf).hexdigest()
+    assert (digest.size, digest.pages) == (len(pdf), 1)
+
+def test_pdf_digest_problems(scraper):
+    truncated = scraper.PdfDigest()
+    truncated.update(build_pdf("hello")[:-20])
+    assert truncated.check() == "truncated (no %%EOF)"
+    assert scraper.PdfDigest().check() == "file is empty"
+    with pytest.raises(Exception, match="not a PDF"):
+        scraper.PdfDigest().update(b"<html>error page</html>")
+
+@pytest.fixture
+def content_store(scraper, tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "OUTPUT_LAYOUT", "folders")
+    monkeypatch.setattr(scraper, "PDF_STORE", True)
+    monkeypatch.setattr(scraper, "STORE_FOLDER", str(tmp_path / ".store"))
+    return tmp_path
+
+def test_store_pdf_keeps_one_copy(scraper, content_store):
+    pdf = build_pdf("stored once")
+    _, _, first_blob = scraper.store_pdf([pdf], str(content_store / "Doe, Jane - 1000" / "a.pdf"))
+    saved_path, digest, second_blob = scraper.store_pdf([pdf], str(content_store / "Roe, Ann - 1001" / "b.pdf"))
+    assert first_blob == second_blob == scraper.store_blob_path(digest.sha256)
+    with open(saved_path, 'rb') as saved:
+        assert saved.read() == pdf
+
+def test_store_pdf_rejects_a_bad_download(scraper, content_store):
+    with pytest.raises(Exception, match="truncated"):
+        scraper.store_pdf([build_pdf("cut short")[:-20]], str(content_store / "client" / "a.pdf"))
+    assert not (content_store / "client" / "a.pdf").exists()
+
+def test_store_pdf_replaces_a_damaged_blob(scraper, content_store):
+    pdf = build_pdf("stored once")
+    _, _, blob_path = scraper.store_pdf([pdf], str(content_store / "client" / "a.pdf"))
+    with open(blob_path, 'wb') as blob:
+        blob.write(pdf[:-10] + b"X" * 10)
+
+    saved_path, _, second_blob_path = scraper.store_pdf([pdf], str(content_store / "client" / "b.pdf"))
+    assert second_blob_path == blob_path
+    with open(blob_path, 'rb') as blob, open(saved_path, 'rb') as saved:
+        assert blob.read() == pdf == saved.read()
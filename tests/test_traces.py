@@ -0,0 +1,15 @@
+import pytest
+
+@pytest.mark.parametrize("count, fraction, expected", [
+    (100, 0.99, 99),
+    (100, 0.07, 7),
+    (20, 0.95, 19),
+    (10, 0.50, 5),
+    (10, 1.00, 10),
+    (1, 0.50, 1),
+])
+def test_percentile_is_nearest_rank(scraper, count, fraction, expected):
+    assert scraper.percentile(list(range(1, count + 1)), fraction) == expected
+
+def test_percentile_of_no_values(scraper):
+    assert scraper.percentile([], 0.95) == 0.0